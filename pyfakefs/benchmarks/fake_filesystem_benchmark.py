@@ -0,0 +1,528 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmarks for the hot paths of the fake filesystem.
+
+The results are written in a stable JSON format, so that the timings of
+two commits can be compared locally.
+
+:Usage:
+
+Run all benchmarks and write the results to a file::
+
+    python -m pyfakefs.benchmarks.fake_filesystem_benchmark -o new.json
+
+Compare the results with the results of another commit::
+
+    python -m pyfakefs.benchmarks.fake_filesystem_benchmark \\
+        --compare old.json new.json
+
+The comparison exits with status 1 if any benchmark got slower by more
+than the given threshold (10% by default).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+from pyfakefs import __version__
+from pyfakefs import fake_filesystem
+from pyfakefs import fake_filesystem_shutil
+from pyfakefs import fake_glob
+from pyfakefs.fake_filesystem_unittest import Patcher
+
+#: Version of the JSON result format. Increase this if the format changes
+#: in an incompatible way.
+FORMAT_VERSION = 1
+
+_BENCHMARKS = []
+
+
+def benchmark(size):
+    """Register a benchmark function with its default problem size.
+
+    A benchmark function gets the problem size as argument, does all
+    needed setup, and returns a function without arguments that executes
+    the measured code. The setup is repeated for each measurement, so that
+    the measured code can change the fake filesystem.
+    """
+
+    def register(func):
+        name = func.__name__
+        if name.startswith('bench_'):
+            name = name[len('bench_'):]
+        _BENCHMARKS.append((name, func, size))
+        return func
+
+    return register
+
+
+def _new_filesystem():
+    return fake_filesystem.FakeFilesystem(path_separator='/')
+
+
+@benchmark(size=1000)
+def bench_patcher_setup_teardown(size):
+    """Patcher setup and teardown with `size` additional loaded modules,
+    each of them importing `os`."""
+    module_names = ['_pyfakefs_bench_module_%d' % i for i in range(size)]
+
+    def run():
+        for name in module_names:
+            module = types.ModuleType(name)
+            module.os = os
+            module.path = os.path
+            sys.modules[name] = module
+        try:
+            patcher = Patcher()
+            patcher.setUp()
+            patcher.tearDown()
+        finally:
+            for name in module_names:
+                del sys.modules[name]
+
+    return run
+
+
+@benchmark(size=10000)
+def bench_create_file(size):
+    """Create `size` files distributed over 100 directories."""
+    filesystem = _new_filesystem()
+    paths = ['/bench/dir%d/file%d' % (i % 100, i) for i in range(size)]
+
+    def run():
+        for path in paths:
+            filesystem.create_file(path)
+
+    return run
+
+
+@benchmark(size=10000)
+def bench_stat_deep_path(size):
+    """Stat a file located 30 directory levels deep `size` times."""
+    filesystem = _new_filesystem()
+    path = '/' + '/'.join('level%d' % i for i in range(30)) + '/file'
+    filesystem.create_file(path)
+
+    def run():
+        for _ in range(size):
+            filesystem.stat(path)
+
+    return run
+
+
+@benchmark(size=2000)
+def bench_case_insensitive_lookup(size):
+    """Look up each of `size` files in a single directory using a
+    different case in a case-insensitive filesystem."""
+    filesystem = _new_filesystem()
+    filesystem.is_case_sensitive = False
+    for i in range(size):
+        filesystem.create_file('/bench/File%d.txt' % i)
+    paths = ['/BENCH/file%d.TXT' % i for i in range(size)]
+
+    def run():
+        for path in paths:
+            filesystem.exists(path)
+
+    return run
+
+
+def _create_tree(filesystem, width, depth):
+    """Create a directory tree with `width` subdirectories and `width`
+    files per directory, `depth` levels deep."""
+
+    def create_level(path, level):
+        for i in range(width):
+            filesystem.create_file('%s/file%d' % (path, i))
+        if level < depth:
+            for i in range(width):
+                create_level('%s/dir%d' % (path, i), level + 1)
+
+    create_level('/bench', 1)
+
+
+@benchmark(size=10000)
+def bench_walk_wide_tree(size):
+    """`os.walk` over a single directory with `size` files."""
+    filesystem = _new_filesystem()
+    _create_tree(filesystem, width=size, depth=1)
+    os_module = fake_filesystem.FakeOsModule(filesystem)
+
+    def run():
+        for _ in os_module.walk('/bench'):
+            pass
+
+    return run
+
+
+@benchmark(size=200)
+def bench_walk_deep_tree(size):
+    """`os.walk` over a chain of `size` nested directories with 10 files
+    in each directory."""
+    filesystem = _new_filesystem()
+    path = '/bench'
+    for i in range(size):
+        path += '/dir%d' % i
+        for j in range(10):
+            filesystem.create_file('%s/file%d' % (path, j))
+    os_module = fake_filesystem.FakeOsModule(filesystem)
+
+    def run():
+        for _ in os_module.walk('/bench'):
+            pass
+
+    return run
+
+
+@benchmark(size=30)
+def bench_walk_parallel(size):
+    """`FakeFilesystem.walk_parallel` with 4 workers over a tree with
+    `size` subdirectories of `size` subdirectories and `size` files in
+    each directory."""
+    filesystem = _new_filesystem()
+    _create_tree(filesystem, width=size, depth=3)
+
+    def run():
+        for _ in filesystem.walk_parallel('/bench', workers=4):
+            pass
+
+    return run
+
+
+@benchmark(size=10000)
+def bench_scandir_wide_tree(size):
+    """`os.scandir` over a directory with `size` entries, checking the
+    entry type for each entry."""
+    filesystem = _new_filesystem()
+    for i in range(size):
+        if i % 10:
+            filesystem.create_file('/bench/file%d' % i)
+        else:
+            filesystem.create_dir('/bench/dir%d' % i)
+    os_module = fake_filesystem.FakeOsModule(filesystem)
+
+    def run():
+        for entry in os_module.scandir('/bench'):
+            entry.is_dir()
+            entry.is_symlink()
+
+    return run
+
+
+@benchmark(size=10000)
+def bench_ordered_dirs(size):
+    """`FakeDirectory.ordered_dirs` 100 times for a directory with `size`
+    entries."""
+    filesystem = _new_filesystem()
+    for i in range(size):
+        filesystem.create_file('/bench/file%d' % i)
+    directory = filesystem.get_object('/bench')
+
+    def run():
+        for _ in range(100):
+            directory.ordered_dirs
+
+    return run
+
+
+@benchmark(size=10)
+def bench_glob_recursive(size):
+    """Recursive `glob.glob` for a file pattern in a tree with `size`
+    subdirectories of `size` subdirectories and `size` files in each
+    directory."""
+    filesystem = _new_filesystem()
+    _create_tree(filesystem, width=size, depth=2)
+    glob_module = fake_glob.FakeGlobModule(filesystem)
+
+    def run():
+        glob_module.glob('/bench/**/file1', recursive=True)
+
+    return run
+
+
+@benchmark(size=10000)
+def bench_stat_many(size):
+    """`FakeFilesystem.stat_many` for `size` files in a deep directory,
+    and for as many missing files."""
+    filesystem = _new_filesystem()
+    directory = '/bench/a/b/c/d/e/f'
+    paths = []
+    for i in range(size):
+        filesystem.create_file('%s/file%d' % (directory, i))
+        paths.append('%s/file%d' % (directory, i))
+        paths.append('%s/missing%d' % (directory, i))
+
+    def run():
+        filesystem.stat_many(paths)
+
+    return run
+
+
+@benchmark(size=20)
+def bench_copytree_rmtree(size):
+    """`shutil.copytree` and `shutil.rmtree` for a tree with `size`
+    subdirectories and `size` files in each directory."""
+    filesystem = _new_filesystem()
+    _create_tree(filesystem, width=size, depth=2)
+    shutil_module = fake_filesystem_shutil.FakeShutilModule(filesystem)
+
+    def run():
+        shutil_module.copytree('/bench', '/copy')
+        shutil_module.rmtree('/copy')
+
+    return run
+
+
+@benchmark(size=30)
+def bench_dump_load(size):
+    """Dump a tree with `size` subdirectories and `size` files in each
+    directory into an archive, and load it into a new file system."""
+    filesystem = _new_filesystem()
+    _create_tree(filesystem, width=size, depth=2)
+
+    def run():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, 'bench.archive')
+            filesystem.dump(archive_path)
+            _new_filesystem().load(archive_path)
+
+    return run
+
+
+@benchmark(size=20)
+def bench_large_file_write(size):
+    """Write a file of `size` MB in chunks of 64 kB."""
+    filesystem = _new_filesystem()
+    fake_open = fake_filesystem.FakeFileOpen(filesystem)
+    filesystem.create_dir('/bench')
+    chunk = b'x' * 65536
+    count = size * 16
+
+    def run():
+        with fake_open('/bench/large', 'wb') as f:
+            for _ in range(count):
+                f.write(chunk)
+
+    return run
+
+
+@benchmark(size=20)
+def bench_large_file_read(size):
+    """Read a file of `size` MB in chunks of 64 kB."""
+    filesystem = _new_filesystem()
+    fake_open = fake_filesystem.FakeFileOpen(filesystem)
+    filesystem.create_file('/bench/large', contents=b'x' * size * 1048576)
+
+    def run():
+        with fake_open('/bench/large', 'rb') as f:
+            while f.read(65536):
+                pass
+
+    return run
+
+
+@benchmark(size=200)
+def bench_large_file_append(size):
+    """Append to a file of 1 MB `size` times, reopening it each time."""
+    filesystem = _new_filesystem()
+    fake_open = fake_filesystem.FakeFileOpen(filesystem)
+    filesystem.create_file('/bench/large', contents=b'x' * 1048576)
+
+    def run():
+        for _ in range(size):
+            with fake_open('/bench/large', 'ab') as f:
+                f.write(b'appended line\n')
+
+    return run
+
+
+@benchmark(size=1)
+def bench_add_real_directory(size):
+    """Map the pyfakefs package directory non-lazily `size` times and
+    read all mapped files."""
+    source_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run():
+        for i in range(size):
+            filesystem = _new_filesystem()
+            filesystem.add_real_directory(source_path, lazy_read=False,
+                                          target_path='/bench%d' % i)
+            os_module = fake_filesystem.FakeOsModule(filesystem)
+            for root, _, files in os_module.walk('/bench%d' % i):
+                for name in files:
+                    filesystem.get_object(
+                        os_module.path.join(root, name)).byte_contents
+
+    return run
+
+
+def benchmark_names():
+    """Return the names of all registered benchmarks."""
+    return [name for name, _, _ in _BENCHMARKS]
+
+
+def run_benchmark(func, size, repeat):
+    """Run a single benchmark `repeat` times and return the timings
+    in seconds."""
+    timings = []
+    for _ in range(repeat):
+        measured = func(size)
+        start = time.perf_counter()
+        measured()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings):
+    """Return the statistics of the given timings as a dictionary."""
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+    }
+
+
+def result_header():
+    """Return the common part of all result files, describing the
+    environment the benchmarks have been run in."""
+    return {
+        'format_version': FORMAT_VERSION,
+        'pyfakefs_version': __version__,
+        'python_version': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'platform': sys.platform,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run_benchmarks(names=None, repeat=5, scale=1.0, log=None):
+    """Run the registered benchmarks and return the results as a
+    JSON-serializable dictionary.
+
+    Args:
+        names: If given, only benchmarks with a name containing one of
+            these strings are run.
+        repeat: The number of measurements per benchmark.
+        scale: A factor applied to the default problem size of all
+            benchmarks; the size is at least 1.
+        log: If given, a function called with a progress message after
+            each benchmark.
+    """
+    results = {}
+    for name, func, default_size in _BENCHMARKS:
+        if names and not any(part in name for part in names):
+            continue
+        size = max(1, int(default_size * scale))
+        timings = run_benchmark(func, size, repeat)
+        results[name] = {'size': size, 'repeat': repeat}
+        results[name].update(summarize(timings))
+        if log is not None:
+            log('%-32s size=%-7d median=%.6fs' % (
+                name, size, results[name]['median']))
+    header = result_header()
+    header['results'] = results
+    return header
+
+
+def compare_results(old, new, threshold=0.1):
+    """Compare two benchmark results as returned by `run_benchmarks`.
+
+    Only benchmarks present in both results and measured with the same
+    size are compared; the median timings are used for the comparison.
+
+    Returns:
+        A list of `(name, old_median, new_median, ratio, regressed)` tuples,
+        where `ratio` is the new timing relative to the old one, and
+        `regressed` is `True` if the ratio exceeds `1 + threshold`.
+
+    Raises:
+        ValueError: if the results have different format versions.
+    """
+    if old.get('format_version') != new.get('format_version'):
+        raise ValueError('Cannot compare benchmark results with format '
+                         'versions %s and %s' % (old.get('format_version'),
+                                                 new.get('format_version')))
+    comparison = []
+    for name, new_result in new['results'].items():
+        old_result = old['results'].get(name)
+        if old_result is None or old_result['size'] != new_result['size']:
+            continue
+        old_median = old_result['median']
+        new_median = new_result['median']
+        ratio = new_median / old_median if old_median else float('inf')
+        comparison.append((name, old_median, new_median, ratio,
+                           ratio > 1 + threshold))
+    return comparison
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Run the pyfakefs benchmarks, or compare the results '
+                    'of two benchmark runs.')
+    parser.add_argument('-o', '--output',
+                        help='write the results as JSON to this file')
+    parser.add_argument('-k', '--filter', action='append',
+                        help='only run benchmarks containing this string '
+                             '(may be given several times)')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of measurements per benchmark')
+    parser.add_argument('-s', '--scale', type=float, default=1.0,
+                        help='scale factor for the problem sizes')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the available benchmarks and exit')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of '
+                             'running the benchmarks')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as regression')
+    options = parser.parse_args(args)
+
+    if options.list:
+        for name in benchmark_names():
+            print(name)
+        return 0
+
+    if options.compare:
+        comparison = compare_results(_load(options.compare[0]),
+                                     _load(options.compare[1]),
+                                     options.threshold)
+        regressions = 0
+        for name, old_median, new_median, ratio, regressed in comparison:
+            if regressed:
+                regressions += 1
+            print('%-32s %12.6fs %12.6fs %7.2fx%s' % (
+                name, old_median, new_median, ratio,
+                '  REGRESSION' if regressed else ''))
+        return 1 if regressions else 0
+
+    results = run_benchmarks(options.filter, options.repeat, options.scale,
+                             log=print)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare the throughput of the fake filesystem with the real one.
+
+The same workload is run against a temporary directory in the real
+filesystem and against a fake filesystem, similar to the functional
+comparison in `fake_filesystem_vs_real_test`. For each family of
+file system calls, the ratio of the real and the fake timing is reported
+(a speedup greater than 1 means that the fake filesystem is faster).
+
+:Usage:
+
+    python -m pyfakefs.benchmarks.fake_vs_real_benchmark -o ratios.json
+
+The results use the same JSON layout as the results of
+`fake_filesystem_benchmark`, with separate timings for the real and the
+fake filesystem per workload.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from pyfakefs import fake_filesystem
+from pyfakefs.benchmarks.fake_filesystem_benchmark import (
+    run_benchmark, summarize, result_header)
+
+_WORKLOADS = []
+
+
+def workload(size, posix_only=False):
+    """Register a workload with its default problem size.
+
+    A workload gets an environment and the problem size, creates the
+    needed files using the environment, and returns a function without
+    arguments that executes the measured calls. Workloads shall only use
+    the `os` and `open` functions of the environment, so that they behave
+    identically in the real and in the fake filesystem.
+    """
+
+    def register(func):
+        name = func.__name__
+        if name.startswith('work_'):
+            name = name[len('work_'):]
+        _WORKLOADS.append((name, func, size, posix_only))
+        return func
+
+    return register
+
+
+class _Environment:
+    """Provides the `os` module, the `open` function and fresh base
+    directories for a workload."""
+
+    name = None
+
+    def __init__(self, os_module, open_function, root):
+        self.os = os_module
+        self.open = open_function
+        self.root = root
+        self._count = 0
+
+    def join(self, *paths):
+        return self.os.path.join(*paths)
+
+    def new_directory(self):
+        """Create and return a new empty directory."""
+        self._count += 1
+        path = self.join(self.root, 'run%d' % self._count)
+        self.os.mkdir(path)
+        return path
+
+    def cleanup(self):
+        pass
+
+
+class RealEnvironment(_Environment):
+    """Workload environment in a temporary directory of the real
+    filesystem."""
+
+    name = 'real'
+
+    def __init__(self, tmpdir=None):
+        root = tempfile.mkdtemp(prefix='pyfakefs_bench_', dir=tmpdir)
+        super(RealEnvironment, self).__init__(os, open, root)
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class FakeEnvironment(_Environment):
+    """Workload environment in a fake filesystem emulating the
+    current OS."""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.filesystem = fake_filesystem.FakeFilesystem()
+        root = self.filesystem.joinpaths(
+            self.filesystem.root.name, 'pyfakefs_bench')
+        self.filesystem.create_dir(root)
+        super(FakeEnvironment, self).__init__(
+            fake_filesystem.FakeOsModule(self.filesystem),
+            fake_filesystem.FakeFileOpen(self.filesystem), root)
+
+
+def _create_files(env, size, contents='x'):
+    base = env.new_directory()
+    paths = [env.join(base, 'file%d' % i) for i in range(size)]
+    for path in paths:
+        with env.open(path, 'w') as f:
+            f.write(contents)
+    return base, paths
+
+
+@workload(size=2000)
+def work_create(env, size):
+    """Create `size` small files."""
+    base = env.new_directory()
+    paths = [env.join(base, 'file%d' % i) for i in range(size)]
+
+    def run():
+        for path in paths:
+            with env.open(path, 'w') as f:
+                f.write('x')
+
+    return run
+
+
+@workload(size=2000)
+def work_read(env, size):
+    """Read `size` files of 4 kB."""
+    _, paths = _create_files(env, size, contents='x' * 4096)
+
+    def run():
+        for path in paths:
+            with env.open(path) as f:
+                f.read()
+
+    return run
+
+
+@workload(size=64)
+def work_write_large(env, size):
+    """Write a file of `size` MB in chunks of 64 kB."""
+    path = env.join(env.new_directory(), 'large')
+    chunk = b'x' * 65536
+    count = size * 16
+
+    def run():
+        with env.open(path, 'wb') as f:
+            for _ in range(count):
+                f.write(chunk)
+
+    return run
+
+
+@workload(size=5000)
+def work_stat(env, size):
+    """Stat each of `size` files."""
+    _, paths = _create_files(env, size)
+
+    def run():
+        for path in paths:
+            env.os.stat(path)
+
+    return run
+
+
+@workload(size=5000)
+def work_exists(env, size):
+    """Check the existence of `size` files, half of them not existing."""
+    base, paths = _create_files(env, size // 2 or 1)
+    paths += [env.join(base, 'missing%d' % i) for i in range(size // 2)]
+
+    def run():
+        for path in paths:
+            env.os.path.exists(path)
+
+    return run
+
+
+@workload(size=100)
+def work_listdir(env, size):
+    """List a directory with 1000 entries `size` times."""
+    base, _ = _create_files(env, 1000)
+
+    def run():
+        for _ in range(size):
+            env.os.listdir(base)
+
+    return run
+
+
+@workload(size=20)
+def work_scandir(env, size):
+    """Scan a directory with 1000 entries `size` times, checking the
+    type of each entry."""
+    base, _ = _create_files(env, 1000)
+
+    def run():
+        for _ in range(size):
+            for entry in env.os.scandir(base):
+                entry.is_dir()
+
+    return run
+
+
+@workload(size=10)
+def work_walk(env, size):
+    """Walk a tree with `size` subdirectories of `size` subdirectories,
+    each containing 10 files."""
+    base = env.new_directory()
+    for i in range(size):
+        for j in range(size):
+            path = env.join(base, 'dir%d' % i, 'dir%d' % j)
+            env.os.makedirs(path)
+            for k in range(10):
+                with env.open(env.join(path, 'file%d' % k), 'w'):
+                    pass
+
+    def run():
+        for _ in env.os.walk(base):
+            pass
+
+    return run
+
+
+@workload(size=2000)
+def work_mkdir_rmdir(env, size):
+    """Create and remove `size` directories."""
+    base = env.new_directory()
+    paths = [env.join(base, 'dir%d' % i) for i in range(size)]
+
+    def run():
+        for path in paths:
+            env.os.mkdir(path)
+        for path in paths:
+            env.os.rmdir(path)
+
+    return run
+
+
+@workload(size=2000)
+def work_rename(env, size):
+    """Rename `size` files."""
+    base, paths = _create_files(env, size)
+    targets = [env.join(base, 'renamed%d' % i) for i in range(size)]
+
+    def run():
+        for path, target in zip(paths, targets):
+            env.os.rename(path, target)
+
+    return run
+
+
+@workload(size=2000)
+def work_remove(env, size):
+    """Remove `size` files."""
+    _, paths = _create_files(env, size)
+
+    def run():
+        for path in paths:
+            env.os.remove(path)
+
+    return run
+
+
+@workload(size=2000, posix_only=True)
+def work_symlink(env, size):
+    """Create `size` symlinks and read them back."""
+    base, paths = _create_files(env, 1)
+    links = [env.join(base, 'link%d' % i) for i in range(size)]
+
+    def run():
+        for link in links:
+            env.os.symlink(paths[0], link)
+        for link in links:
+            env.os.readlink(link)
+
+    return run
+
+
+def workload_names():
+    """Return the names of all workloads supported under the current
+    OS."""
+    return [name for name, _, _, posix_only in _WORKLOADS
+            if not posix_only or sys.platform != 'win32']
+
+
+def run_comparison(names=None, repeat=5, scale=1.0, tmpdir=None, log=None):
+    """Run the workloads against the real and the fake filesystem and
+    return the results as a JSON-serializable dictionary.
+
+    Args:
+        names: If given, only workloads with a name containing one of
+            these strings are run.
+        repeat: The number of measurements per workload and filesystem.
+        scale: A factor applied to the default problem size of all
+            workloads; the size is at least 1.
+        tmpdir: The directory in the real filesystem used for the
+            workloads, the default temp directory if not given.
+        log: If given, a function called with a progress message after
+            each workload.
+    """
+    supported = workload_names()
+    results = {}
+    for name, func, default_size, _ in _WORKLOADS:
+        if name not in supported:
+            continue
+        if names and not any(part in name for part in names):
+            continue
+        size = max(1, int(default_size * scale))
+        result = {'size': size, 'repeat': repeat}
+        for env in (RealEnvironment(tmpdir), FakeEnvironment()):
+            try:
+                timings = run_benchmark(
+                    lambda size, env=env: func(env, size), size, repeat)
+            finally:
+                env.cleanup()
+            result[env.name] = summarize(timings)
+        fake_median = result['fake']['median']
+        result['speedup'] = (result['real']['median'] / fake_median
+                             if fake_median else float('inf'))
+        results[name] = result
+        if log is not None:
+            log('%-16s size=%-6d real=%.6fs fake=%.6fs speedup=%.2fx' % (
+                name, size, result['real']['median'], fake_median,
+                result['speedup']))
+    header = result_header()
+    header['results'] = results
+    return header
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Compare the throughput of the fake filesystem with '
+                    'the real filesystem.')
+    parser.add_argument('-o', '--output',
+                        help='write the results as JSON to this file')
+    parser.add_argument('-k', '--filter', action='append',
+                        help='only run workloads containing this string '
+                             '(may be given several times)')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of measurements per workload')
+    parser.add_argument('-s', '--scale', type=float, default=1.0,
+                        help='scale factor for the problem sizes')
+    parser.add_argument('-t', '--tmpdir',
+                        help='real directory used for the workloads')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='list the available workloads and exit')
+    options = parser.parse_args(args)
+
+    if options.list:
+        for name in workload_names():
+            print(name)
+        return 0
+
+    results = run_comparison(options.filter, options.repeat, options.scale,
+                             options.tmpdir, log=print)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -93,22 +93,45 @@ True
 >>> stat.S_ISDIR(os_module.stat(os_module.path.dirname(pathname)).st_mode)
 True
 """
+import bisect
+import contextlib
 import errno
+import gzip
 import heapq
 import io
+import json
 import locale
+import mmap
 import os
+import pickle
+import struct
 import sys
+import tarfile
+import threading
 import time
 import uuid
+import zipfile
+import zlib
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from stat import (
-    S_IFREG, S_IFDIR, S_ISLNK, S_IFMT, S_ISDIR, S_IFLNK, S_ISREG, S_IFSOCK
+    S_IFREG, S_IFDIR, S_ISLNK, S_IFMT, S_ISDIR, S_IFLNK, S_ISREG, S_IFSOCK,
+    S_IFCHR, S_IFBLK, S_IFIFO
 )
 
+try:
+    # the compression modules are optional in Python builds
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
 from pyfakefs.deprecator import Deprecator
 from pyfakefs.extra_packages import use_scandir
-from pyfakefs.fake_scandir import scandir, walk
+from pyfakefs.fake_scandir import scandir, walk, walk_parallel
 from pyfakefs.helpers import (
     FakeStatResult, FileBufferIO, NullFileBufferIO,
     is_int_type, is_byte_string, is_unicode_string,
@@ -130,6 +153,15 @@ _OpenModes = namedtuple(
     'must_exist can_read can_write truncate append must_not_exist'
 )
 
+# the state of a file system entry in a snapshot taken by
+# `FakeFilesystem.snapshot()`
+SnapshotEntry = namedtuple(
+    'SnapshotEntry', 'st_mode st_size st_mtime_ns st_ino epoch')
+# the differences between two snapshots, see
+# `FakeFilesystem.diff_snapshots()`
+SnapshotDiff = namedtuple(
+    'SnapshotDiff', 'added removed changed size_changes')
+
 _OPEN_MODE_MAP = {
     # mode name:(file must exist, can read, can write,
     #            truncate, append, must not exist)
@@ -190,6 +222,41 @@ def is_root():
     return USER_ID == 0
 
 
+class ReadOnlyGuard:
+    """Prevents changes of the directory tree of a fake filesystem while
+    read-only operations are running, see `FakeFilesystem.read_only()`.
+    """
+
+    # protects the creation and removal of guards
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.count = 0
+        self._local = threading.local()
+
+    def check(self):
+        """Raise if the directory tree shall not be changed in the current
+        thread.
+
+        Raises:
+            RuntimeError: if changes are not allowed.
+        """
+        if not getattr(self._local, 'changes_allowed', False):
+            raise RuntimeError('The fake filesystem is read-only while it '
+                               'is walked')
+
+    @contextlib.contextmanager
+    def changes_allowed(self):
+        """Allow changes in the current thread, used for internal changes
+        like loading lazily read real directories."""
+        allowed = getattr(self._local, 'changes_allowed', False)
+        self._local.changes_allowed = True
+        try:
+            yield
+        finally:
+            self._local.changes_allowed = allowed
+
+
 class FakeLargeFileIoException(Exception):
     """Exception thrown on unsupported operations for fake large files.
     Fake large files have a size with no real content.
@@ -515,6 +582,14 @@ class FakeFile:
     def __setattr__(self, key, value):
         """Forward some properties to stat_result."""
         if key in self.stat_types:
+            if (key == 'st_ino' and self.parent_dir is not None and
+                    value != self.stat_result.st_ino):
+                # the inode defines the position in the creation order
+                self.parent_dir._ino_index = None
+            elif key in ('st_mode', 'st_uid', 'st_gid'):
+                # permissions, owners and file types affect
+                # the path resolution
+                self.filesystem.generation += 1
             return setattr(self.stat_result, key, value)
         return super(FakeFile, self).__setattr__(key, value)
 
@@ -556,7 +631,13 @@ Deprecator.add(FakeFile, FakeFile.is_large_file, 'IsLargeFile')
 class FakeFileFromRealFile(FakeFile):
     """Represents a fake file copied from the real file system.
 
-    The contents of the file are read on demand only.
+    The contents of the file are read on demand only. The access time is
+    copied from the real file when the contents are loaded; use
+    `sync_atime()` to update it later.
+    If `use_mmap` is set, the real file is memory-mapped instead, and the
+    contents are not kept in memory until the fake file is written or
+    `byte_contents` is accessed: each fake file opened for reading only
+    reads from its own mapping, which is closed together with the file.
     """
 
     def __init__(self, file_path, filesystem, side_effect=None):
@@ -573,6 +654,34 @@ class FakeFileFromRealFile(FakeFile):
             name=os.path.basename(file_path), filesystem=filesystem,
             side_effect=side_effect)
         self.contents_read = False
+        self.use_mmap = False
+        self._mapped = False
+
+    def mapped_contents(self):
+        """Return a new read-only memory map of the real file, or `None` if
+        `use_mmap` is not set or the contents have been loaded.
+        The caller has to close the map, as each map holds a file
+        descriptor. Empty files cannot be mapped, and are returned as
+        empty bytes.
+        """
+        if not self.use_mmap or self.contents_read:
+            return None
+        with io.open(self.file_path, 'rb') as f:
+            try:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                mapping = b''
+        if not self._mapped:
+            self._mapped = True
+            self.sync_atime()
+        return mapping
+
+    def sync_atime(self):
+        """Update the access time from the real file.
+        This is done once when the contents are loaded, the real file is
+        not accessed again afterwards unless this is called explicitly.
+        """
+        self.st_atime = os.stat(self.file_path).st_atime
 
     @property
     def byte_contents(self):
@@ -580,8 +689,9 @@ class FakeFileFromRealFile(FakeFile):
             self.contents_read = True
             with io.open(self.file_path, 'rb') as f:
                 self._byte_contents = f.read()
-        # On MacOS and BSD, the above io.open() updates atime on the real file
-        self.st_atime = os.stat(self.file_path).st_atime
+            # On MacOS and BSD, the above io.open() updates atime
+            # on the real file
+            self.sync_atime()
         return self._byte_contents
 
     def set_contents(self, contents, encoding=None):
@@ -593,6 +703,114 @@ class FakeFileFromRealFile(FakeFile):
         return False
 
 
+class FakeFileFromImage(FakeFile):
+    """Represents a fake file loaded from a file system image written by
+    `FakeFilesystem.dump_image()`.
+
+    The contents are not copied into memory, but read from the read-only
+    memory map of the image, which is shared by all processes that load
+    the image. They are only copied if the file is written, or if
+    `byte_contents` is accessed.
+    """
+
+    def __init__(self, name, st_mode, image, offset, size, filesystem,
+                 encoding=None):
+        """
+        Args:
+            name: Name of the file, without parent path information.
+            st_mode: The stat.S_IF* constant and the permission bits.
+            image: The memory map of the image file.
+            offset: The offset of the file contents in the image.
+            size: The size of the file contents.
+            filesystem: The fake filesystem where the file is created.
+            encoding: The encoding of the file contents, if any.
+        """
+        super(FakeFileFromImage, self).__init__(
+            name, st_mode, filesystem=filesystem, encoding=encoding)
+        self._image_contents = memoryview(image)[offset:offset + size]
+        self.stat_result.st_size = size
+
+    def mapped_contents(self):
+        """Return a read-only memory view of the contents in the image,
+        or `None` if the contents have been changed."""
+        return self._image_contents
+
+    @property
+    def byte_contents(self):
+        if self._image_contents is not None and self._byte_contents is None:
+            self._byte_contents = self._image_contents.tobytes()
+        return self._byte_contents
+
+    def set_contents(self, contents, encoding=None):
+        self._image_contents = None
+        super(FakeFileFromImage, self).set_contents(contents, encoding)
+
+    def is_large_file(self):
+        """The contents are never faked."""
+        return False
+
+
+class FakeFileFromArchive(FakeFile):
+    """Represents a fake file added from a member of an uncompressed tar
+    archive or of a zip archive in the real file system.
+
+    The contents of the member are read from the archive on first access
+    only, without verifying their checksum.
+    """
+
+    def __init__(self, name, archive_path, member, filesystem):
+        """
+        Args:
+            name: Name of the file, without parent path information.
+            archive_path: Path to the archive in the real file system.
+            member: The `tarfile.TarInfo` or `zipfile.ZipInfo` object
+                of the archive member.
+            filesystem: The fake filesystem where the file is created.
+        """
+        super(FakeFileFromArchive, self).__init__(
+            name=name, filesystem=filesystem)
+        self.archive_path = archive_path
+        self.member = member
+        self.contents_read = False
+        self.stat_result.st_size = (
+            member.file_size if isinstance(member, zipfile.ZipInfo)
+            else member.size)
+
+    @property
+    def byte_contents(self):
+        if not self.contents_read:
+            self.contents_read = True
+            member = self.member
+            with io.open(self.archive_path, 'rb') as f:
+                if isinstance(member, zipfile.ZipInfo):
+                    # skip the local file header
+                    f.seek(member.header_offset)
+                    header = f.read(30)
+                    name_size, extra_size = struct.unpack(
+                        '<2H', header[26:30])
+                    f.seek(name_size + extra_size, io.SEEK_CUR)
+                    contents = f.read(member.compress_size)
+                    if member.compress_type == zipfile.ZIP_DEFLATED:
+                        contents = zlib.decompress(contents, -15)
+                    elif member.compress_type == zipfile.ZIP_BZIP2:
+                        contents = bz2.decompress(contents)
+                else:
+                    f.seek(member.offset_data)
+                    contents = f.read(member.size)
+            self._byte_contents = contents
+            self.member = None
+        return self._byte_contents
+
+    def set_contents(self, contents, encoding=None):
+        self.contents_read = True
+        self.member = None
+        super(FakeFileFromArchive, self).set_contents(contents, encoding)
+
+    def is_large_file(self):
+        """The contents are never faked."""
+        return False
+
+
 class FakeDirectory(FakeFile):
     """Provides the appearance of a real directory."""
 
@@ -609,6 +827,13 @@ class FakeDirectory(FakeFile):
         # directories have the link count of contained entries,
         # inclusing '.' and '..'
         self.st_nlink += 1
+        # sorted lists of the entries by inode and by name, created
+        # on first use of the ordered access, and maintained from then on
+        self._ino_index = None
+        self._name_index = None
+        # the number of iterators over the current contents dictionary;
+        # if not 0, the dictionary is copied before it is changed
+        self._contents_readers = 0
 
     def set_contents(self, contents, encoding=None):
         raise self.filesystem.raise_os_error(errno.EISDIR, self.path)
@@ -618,13 +843,74 @@ class FakeDirectory(FakeFile):
         """Return the list of contained directory entries."""
         return self.byte_contents
 
+    def shared_contents(self):
+        """Return the contained directory entries for iterating over them.
+        The returned dictionary is not changed afterwards: if the directory
+        is changed before `release_contents()` is called, the changes are
+        made in a copy of the dictionary (copy on write). This way,
+        iterating over the entries does not copy them, and is not affected
+        by concurrent changes of the directory.
+        """
+        contents = self.contents
+        self._contents_readers += 1
+        return contents
+
+    def release_contents(self, contents):
+        """Release the dictionary returned by `shared_contents()` after
+        the iteration over it is done."""
+        if contents is self.byte_contents and self._contents_readers:
+            self._contents_readers -= 1
+
+    def _writable_contents(self):
+        contents = self.contents
+        if self._contents_readers:
+            contents = self._byte_contents = contents.copy()
+            self._contents_readers = 0
+        return contents
+
     @property
     def ordered_dirs(self):
         """Return the list of contained directory entry names ordered by
         creation order.
         """
-        return [item[0] for item in sorted(
-            self.byte_contents.items(), key=lambda entry: entry[1].st_ino)]
+        return [name for _, name in self._ordered_index(by_name=False)]
+
+    def ordered_entries(self, by_name=False, start=None):
+        """Iterate over the names of the contained directory entries in
+        creation order, or sorted by name.
+        Changes of the directory during the iteration are taken into
+        account: removed entries are not returned, added entries are
+        returned if they are sorted after the current position.
+
+        Args:
+            by_name: If `True`, the entries are sorted by name, otherwise
+                by creation order.
+            start: If given, the position returned with an entry by a
+                previous iteration with the same order; the iteration
+                starts after that entry, even if it has been removed
+                meanwhile. This is similar to `os.seekdir`.
+
+        Yields:
+            Tuples of the position and the name of each entry.
+        """
+        while True:
+            index = self._ordered_index(by_name)
+            pos = 0 if start is None else bisect.bisect_right(index, start)
+            if pos == len(index):
+                return
+            start = index[pos]
+            yield start, start if by_name else start[1]
+
+    def _ordered_index(self, by_name):
+        contents = self.contents
+        if by_name:
+            if self._name_index is None:
+                self._name_index = sorted(contents)
+            return self._name_index
+        if self._ino_index is None:
+            self._ino_index = sorted(
+                (entry.st_ino, name) for name, entry in contents.items())
+        return self._ino_index
 
     def add_entry(self, path_object):
         """Adds a child FakeFile to this directory.
@@ -640,15 +926,23 @@ class FakeDirectory(FakeFile):
                 not self.filesystem.is_windows_fs):
             raise OSError(errno.EACCES, 'Permission Denied', self.path)
 
+        if self.filesystem.read_only_guard is not None:
+            self.filesystem.read_only_guard.check()
         path_object_name = to_string(path_object.name)
         if path_object_name in self.contents:
             self.filesystem.raise_os_error(errno.EEXIST, self.path)
 
-        self.contents[path_object_name] = path_object
-        path_object.parent_dir = self
+        self._writable_contents()[path_object_name] = path_object
+        self.filesystem.generation += 1
         if path_object.st_ino is None:
             self.filesystem.last_ino += 1
             path_object.st_ino = self.filesystem.last_ino
+        path_object.parent_dir = self
+        if self._ino_index is not None:
+            bisect.insort(self._ino_index,
+                          (path_object.st_ino, path_object_name))
+        if self._name_index is not None:
+            bisect.insort(self._name_index, path_object_name)
         self.st_nlink += 1
         path_object.st_nlink += 1
         path_object.st_dev = self.st_dev
@@ -672,13 +966,22 @@ class FakeDirectory(FakeFile):
         return self.contents[to_string(pathname_name)]
 
     def _normalized_entryname(self, pathname_name):
-        if not self.filesystem.is_case_sensitive:
-            matching_names = [name for name in self.contents
-                              if name.lower() == pathname_name.lower()]
-            if matching_names:
-                pathname_name = matching_names[0]
+        if (not self.filesystem.is_case_sensitive and
+                pathname_name not in self.contents):
+            matching_name = self._case_insensitive_entryname(pathname_name)
+            if matching_name is not None:
+                pathname_name = matching_name
         return pathname_name
 
+    def _case_insensitive_entryname(self, pathname_name):
+        """Return the name of the first entry matching `pathname_name`
+        ignoring the case, or `None` if there is none."""
+        lower_name = pathname_name.lower()
+        for name in self.contents:
+            if name.lower() == lower_name:
+                return name
+        return None
+
     def remove_entry(self, pathname_name, recursive=True):
         """Removes the specified child file or directory.
 
@@ -693,6 +996,8 @@ class FakeDirectory(FakeFile):
             OSError: if user lacks permission to delete the file,
                 or (Windows only) the file is open.
         """
+        if self.filesystem.read_only_guard is not None:
+            self.filesystem.read_only_guard.check()
         pathname_name = self._normalized_entryname(pathname_name)
         entry = self.get_entry(pathname_name)
         if self.filesystem.is_windows_fs:
@@ -706,8 +1011,8 @@ class FakeDirectory(FakeFile):
                 self.filesystem.raise_os_error(errno.EACCES, pathname_name)
 
         if recursive and isinstance(entry, FakeDirectory):
-            while entry.contents:
-                entry.remove_entry(list(entry.contents)[0])
+            for name in list(entry.contents):
+                entry.remove_entry(name)
         elif entry.st_nlink == 1:
             self.filesystem.change_disk_usage(
                 -entry.size, pathname_name, entry.st_dev)
@@ -716,7 +1021,13 @@ class FakeDirectory(FakeFile):
         entry.st_nlink -= 1
         assert entry.st_nlink >= 0
 
-        del self.contents[to_string(pathname_name)]
+        pathname_name = to_string(pathname_name)
+        if self._ino_index is not None:
+            _remove_sorted(self._ino_index, (entry.st_ino, pathname_name))
+        if self._name_index is not None:
+            _remove_sorted(self._name_index, pathname_name)
+        del self._writable_contents()[pathname_name]
+        self.filesystem.generation += 1
 
     @property
     def size(self):
@@ -739,13 +1050,30 @@ class FakeDirectory(FakeFile):
         return False
 
     def __str__(self):
-        description = super(FakeDirectory, self).__str__() + ':\n'
-        for item in self.contents:
-            item_desc = self.contents[item].__str__()
-            for line in item_desc.split('\n'):
-                if line:
-                    description = description + '  ' + line + '\n'
-        return description
+        # the lines are collected iteratively to avoid repeated
+        # concatenation of the descriptions of large trees
+        lines = [super(FakeDirectory, self).__str__() + ':']
+        directories = [(iter(self.contents.values()), '  ')]
+        while directories:
+            entries, indent = directories[-1]
+            for entry in entries:
+                if isinstance(entry, FakeDirectory):
+                    lines.append(
+                        indent + super(FakeDirectory, entry).__str__() + ':')
+                    directories.append((iter(entry.contents.values()),
+                                        indent + '  '))
+                    break
+                lines.append(indent + str(entry))
+            else:
+                directories.pop()
+        return '\n'.join(lines) + '\n'
+
+
+def _remove_sorted(items, item):
+    """Remove `item` from the sorted list `items`, if it is contained."""
+    pos = bisect.bisect_left(items, item)
+    if pos < len(items) and items[pos] == item:
+        del items[pos]
 
 
 Deprecator.add(FakeDirectory, FakeDirectory.add_entry, 'AddEntry')
@@ -754,6 +1082,252 @@ Deprecator.add(FakeDirectory, FakeDirectory.set_contents, 'SetContents')
 Deprecator.add(FakeDirectory, FakeDirectory.remove_entry, 'RemoveEntry')
 
 
+def _entry_stat(entry):
+    """Return the stat result of the real directory entry `entry`."""
+    return entry.stat()
+
+
+# the part of the stat result of a real file used for the fake file
+_RealFileStat = namedtuple('_RealFileStat', [
+    'st_mode', 'st_uid', 'st_gid', 'st_size',
+    'st_atime_ns', 'st_mtime_ns', 'st_ctime_ns'])
+
+
+def _scan_real_directory(real_path, cache, unstated):
+    """Return the entries of the real directory `real_path` as lists of
+    name, kind ('f', 'd' or 'l') and the stat result fields or the link
+    target. The entries are taken from `cache` if it contains them,
+    otherwise the directory is scanned, and the entries of files which
+    have still to be stat'ed are appended with their `os.DirEntry` to
+    `unstated`.
+    """
+    entries = cache.get(real_path) if cache else None
+    if entries is None:
+        entries = []
+        for entry in os.scandir(real_path):
+            if entry.is_symlink():
+                entries.append([entry.name, 'l', os.readlink(entry.path)])
+            elif entry.is_dir():
+                entries.append([entry.name, 'd', None])
+            else:
+                entries.append([entry.name, 'f', None])
+                unstated.append((entry, entries[-1]))
+        if cache:
+            cache.put(real_path, entries)
+    return entries
+
+
+def _stat_real_entries(unstated, workers):
+    """Set the stat result fields of the `unstated` file entries, using
+    a pool of `workers` threads if more than one worker is given."""
+    if workers is not None and workers > 1 and len(unstated) > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            stats = list(executor.map(_entry_stat,
+                                      [e for e, _ in unstated]))
+    else:
+        stats = [entry.stat() for entry, _ in unstated]
+    for (_, entry), real_stat in zip(unstated, stats):
+        entry[2] = [getattr(real_stat, field)
+                    for field in _RealFileStat._fields]
+
+
+class _RealDirectoryCache:
+    """Persistent cache of the entries of real directories read by
+    `FakeFilesystem.add_real_directory()`.
+
+    The entries of each directory are stored in a JSON file together with
+    the inode and the modification time of the directory, and are reused
+    as long as these have not changed. Changes to the contents of a file
+    that do not change its directory are not detected.
+    """
+
+    version = 1
+
+    def __init__(self, cache_file, source_path):
+        """
+        Args:
+            cache_file: The path of the cache file in the real file system.
+                It is created if it does not exist, and ignored if it
+                cannot be read.
+            source_path: The real directory tree that is read. The cached
+                entries of directories in this tree that are not read
+                again are removed on saving.
+        """
+        self.cache_file = cache_file
+        self.source_path = source_path
+        self.directories = {}
+        self.keys = {}
+        self.changed = False
+        try:
+            with io.open(cache_file, encoding='utf8') as f:
+                data = json.load(f)
+            if data['version'] == self.version:
+                self.directories = data['directories']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def get(self, real_path):
+        """Return the cached entries of the real directory at `real_path`
+        as a list of `[name, kind, value]` lists, or `None` if the
+        directory is not cached or has changed.
+
+        Raises:
+            OSError: if the directory cannot be stat'ed.
+        """
+        real_stat = os.stat(real_path)
+        key = [real_stat.st_ino, real_stat.st_mtime_ns]
+        self.keys[real_path] = key
+        cached = self.directories.get(real_path)
+        if cached is not None and cached['key'] == key:
+            return cached['entries']
+        return None
+
+    def put(self, real_path, entries):
+        """Store the entries of the real directory at `real_path`, which
+        has been looked up using `get()` before."""
+        self.directories[real_path] = {'key': self.keys[real_path],
+                                       'entries': entries}
+        self.changed = True
+
+    def save(self):
+        """Write the cache file, if any entries have changed. Directories
+        under the source path which have not been looked up are removed.
+        """
+        prefix = os.path.join(self.source_path, '')
+        for path in list(self.directories):
+            if path not in self.keys and (path == self.source_path or
+                                          path.startswith(prefix)):
+                del self.directories[path]
+                self.changed = True
+        if not self.changed:
+            return
+        temp_file = '%s.%d.tmp' % (self.cache_file, os.getpid())
+        with io.open(temp_file, 'w', encoding='utf8') as f:
+            json.dump({'version': self.version,
+                       'directories': self.directories}, f)
+        os.replace(temp_file, self.cache_file)
+
+
+# the format identifier of the archives written by `FakeFilesystem.dump()`
+_ARCHIVE_FORMAT = 'pyfakefs-archive'
+_ARCHIVE_VERSION = 1
+# the format identifier of the images written by
+# `FakeFilesystem.dump_image()`
+_IMAGE_FORMAT = 'pyfakefs-image'
+_IMAGE_VERSION = 1
+# the maximum number of entries and the size of the contents stored
+# in one chunk of an archive
+_ARCHIVE_CHUNK_ENTRIES = 1000
+_ARCHIVE_CHUNK_SIZE = 1 << 20
+# the file signatures and the open functions of the supported
+# compression methods
+_ARCHIVE_COMPRESSIONS = {'gz': (b'\x1f\x8b', gzip.open)}
+if bz2 is not None:
+    _ARCHIVE_COMPRESSIONS['bz2'] = (b'BZh', bz2.open)
+if lzma is not None:
+    _ARCHIVE_COMPRESSIONS['xz'] = (b'\xfd7zXZ\x00', lzma.open)
+
+
+def _archive_record(parent_index, name, file_object):
+    """Return the archive record of `file_object`, located under `name`
+    in the directory with the record index `parent_index`. The name may
+    differ from the name of the file object for hard links."""
+    stat_result = file_object.stat_result
+    if S_ISDIR(stat_result.st_mode):
+        data = None
+    elif file_object.is_large_file():
+        data = stat_result.st_size
+    else:
+        data = file_object.byte_contents
+    return (parent_index, name, stat_result.st_mode,
+            stat_result.st_uid, stat_result.st_gid,
+            stat_result.st_atime_ns, stat_result.st_mtime_ns,
+            stat_result.st_ctime_ns, data, file_object.xattr or None,
+            file_object.encoding)
+
+
+def _set_archive_metadata(file_object, record):
+    """Set the owner, times and extended attributes of `file_object`
+    from its archive record."""
+    stat_result = file_object.stat_result
+    (stat_result.st_uid, stat_result.st_gid, stat_result.st_atime_ns,
+     stat_result.st_mtime_ns, stat_result.st_ctime_ns) = record[3:8]
+    if record[9]:
+        file_object.xattr = dict(record[9])
+
+
+# the file types of special tar archive members
+_TAR_SPECIAL_TYPES = {tarfile.CHRTYPE: S_IFCHR, tarfile.BLKTYPE: S_IFBLK,
+                      tarfile.FIFOTYPE: S_IFIFO}
+
+
+def _archive_member_components(member_name):
+    """Return the path components of an archive member name relative to
+    the target directory."""
+    components = [component for component in member_name.split('/')
+                  if component not in ('', '.')]
+    if '..' in components:
+        raise ValueError('Archive member %s is outside of the target '
+                         'directory' % member_name)
+    return tuple(components)
+
+
+def _tar_archive_members(tar_file, lazy_read):
+    """Yield the name, mode, modification time, contents and hard link
+    target of the members of `tar_file`. If `lazy_read` is set, the
+    `TarInfo` object is yielded instead of the contents of regular files.
+    """
+    for member in tar_file:
+        if member.islnk():
+            yield member.name, None, None, None, member.linkname
+        elif member.isdir():
+            yield (member.name, S_IFDIR | member.mode, member.mtime,
+                   None, None)
+        elif member.issym():
+            yield (member.name, S_IFLNK | PERM_DEF, member.mtime,
+                   member.linkname, None)
+        elif member.isreg():
+            if lazy_read and not member.issparse():
+                contents = member
+            else:
+                contents = tar_file.extractfile(member).read()
+            yield (member.name, S_IFREG | member.mode, member.mtime,
+                   contents, None)
+        elif member.type in _TAR_SPECIAL_TYPES:
+            yield (member.name, _TAR_SPECIAL_TYPES[member.type] | member.mode,
+                   member.mtime, None, None)
+
+
+def _zip_archive_members(zip_file, lazy_read):
+    """Yield the name, mode, modification time, contents and hard link
+    target of the members of `zip_file`. If `lazy_read` is set, the
+    `ZipInfo` object is yielded instead of the contents of regular files
+    that can be read directly from the archive file.
+    """
+    lazy_compressions = [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+    if bz2 is not None:
+        lazy_compressions.append(zipfile.ZIP_BZIP2)
+    for info in zip_file.infolist():
+        # the Unix mode is only set for archives created under Posix
+        st_mode = info.external_attr >> 16
+        mtime = time.mktime(info.date_time + (0, 0, -1))
+        if info.filename.endswith('/'):
+            yield (info.filename, S_IFDIR | (st_mode & PERM_ALL or PERM_DEF),
+                   mtime, None, None)
+        elif S_ISLNK(st_mode):
+            yield (info.filename, S_IFLNK | PERM_DEF, mtime,
+                   to_string(zip_file.read(info)), None)
+        else:
+            if (lazy_read and not info.flag_bits & 0x1 and
+                    info.compress_type in lazy_compressions):
+                contents = info
+            else:
+                contents = zip_file.read(info)
+            yield (info.filename,
+                   S_IFREG | (st_mode & PERM_ALL or PERM_DEF_FILE),
+                   mtime, contents, None)
+
+
 class FakeDirectoryFromRealDirectory(FakeDirectory):
     """Represents a fake directory copied from the real file system.
 
@@ -761,7 +1335,7 @@ class FakeDirectoryFromRealDirectory(FakeDirectory):
     """
 
     def __init__(self, source_path, filesystem, read_only,
-                 target_path=None):
+                 target_path=None, use_mmap=False, real_stat=None):
         """
         Args:
             source_path: Full directory path.
@@ -772,12 +1346,18 @@ class FakeDirectoryFromRealDirectory(FakeDirectory):
                 only as usually.
             target_path: If given, the target path of the directory,
                 otherwise the target is the same as `source_path`.
+            use_mmap: If set, the contents of the files under the
+                directory are memory-mapped (see `FakeFileFromRealFile`).
+            real_stat: The stat result of the real directory, if already
+                known.
 
         Raises:
             OSError: if the directory does not exist in the real file system
         """
+        source_path = make_string_path(source_path)
         target_path = target_path or source_path
-        real_stat = os.stat(source_path)
+        if real_stat is None:
+            real_stat = os.stat(source_path)
         super(FakeDirectoryFromRealDirectory, self).__init__(
             name=os.path.split(target_path)[1],
             perm_bits=real_stat.st_mode,
@@ -790,6 +1370,7 @@ class FakeDirectoryFromRealDirectory(FakeDirectory):
         self.st_uid = real_stat.st_uid
         self.source_path = source_path
         self.read_only = read_only
+        self.use_mmap = use_mmap
         self.contents_read = False
 
     @property
@@ -798,20 +1379,30 @@ class FakeDirectoryFromRealDirectory(FakeDirectory):
         if not already loaded."""
         if not self.contents_read:
             self.contents_read = True
-            base = self.path
-            for entry in os.listdir(self.source_path):
-                source_path = os.path.join(self.source_path, entry)
-                target_path = os.path.join(base, entry)
-                if os.path.islink(source_path):
-                    self.filesystem.add_real_symlink(source_path, target_path)
-                elif os.path.isdir(source_path):
-                    self.filesystem.add_real_directory(
-                        source_path, self.read_only, target_path=target_path)
-                else:
-                    self.filesystem.add_real_file(
-                        source_path, self.read_only, target_path=target_path)
+            with self.filesystem._internal_changes():
+                for entry in list(os.scandir(self.source_path)):
+                    self._add_real_entry(
+                        entry.name, entry.path,
+                        None if entry.is_symlink() else entry.stat())
         return self.byte_contents
 
+    def _add_real_entry(self, name, source_path, real_stat):
+        """Add a fake entry for the real directory entry `name` at
+        `source_path`, with `real_stat` being its stat result, or `None`
+        if it is a symlink. Subdirectories are created with the same class.
+        """
+        filesystem = self.filesystem
+        if real_stat is None or S_ISLNK(real_stat.st_mode):
+            filesystem._add_real_symlink_entry(
+                self, name, os.readlink(source_path))
+        elif S_ISDIR(real_stat.st_mode):
+            self.add_entry(self.__class__(
+                source_path, filesystem, self.read_only, name,
+                self.use_mmap, real_stat))
+        else:
+            filesystem._add_real_file_entry(
+                self, source_path, real_stat, self.read_only, self.use_mmap)
+
     @property
     def size(self):
         # we cannot get the size until the contents are loaded
@@ -820,6 +1411,179 @@ class FakeDirectoryFromRealDirectory(FakeDirectory):
         return super(FakeDirectoryFromRealDirectory, self).size
 
 
+class _OverlayContents(dict):
+    """The entries of a `FakeOverlayDirectory`.
+    Looking up a missing entry by name loads this entry from the real
+    directory, while listing the entries loads all remaining entries.
+    """
+
+    def __init__(self, directory, entries=()):
+        super(_OverlayContents, self).__init__(entries)
+        self.directory = directory
+
+    def __contains__(self, name):
+        return (dict.__contains__(self, name) or
+                self.directory._load_real_entry(name) is not None)
+
+    def __getitem__(self, name):
+        try:
+            return dict.__getitem__(self, name)
+        except KeyError:
+            entry = self.directory._load_real_entry(name)
+            if entry is None:
+                raise
+            return entry
+
+    def get(self, name, default=None):
+        if name in self:
+            return dict.__getitem__(self, name)
+        return default
+
+    def __iter__(self):
+        self.directory._load_real_entries()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.directory._load_real_entries()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.directory._load_real_entries()
+        return dict.keys(self)
+
+    def values(self):
+        self.directory._load_real_entries()
+        return dict.values(self)
+
+    def items(self):
+        self.directory._load_real_entries()
+        return dict.items(self)
+
+    def copy(self):
+        return _OverlayContents(self.directory, dict.items(self))
+
+
+class FakeOverlayDirectory(FakeDirectoryFromRealDirectory):
+    """Represents a fake directory overlaying a real directory.
+
+    In contrast to `FakeDirectoryFromRealDirectory`, the entries of the
+    real directory are loaded one by one as they are looked up, and all
+    remaining entries are only loaded if the directory is listed.
+    Changes are made in the fake directory only. Removed entries are
+    remembered, so that they are not loaded again from the real directory.
+    Entries are always added under the name of the real entry, also if
+    the real or the fake file system is not case-sensitive.
+    """
+
+    # the case sensitivity of the real file system, as assumed by default
+    # for the fake file system
+    REAL_CASE_SENSITIVE = sys.platform not in ('win32', 'cygwin', 'darwin')
+
+    def __init__(self, source_path, filesystem, read_only,
+                 target_path=None, use_mmap=False, real_stat=None):
+        super(FakeOverlayDirectory, self).__init__(
+            source_path, filesystem, read_only, target_path, use_mmap,
+            real_stat)
+        self._byte_contents = _OverlayContents(self)
+        self._whiteouts = set()
+        self._loading = False
+        self._real_names = None
+
+    @property
+    def contents(self):
+        """Return the contained directory entries. Entries of the real
+        directory are loaded as they are accessed."""
+        return self.byte_contents
+
+    @property
+    def size(self):
+        return sum(entry.size for entry in dict.values(self.byte_contents))
+
+    def shared_contents(self):
+        self._load_real_entries()
+        return super(FakeOverlayDirectory, self).shared_contents()
+
+    def remove_entry(self, pathname_name, recursive=True):
+        pathname_name = to_string(self._normalized_entryname(pathname_name))
+        super(FakeOverlayDirectory, self).remove_entry(
+            pathname_name, recursive)
+        self._whiteouts.add(pathname_name)
+
+    def _load_real_entry(self, name):
+        """Load the entry `name` from the real directory, if it exists
+        there and has not been loaded or removed before.
+
+        Returns:
+            The new fake entry, or `None`.
+        """
+        if (self.contents_read or self._loading or
+                not isinstance(name, str) or name in self._whiteouts or
+                name in ('', '.', '..') or os.path.sep in name or
+                (os.path.altsep and os.path.altsep in name)):
+            return None
+        if (not self.REAL_CASE_SENSITIVE and
+                self._real_entry_names().get(name.lower()) != name):
+            # the real entry has another case, or does not exist
+            return None
+        source_path = os.path.join(self.source_path, name)
+        try:
+            real_stat = os.lstat(source_path)
+        except (OSError, ValueError):
+            return None
+        self._loading = True
+        try:
+            with self.filesystem._internal_changes():
+                self._add_real_entry(name, source_path, real_stat)
+        finally:
+            self._loading = False
+        return dict.__getitem__(self.byte_contents, name)
+
+    def _real_entry_names(self):
+        """Return the names of the real directory entries by their
+        lower-case names. The names are read once, without loading the
+        entries."""
+        if self._real_names is None:
+            names = {}
+            try:
+                real_names = os.listdir(self.source_path)
+            except OSError:
+                real_names = []
+            for name in real_names:
+                names.setdefault(name.lower(), name)
+            self._real_names = names
+        return self._real_names
+
+    def _case_insensitive_entryname(self, pathname_name):
+        """Return the name of the first entry matching `pathname_name`
+        ignoring the case, or `None` if there is none. Only the matching
+        real entry is loaded, not the whole real directory."""
+        if self.contents_read or not isinstance(pathname_name, str):
+            return super(FakeOverlayDirectory,
+                         self)._case_insensitive_entryname(pathname_name)
+        lower_name = pathname_name.lower()
+        for name in dict.keys(self.byte_contents):
+            if name.lower() == lower_name:
+                return name
+        name = self._real_entry_names().get(lower_name)
+        if name is not None and self._load_real_entry(name) is not None:
+            return name
+        return None
+
+    def _load_real_entries(self):
+        """Load all entries of the real directory that have not been
+        loaded or removed before."""
+        if self.contents_read:
+            return
+        self.contents_read = True
+        with self.filesystem._internal_changes():
+            for entry in list(os.scandir(self.source_path)):
+                if (not dict.__contains__(self.byte_contents, entry.name)
+                        and entry.name not in self._whiteouts):
+                    self._add_real_entry(
+                        entry.name, entry.path,
+                        None if entry.is_symlink() else entry.stat())
+
+
 class FakeFilesystem:
     """Provides the appearance of a real directory tree for unit testing.
 
@@ -834,6 +1598,9 @@ class FakeFilesystem:
         umask: The umask used for newly created files, see `os.umask`.
         patcher: Holds the Patcher object if created from it. Allows access
             to the patcher object if using the pytest fs fixture.
+        generation: A counter incremented with each change of the directory
+            tree, of permissions or of owners, which can be used to validate
+            cached path resolutions.
     """
 
     def __init__(self, path_separator=os.path.sep, total_size=None,
@@ -852,6 +1619,11 @@ class FakeFilesystem:
         self.path_separator = path_separator
         self.alternative_path_separator = os.path.altsep
         self.patcher = patcher
+        # set while read-only operations like `walk_parallel` are running
+        self.read_only_guard = None
+        # incremented with each change that may change the result of
+        # resolving a path, used to validate cached resolutions
+        self.generation = 0
         if path_separator != os.sep:
             self.alternative_path_separator = None
 
@@ -893,17 +1665,39 @@ class FakeFilesystem:
         return not self.is_windows_fs and not self.is_macos
 
     def reset(self, total_size=None):
-        """Remove all file system contents and reset the root."""
+        """Remove all file system contents and reset the root.
+        Files still open are closed, and an active `read_only()` guard
+        is released.
+        The OS emulation settings and the umask are not changed, and the
+        null device and the standard stream wrappers are reused, so that
+        resetting a file system is much cheaper than creating a new one.
+        """
+        self.read_only_guard = None
+        self._close_all_open_files()
         self.root = FakeDirectory(self.path_separator, filesystem=self)
         self.cwd = self.root.name
+        self.generation += 1
 
+        std_stream_wrappers = [open_files[0] for open_files
+                               in self.open_files[:3] if open_files]
         self.open_files = []
         self._free_fd_heap = []
         self.last_ino = 0
         self.last_dev = 0
         self.mount_points = {}
         self.add_mount_point(self.root.name, total_size)
-        self._add_standard_streams()
+        self._add_standard_streams(std_stream_wrappers)
+
+    def _close_all_open_files(self):
+        """Close the files left open, so that their wrappers do not
+        change the open files of the reset file system on closing."""
+        for open_files in self.open_files[3:]:
+            for file_obj in list(open_files or []):
+                try:
+                    file_obj.close()
+                except OSError:
+                    # the contents are discarded anyway
+                    pass
 
     def pause(self):
         """Pause the patching of the file system modules until `resume` is
@@ -1127,6 +1921,12 @@ class FakeFilesystem:
             OSError: if the filesystem object doesn't exist.
         """
         # stat should return the tuple representing return value of os.stat
+        return self._stat_object(
+            entry_path, follow_symlinks).stat_result.copy()
+
+    def _stat_object(self, entry_path, follow_symlinks):
+        """Return the file system object at `entry_path`, raising the
+        same errors as `stat()`."""
         file_object = self.resolve(
             entry_path, follow_symlinks,
             allow_fd=True, check_read_perm=False)
@@ -1138,8 +1938,71 @@ class FakeFilesystem:
 
         self.raise_for_filepath_ending_with_separator(
             entry_path, file_object, follow_symlinks)
+        return file_object
 
-        return file_object.stat_result.copy()
+    def stat_many(self, entry_paths, follow_symlinks=True):
+        """Return the os.stat-like tuples for the FakeFile objects of
+        several paths at once.
+        The paths are grouped by their parent directory, and each distinct
+        parent directory is resolved only once, which is much faster than
+        calling `stat()` for many paths in the same directories.
+
+        Args:
+            entry_paths: An iterable of the paths of the filesystem objects.
+            follow_symlinks: If False and a path points to a symlink,
+                the link itself is inspected instead of the linked object.
+
+        Returns:
+            A list in the order of `entry_paths`, containing for each path
+            either the FakeStatResult object, or the OSError that `stat()`
+            raises for that path.
+        """
+        parents = {}
+        # whether stat() would raise for an entry in a parent directory
+        # because the directory or one of its parents is not readable
+        readable_parents = {}
+        results = []
+        for entry_path in entry_paths:
+            found, parent, file_object = self._lookup_entry(entry_path,
+                                                            parents)
+            if (found and file_object is None and parent is not None and
+                    follow_symlinks):
+                # the entry does not exist in an existing directory
+                entry_name = self.splitpath(entry_path)[1]
+                results.append(OSError(
+                    errno.ENOENT, self._error_message(errno.ENOENT),
+                    parent.path.rstrip(self.path_separator) +
+                    self.path_separator + entry_name))
+                continue
+            if (found and file_object is not None and
+                    not (follow_symlinks and
+                         S_ISLNK(file_object.st_mode))):
+                parent_dir = file_object.parent_dir
+                try:
+                    readable = readable_parents[parent_dir]
+                except KeyError:
+                    readable = self._is_readable_parent(
+                        parent_dir, follow_symlinks)
+                    readable_parents[parent_dir] = readable
+                if readable:
+                    results.append(file_object.stat_result.copy())
+                    continue
+            # let stat() handle all other cases, including the errors
+            try:
+                results.append(self.stat(entry_path, follow_symlinks))
+            except OSError as exc:
+                results.append(exc)
+        return results
+
+    def _is_readable_parent(self, parent_dir, follow_symlinks):
+        if not follow_symlinks and not parent_dir.st_mode & PERM_READ:
+            return False
+        if not is_root():
+            try:
+                self.get_object(parent_dir.path)
+            except OSError:
+                return False
+        return True
 
     def raise_for_filepath_ending_with_separator(self, entry_path,
                                                  file_object,
@@ -1178,6 +2041,10 @@ class FakeFilesystem:
                 the link itself is affected instead of the linked object.
         """
         file_object = self.resolve(path, follow_symlinks, allow_fd=True)
+        self._change_mode(file_object, mode)
+
+    def _change_mode(self, file_object, mode):
+        """Change the permissions of `file_object` as `chmod()` does."""
         if self.is_windows_fs:
             if mode & PERM_WRITE:
                 file_object.st_mode = file_object.st_mode | 0o222
@@ -1697,11 +2564,9 @@ class FakeFilesystem:
         if component in directory.contents:
             return component, directory.contents[component]
         if not self.is_case_sensitive:
-            matching_content = [(subdir, directory.contents[subdir]) for
-                                subdir in directory.contents
-                                if subdir.lower() == component.lower()]
-            if matching_content:
-                return matching_content[0]
+            name = directory._case_insensitive_entryname(component)
+            if name is not None:
+                return name, directory.contents[name]
 
         return None, None
 
@@ -1743,6 +2608,72 @@ class FakeFilesystem:
                 return False
         return True
 
+    def exists_many(self, file_paths):
+        """Return for each of the given paths whether it points to an
+        existing file system object, as `exists()` does.
+        The paths are grouped by their parent directory, and each distinct
+        parent directory is resolved only once, which is much faster than
+        calling `exists()` for many paths in the same directories.
+
+        Args:
+            file_paths: An iterable of the paths to examine.
+
+        Returns:
+            A list of booleans in the order of `file_paths`.
+        """
+        parents = {}
+        results = []
+        for file_path in file_paths:
+            found, _, file_object = self._lookup_entry(file_path, parents)
+            if found and (file_object is None or
+                          not S_ISLNK(file_object.st_mode)):
+                results.append(file_object is not None)
+            else:
+                results.append(self.exists(file_path))
+        return results
+
+    def _lookup_entry(self, file_path, parents):
+        """Look up the entry for `file_path` in its parent directory,
+        without following a symlink at the entry itself.
+
+        Args:
+            file_path: The path of the entry.
+            parents: A dictionary caching the parent directory objects
+                by parent path, `None` if the parent is not a directory.
+
+        Returns:
+            A tuple of a flag, the parent directory or `None` if it does
+            not exist, and the entry or `None` if the entry does not
+            exist. The flag is `False` if the path cannot be looked up
+            that way, for example a path ending with a separator, and has
+            to be handled by the single path functions.
+        """
+        if not is_unicode_string(file_path):
+            return False, None, None
+        parent_path, name = self.splitpath(file_path)
+        if (not name or name in ('.', '..') or
+                name == self.splitpath(self.dev_null.name)[1] or
+                self.path_separator in name or
+                self.alternative_path_separator and
+                self.alternative_path_separator in name or
+                self.is_windows_fs and
+                ':' in self.splitdrive(file_path)[1]):
+            return False, None, None
+        try:
+            parent = parents[parent_path]
+        except KeyError:
+            try:
+                parent = self.resolve(parent_path or '.',
+                                      check_read_perm=False)
+                if not S_ISDIR(parent.st_mode):
+                    parent = None
+            except OSError:
+                parent = None
+            parents[parent_path] = parent
+        if parent is None:
+            return True, None, None
+        return True, parent, self._directory_content(parent, name)[1]
+
     def resolve_path(self, file_path, allow_fd=False, raw_io=True):
         """Follow a path, resolving symlinks.
 
@@ -2336,7 +3267,8 @@ class FakeFilesystem:
             file_path, st_mode, contents, st_size, create_missing_dirs,
             apply_umask, encoding, errors, side_effect=side_effect)
 
-    def add_real_file(self, source_path, read_only=True, target_path=None):
+    def add_real_file(self, source_path, read_only=True, target_path=None,
+                      use_mmap=False):
         """Create `file_path`, including all the parent directories along the
         way, for an existing real file. The contents of the real file are read
         only on demand.
@@ -2348,6 +3280,10 @@ class FakeFilesystem:
                 the fake file only.
             target_path: If given, the path of the target direction,
                 otherwise it is equal to `source_path`.
+            use_mmap: If `True`, the real file is memory-mapped on first
+                access instead of being read into memory, and reading the
+                fake file reads from the mapping. The contents are only
+                copied into memory if the fake file is written.
 
         Returns:
             the newly created FakeFile object.
@@ -2373,6 +3309,7 @@ class FakeFilesystem:
         if read_only:
             fake_file.st_mode &= 0o777444
         fake_file.file_path = source_path
+        fake_file.use_mmap = use_mmap
         self.change_disk_usage(fake_file.size, fake_file.name,
                                fake_file.st_dev)
         return fake_file
@@ -2409,7 +3346,8 @@ class FakeFilesystem:
             return self.create_symlink(source_path, target)
 
     def add_real_directory(self, source_path, read_only=True, lazy_read=True,
-                           target_path=None):
+                           target_path=None, use_mmap=False, workers=None,
+                           cache_file=None):
         """Create a fake directory corresponding to the real directory at the
         specified path.  Add entries in the fake directory corresponding to
         the entries in the real directory.  Symlinks are supported.
@@ -2429,6 +3367,16 @@ class FakeFilesystem:
                   size in your test
             target_path: If given, the target directory, otherwise,
                 the target directory is the same as `source_path`.
+            use_mmap: If set, the contents of the files are memory-mapped
+                instead of being read into memory (see `add_real_file()`).
+            workers: If `lazy_read` is not set, the number of worker
+                threads used to stat the real files; by default, the files
+                are stat'ed in the calling thread.
+            cache_file: If `lazy_read` is not set, the path of a file in the
+                real file system used to cache the directory entries and
+                file stats of the directory tree between test runs. Only
+                directories that have changed since the last run are read
+                again. Changes of the files alone are not detected.
 
         Returns:
             the newly created FakeDirectory object.
@@ -2436,7 +3384,10 @@ class FakeFilesystem:
         Raises:
             OSError: if the directory does not exist in the real file system.
             OSError: if the directory already exists in the fake file system.
+            ValueError: if `workers` is smaller than 1.
         """
+        if workers is not None and workers < 1:
+            raise ValueError('The number of workers must be greater than 0')
         source_path = self._path_without_trailing_separators(source_path)
         if not os.path.exists(source_path):
             self.raise_os_error(errno.ENOENT, source_path)
@@ -2448,31 +3399,132 @@ class FakeFilesystem:
             else:
                 parent_dir = self.create_dir(parent_path)
             new_dir = FakeDirectoryFromRealDirectory(
-                source_path, self, read_only, target_path)
+                source_path, self, read_only, target_path, use_mmap)
             parent_dir.add_entry(new_dir)
         else:
             new_dir = self.create_dir(target_path)
-            for base, _, files in os.walk(source_path):
-                new_base = os.path.join(new_dir.path,
-                                        os.path.relpath(base, source_path))
-                for fileEntry in os.listdir(base):
-                    abs_fileEntry = os.path.join(base, fileEntry)
-
-                    if not os.path.islink(abs_fileEntry):
-                        continue
-
-                    self.add_real_symlink(
-                        abs_fileEntry, os.path.join(new_base, fileEntry))
-                for fileEntry in files:
-                    path = os.path.join(base, fileEntry)
-                    if os.path.islink(path):
-                        continue
-                    self.add_real_file(path,
-                                       read_only,
-                                       os.path.join(new_base, fileEntry))
+            self._add_real_directory_tree(
+                make_string_path(source_path), new_dir, read_only,
+                use_mmap, workers, cache_file)
         return new_dir
 
-    def add_real_paths(self, path_list, read_only=True, lazy_dir_read=True):
+    def add_real_overlay(self, source_path, target_path=None,
+                         read_only=True, use_mmap=False):
+        """Create a fake directory overlaying the real directory at the
+        specified path. Nothing is read from the real directory upfront:
+        looking up a path under the directory loads only the real entries
+        in the path, and listing a directory loads its entries. All changes
+        are made in the fake file system only, and removed entries are not
+        loaded again from the real directory.
+
+        Args:
+            source_path: The path to the existing directory.
+            target_path: If given, the target directory, otherwise,
+                the target directory is the same as `source_path`.
+            read_only: If set, all files under the directory are treated as
+                read-only, e.g. a write access raises an exception;
+                otherwise, writing to the files changes the fake files only
+                as usually.
+            use_mmap: If set, the contents of the files are memory-mapped
+                instead of being read into memory (see `add_real_file()`).
+
+        Returns:
+            the newly created FakeOverlayDirectory object.
+
+        Raises:
+            OSError: if the directory does not exist in the real file system.
+            OSError: if the directory already exists in the fake file system.
+        """
+        source_path = self._path_without_trailing_separators(source_path)
+        if not os.path.exists(source_path):
+            self.raise_os_error(errno.ENOENT, source_path)
+        target_path = target_path or source_path
+        parent_path = os.path.split(target_path)[0]
+        if self.exists(parent_path):
+            parent_dir = self.get_object(parent_path)
+        else:
+            parent_dir = self.create_dir(parent_path)
+        new_dir = FakeOverlayDirectory(
+            source_path, self, read_only, target_path, use_mmap)
+        parent_dir.add_entry(new_dir)
+        return new_dir
+
+    def _add_real_directory_tree(self, source_path, target_dir, read_only,
+                                 use_mmap, workers, cache_file=None):
+        """Add the entries of the real directory tree at `source_path` to
+        the fake directory `target_dir`.
+        The tree is read using `os.scandir`, and the new entries are added
+        directly to their parent directories, without resolving their paths.
+        If `workers` is greater than 1, the real files are stat'ed using a
+        pool of worker threads. If `cache_file` is given, the entries of
+        unchanged directories are taken from the cache file instead.
+        """
+        cache = None
+        if cache_file is not None:
+            cache = _RealDirectoryCache(cache_file, source_path)
+        files = []
+        unstated = []
+        directories = [(source_path, target_dir)]
+        while directories:
+            real_path, fake_dir = directories.pop()
+            try:
+                entries = _scan_real_directory(real_path, cache, unstated)
+            except OSError:
+                # non-readable directories are skipped, as in os.walk
+                continue
+            self._attach_real_entries(real_path, fake_dir, entries,
+                                      directories, files)
+
+        _stat_real_entries(unstated, workers)
+        if cache:
+            cache.save()
+
+        for file_path, entry, fake_dir in files:
+            self._add_real_file_entry(fake_dir, file_path,
+                                      _RealFileStat(*entry[2]),
+                                      read_only, use_mmap)
+
+    def _attach_real_entries(self, real_path, fake_dir, entries,
+                             directories, files):
+        """Add the symlinks and subdirectories in the scanned `entries` of
+        the real directory `real_path` to the fake directory `fake_dir`.
+        The new subdirectories are appended to `directories`, and the
+        files, which are added after they have been stat'ed, to `files`.
+        """
+        for entry in entries:
+            name, kind, value = entry
+            if kind == 'l':
+                self._add_real_symlink_entry(fake_dir, name, value)
+            elif kind == 'd':
+                sub_dir = FakeDirectory(name, filesystem=self)
+                fake_dir.add_entry(sub_dir)
+                directories.append((os.path.join(real_path, name), sub_dir))
+            else:
+                files.append((os.path.join(real_path, name), entry,
+                              fake_dir))
+
+    def _add_real_file_entry(self, directory, source_path, real_stat,
+                             read_only, use_mmap):
+        """Add a fake file for the real file at `source_path` with the
+        stat result `real_stat` to the fake `directory`.
+        """
+        fake_file = FakeFileFromRealFile(source_path, filesystem=self)
+        fake_file.stat_result.set_from_stat_result(real_stat)
+        if read_only:
+            fake_file.st_mode &= 0o777444
+        fake_file.file_path = source_path
+        fake_file.use_mmap = use_mmap
+        directory.add_entry(fake_file)
+
+    def _add_real_symlink_entry(self, directory, name, link_target):
+        """Add a fake symlink `name` pointing to `link_target`
+        to the fake `directory`."""
+        link = FakeFile(name, S_IFLNK | PERM_DEF, filesystem=self)
+        directory.add_entry(link)
+        link._set_initial_contents(link_target)
+
+    def add_real_paths(self, path_list, read_only=True, lazy_dir_read=True,
+                       use_mmap=False, workers=None, cache_file=None):
         """This convenience method adds multiple files and/or directories from
         the real file system to the fake file system. See `add_real_file()` and
         `add_real_directory()`.
@@ -2486,18 +3538,542 @@ class FakeFilesystem:
                 files only as usually.
             lazy_dir_read: Uses lazy reading of directory contents if set
                 (see `add_real_directory`)
+            use_mmap: If set, the contents of the files are memory-mapped
+                instead of being read into memory (see `add_real_file()`).
+            workers: The number of worker threads used to stat the files
+                in directories that are not read lazily
+                (see `add_real_directory`)
+            cache_file: The path of a file caching the entries of the
+                directories that are not read lazily
+                (see `add_real_directory`)
 
         Raises:
             OSError: if any of the files and directories in the list
                 does not exist in the real file system.
             OSError: if any of the files and directories in the list
                 already exists in the fake file system.
+            ValueError: if `workers` is smaller than 1.
         """
         for path in path_list:
             if os.path.isdir(path):
-                self.add_real_directory(path, read_only, lazy_dir_read)
+                self.add_real_directory(path, read_only, lazy_dir_read,
+                                        use_mmap=use_mmap, workers=workers,
+                                        cache_file=cache_file)
+            else:
+                self.add_real_file(path, read_only, use_mmap=use_mmap)
+
+    def dump(self, archive_path, compression=None):
+        """Write the complete fake file system into an archive file in the
+        real file system, which can be loaded again using `load()`.
+
+        The archive contains all directories, files, symlinks and hard links
+        with their permissions, owners, times and extended attributes, and
+        the mount points with their sizes. Large files (see
+        `set_large_file_size()`) are stored without contents. Open files
+        and side effects are not stored.
+
+        Args:
+            archive_path: The path of the archive file in the real
+                file system.
+            compression: If given, the compression method of the archive
+                ('gz', 'bz2' or 'xz').
+
+        Raises:
+            OSError: if the archive file cannot be written.
+            ValueError: if the compression method is not supported.
+        """
+        if compression is not None and (
+                compression not in _ARCHIVE_COMPRESSIONS):
+            raise ValueError('Unsupported compression: %s' % compression)
+        mount_points = [(path, mount_point['total_size'])
+                        for path, mount_point in self.mount_points.items()]
+        with io.open(archive_path, 'wb') as f:
+            if compression is not None:
+                f = _ARCHIVE_COMPRESSIONS[compression][1](f, 'wb')
+            with f:
+                pickler = pickle.Pickler(f, protocol=4)
+                pickler.dump({'format': _ARCHIVE_FORMAT,
+                              'version': _ARCHIVE_VERSION,
+                              'mount_points': mount_points})
+                for chunk in self._archive_chunks():
+                    pickler.dump(chunk)
+                pickler.dump(None)
+
+    def _archive_chunks(self):
+        """Yield the archive records of all file system entries in chunks
+        of limited length and contents size."""
+        chunk = []
+        chunk_size = 0
+        # the root directory has the index 0, all other entries
+        # are indexed in the order of their records
+        indexes = {id(self.root): 0}
+        record_count = 0
+        directories = [self.root]
+        while directories:
+            directory = directories.pop()
+            parent_index = indexes[id(directory)]
+            sub_directories = []
+            for name, entry in directory.contents.items():
+                if id(entry) in indexes:
+                    # another hard link to an archived file
+                    record = (parent_index, name, indexes[id(entry)])
+                else:
+                    record = _archive_record(parent_index, name, entry)
+                    if isinstance(entry, FakeDirectory):
+                        sub_directories.append(entry)
+                    if record[8] is not None and not isinstance(
+                            record[8], int):
+                        chunk_size += len(record[8])
+                record_count += 1
+                indexes.setdefault(id(entry), record_count)
+                chunk.append(record)
+                if (len(chunk) >= _ARCHIVE_CHUNK_ENTRIES or
+                        chunk_size >= _ARCHIVE_CHUNK_SIZE):
+                    yield chunk
+                    chunk = []
+                    chunk_size = 0
+            directories.extend(reversed(sub_directories))
+        if chunk:
+            yield chunk
+
+    def load(self, archive_path):
+        """Add the contents of an archive written by `dump()` to the fake
+        file system.
+
+        The archive is read in chunks, and the entries are added directly
+        to their parent directories. Existing directories are merged with
+        the directories in the archive, and missing mount points are added.
+
+        .. note:: The archive contains pickled data, so only load archives
+          from trusted sources.
+
+        Args:
+            archive_path: The path of the archive file in the real
+                file system.
+
+        Raises:
+            OSError: if the archive file cannot be read, or if a file in
+                the archive already exists in the fake file system.
+            ValueError: if the file is not an archive written by `dump()`.
+        """
+        with io.open(archive_path, 'rb') as f:
+            signature = f.peek(6)[:6]
+            for magic, open_function in _ARCHIVE_COMPRESSIONS.values():
+                if signature.startswith(magic):
+                    f = open_function(f, 'rb')
+                    break
+            with f:
+                unpickler = pickle.Unpickler(f)
+                try:
+                    header = unpickler.load()
+                except (pickle.UnpicklingError, EOFError):
+                    header = None
+                if (not isinstance(header, dict) or
+                        header.get('format') != _ARCHIVE_FORMAT or
+                        header.get('version') != _ARCHIVE_VERSION):
+                    raise ValueError('%s is not a pyfakefs archive' %
+                                     archive_path)
+                self._load_archive(header, unpickler)
+
+    def dump_image(self, image_path):
+        """Write the complete fake file system into an image file in the
+        real file system, which can be loaded using `load_image()`.
+
+        The image contains the same entries as an archive written by
+        `dump()`, but the file contents are stored uncompressed, so that
+        they can be memory-mapped when the image is loaded. The image file
+        is replaced atomically, so that processes which have loaded an
+        existing image are not affected.
+
+        Args:
+            image_path: The path of the image file in the real file system.
+
+        Raises:
+            OSError: if the image file cannot be written.
+        """
+        mount_points = [(path, mount_point['total_size'])
+                        for path, mount_point in self.mount_points.items()]
+        chunks = []
+        temp_file = '%s.%d.tmp' % (image_path, os.getpid())
+        with io.open(temp_file, 'wb') as f:
+            # the file contents are written first, followed by the pickled
+            # records and the offset of the records
+            for chunk in self._archive_chunks():
+                for i, record in enumerate(chunk):
+                    if (len(record) > 3 and S_ISREG(record[2]) and
+                            isinstance(record[8], bytes)):
+                        offset = f.tell()
+                        f.write(record[8])
+                        chunk[i] = (record[:8] + ((offset, len(record[8])),)
+                                    + record[9:])
+                chunks.append(chunk)
+            records_offset = f.tell()
+            pickler = pickle.Pickler(f, protocol=4)
+            pickler.dump({'format': _IMAGE_FORMAT,
+                          'version': _IMAGE_VERSION,
+                          'mount_points': mount_points})
+            for chunk in chunks:
+                pickler.dump(chunk)
+            pickler.dump(None)
+            f.write(struct.pack('<Q', records_offset))
+        os.replace(temp_file, image_path)
+
+    def load_image(self, image_path):
+        """Add the contents of an image written by `dump_image()` to the
+        fake file system.
+
+        The image file is memory-mapped read-only, and the contents of the
+        loaded files are read from the mapping until they are written.
+        Several processes loading the same image, for example the workers
+        of `pytest-xdist`, share the memory of the file contents.
+
+        .. note:: The image contains pickled data, so only load images
+          from trusted sources.
+
+        Args:
+            image_path: The path of the image file in the real file system.
+
+        Raises:
+            OSError: if the image file cannot be read, or if a file in
+                the image already exists in the fake file system.
+            ValueError: if the file is not an image written by
+                `dump_image()`.
+        """
+        with io.open(image_path, 'rb') as f:
+            try:
+                image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                image = b''
+            header = None
+            records_offset = (struct.unpack('<Q', image[-8:])[0]
+                              if len(image) > 8 else len(image))
+            if records_offset < len(image) - 8:
+                f.seek(records_offset)
+                unpickler = pickle.Unpickler(f)
+                try:
+                    header = unpickler.load()
+                except Exception:
+                    # any data may be found at an invalid offset
+                    pass
+            if (not isinstance(header, dict) or
+                    header.get('format') != _IMAGE_FORMAT or
+                    header.get('version') != _IMAGE_VERSION):
+                raise ValueError('%s is not a pyfakefs image' % image_path)
+            self._load_archive(header, unpickler, image)
+
+    def _load_archive(self, header, unpickler, image=None):
+        for path, total_size in sorted(header['mount_points']):
+            if path in self.mount_points:
+                self.set_disk_usage(total_size, path)
+            else:
+                self.add_mount_point(path, total_size)
+
+        entries = [self.root]
+        loaded_dirs = []
+        for chunk in iter(unpickler.load, None):
+            for record in chunk:
+                parent_dir = entries[record[0]]
+                name = record[1]
+                if len(record) == 3:
+                    # the name of the file object is the name of
+                    # the last added link, as in `link()`
+                    entry = entries[record[2]]
+                    entry.name = name
+                    parent_dir.add_entry(entry)
+                elif S_ISDIR(record[2]):
+                    entry = parent_dir.contents.get(name)
+                    if not isinstance(entry, FakeDirectory):
+                        entry = FakeDirectory(name, filesystem=self)
+                        parent_dir.add_entry(entry)
+                    # the metadata is set after adding the contents
+                    loaded_dirs.append((entry, record))
+                else:
+                    data = record[8]
+                    if isinstance(data, int):
+                        entry = FakeFile(name, record[2], None, self,
+                                         record[10])
+                        entry.stat_result.st_size = data
+                    elif isinstance(data, tuple):
+                        # the offset and size of the contents in the image
+                        entry = FakeFileFromImage(name, record[2], image,
+                                                  data[0], data[1], self,
+                                                  record[10])
+                    else:
+                        entry = FakeFile(name, record[2], data, self,
+                                         record[10])
+                    _set_archive_metadata(entry, record)
+                    parent_dir.add_entry(entry)
+                entries.append(entry)
+        for directory, record in reversed(loaded_dirs):
+            directory.st_mode = record[2]
+            _set_archive_metadata(directory, record)
+
+    def add_archive(self, archive, target_path, lazy_read=False):
+        """Add the contents of a tar or zip archive to the fake file system
+        under `target_path`.
+
+        The archive members are added directly as fake files, directories
+        and symlinks with their permissions and modification times, and
+        hard links in tar archives are added as hard links. Missing parent
+        directories are created, and existing directories are merged with
+        the directories in the archive. Tar archives may be compressed with
+        any compression method supported by `tarfile`.
+
+        Args:
+            archive: The path of the archive file in the real file system,
+                or a binary file object of the archive.
+            target_path: The path of the directory in the fake file system
+                where the archive contents are added. It is created if it
+                does not exist.
+            lazy_read: If `True`, the contents of the files are read from
+                the archive file on first access instead of being read
+                while adding the files. This needs the path of the archive.
+                The contents of members of compressed tar archives, and
+                of zip members that are encrypted or compressed with other
+                methods than deflate or bzip2, are always read immediately.
+
+        Returns:
+            The fake directory at `target_path`.
+
+        Raises:
+            OSError: if the archive file cannot be read, if `target_path`
+                is not a directory, or if a file in the archive already
+                exists in the fake file system.
+            ValueError: if `lazy_read` is set for an archive file object,
+                or if an archive member is outside of the target directory.
+            tarfile.TarError: if the archive is neither a tar nor a zip
+                archive.
+        """
+        if hasattr(archive, 'read'):
+            if lazy_read:
+                raise ValueError('Lazy reading needs the archive path')
+            return self._add_archive(archive, None, target_path)
+        archive_path = make_string_path(archive)
+        with io.open(archive_path, 'rb') as f:
+            return self._add_archive(
+                f, archive_path if lazy_read else None, target_path)
+
+    def _add_archive(self, archive_file, lazy_path, target_path):
+        target_path = self.absnormpath(self.make_string_path(target_path))
+        if self.exists(target_path):
+            target_dir = self.resolve(target_path)
+            if not isinstance(target_dir, FakeDirectory):
+                self.raise_os_error(errno.ENOTDIR, target_path)
+        else:
+            target_dir = self.create_dir(target_path)
+
+        seekable = archive_file.seekable()
+        if seekable and zipfile.is_zipfile(archive_file):
+            archive_file.seek(0)
+            with zipfile.ZipFile(archive_file) as zip_file:
+                self._add_archive_members(
+                    target_dir, lazy_path,
+                    _zip_archive_members(zip_file, lazy_path is not None))
+            return target_dir
+
+        if seekable:
+            archive_file.seek(0)
+        if lazy_path is not None:
+            # members of compressed archives cannot be read directly
+            signature = archive_file.read(6)
+            archive_file.seek(0)
+            if any(signature.startswith(magic) for magic, _ in
+                   _ARCHIVE_COMPRESSIONS.values()):
+                lazy_path = None
+        with tarfile.open(fileobj=archive_file,
+                          mode='r:*' if seekable else 'r|*') as tar_file:
+            self._add_archive_members(
+                target_dir, lazy_path,
+                _tar_archive_members(tar_file, lazy_path is not None))
+        return target_dir
+
+    def _add_archive_members(self, target_dir, lazy_path, members):
+        directories = {(): target_dir}
+        files = {}
+        added_dirs = []
+
+        def get_directory(components):
+            directory = directories.get(components)
+            if directory is None:
+                parent_dir = get_directory(components[:-1])
+                directory = parent_dir.contents.get(components[-1])
+                if not isinstance(directory, FakeDirectory):
+                    directory = FakeDirectory(components[-1],
+                                              filesystem=self)
+                    parent_dir.add_entry(directory)
+                directories[components] = directory
+            return directory
+
+        for name, st_mode, mtime, contents, link_name in members:
+            components = _archive_member_components(name)
+            if not components:
+                # the target directory itself is not changed
+                continue
+            if link_name is not None:
+                entry = files.get(_archive_member_components(link_name))
+                if entry is None:
+                    self.raise_os_error(errno.ENOENT, link_name)
+                # the name of the file object is the name of
+                # the last added link, as in `link()`
+                entry.name = components[-1]
+            elif S_ISDIR(st_mode):
+                # the metadata is set after adding the contents
+                added_dirs.append((get_directory(components),
+                                   st_mode, mtime))
+                continue
+            elif isinstance(contents, (tarfile.TarInfo, zipfile.ZipInfo)):
+                entry = FakeFileFromArchive(components[-1], lazy_path,
+                                            contents, self)
+                entry.st_mode = st_mode
+                entry.st_mtime = mtime
             else:
-                self.add_real_file(path, read_only)
+                entry = FakeFile(components[-1], st_mode, contents, self)
+                entry.st_mtime = mtime
+            get_directory(components[:-1]).add_entry(entry)
+            files[components] = entry
+        for directory, st_mode, mtime in reversed(added_dirs):
+            directory.st_mode = st_mode
+            directory.st_mtime = mtime
+
+    def _tree_entries(self, top_path):
+        """Yield the path components relative to `top_path` and the file
+        object of all entries under the directory `top_path`, parent
+        directories before their contents, without following symlinks.
+        """
+        top_dir = self.resolve(top_path)
+        if not isinstance(top_dir, FakeDirectory):
+            self.raise_os_error(errno.ENOTDIR, top_path)
+        directories = [((), top_dir)]
+        while directories:
+            components, directory = directories.pop()
+            sub_directories = []
+            for name, entry in directory.contents.items():
+                entry_components = components + (name,)
+                yield entry_components, entry
+                if isinstance(entry, FakeDirectory):
+                    sub_directories.append((entry_components, entry))
+            directories.extend(reversed(sub_directories))
+
+    def export_to(self, target_dir, path=None):
+        """Write the fake directory tree under `path` into a directory in
+        the real file system, for example to inspect it after a failed
+        test.
+
+        The entries are written one by one while walking the tree. Files
+        keep their contents and modification times, and symlinks and hard
+        links are recreated. Large files (see `set_large_file_size()`) are
+        written as empty files, and special files are not written.
+        The permissions are not exported, so that the exported tree can
+        always be read and removed.
+
+        Args:
+            target_dir: The path of the directory in the real file system.
+                It is created if it does not exist.
+            path: The path of the fake directory to export. If not given,
+                the whole fake file system is exported.
+
+        Raises:
+            OSError: if `path` is not a directory, or if an exported file
+                or symlink already exists in the real file system.
+        """
+        target_dir = make_string_path(target_dir)
+        top_path = self.absnormpath(
+            self.make_string_path(path or self.path_separator))
+        os.makedirs(target_dir, exist_ok=True)
+        # the real paths of the exported files, used for hard links
+        exported = {}
+        exported_dirs = []
+        for components, entry in self._tree_entries(top_path):
+            real_path = os.path.join(target_dir, *components)
+            if isinstance(entry, FakeDirectory):
+                os.makedirs(real_path, exist_ok=True)
+                # the times are set after adding the contents
+                exported_dirs.append((real_path, entry))
+                continue
+            if S_ISLNK(entry.st_mode):
+                os.symlink(entry.contents, real_path)
+                continue
+            if not S_ISREG(entry.st_mode):
+                continue
+            if id(entry) in exported:
+                os.link(exported[id(entry)], real_path)
+                continue
+            contents = None
+            if isinstance(entry, (FakeFileFromRealFile, FakeFileFromImage)):
+                contents = entry.mapped_contents()
+            if contents is None and not entry.is_large_file():
+                contents = entry.byte_contents
+            with io.open(real_path, 'xb') as f:
+                if contents:
+                    f.write(contents)
+            if isinstance(contents, mmap.mmap):
+                contents.close()
+            os.utime(real_path, ns=(entry.st_atime_ns, entry.st_mtime_ns))
+            exported[id(entry)] = real_path
+        for real_path, directory in reversed(exported_dirs):
+            os.utime(real_path,
+                     ns=(directory.st_atime_ns, directory.st_mtime_ns))
+
+    def snapshot(self, path=None):
+        """Return the state of all entries under `path`, which can be
+        compared with a later snapshot using `diff_snapshots()`.
+
+        Only the metadata is recorded, the file contents are not copied.
+        Changed contents are detected by a changed file size, modification
+        time or change counter of the file object.
+
+        Args:
+            path: The path of the fake directory to take the snapshot of.
+                If not given, the whole fake file system is used.
+
+        Returns:
+            A dictionary of the entry paths and their `SnapshotEntry`.
+
+        Raises:
+            OSError: if `path` is not a directory.
+        """
+        top_path = self.absnormpath(
+            self.make_string_path(path or self.path_separator))
+        prefix = top_path.rstrip(self.path_separator)
+        separator = self.path_separator
+        snapshot = {}
+        for components, entry in self._tree_entries(top_path):
+            stat_result = entry.stat_result
+            snapshot[prefix + separator + separator.join(components)] = (
+                SnapshotEntry(stat_result.st_mode, stat_result.st_size,
+                              stat_result.st_mtime_ns, stat_result.st_ino,
+                              entry.epoch))
+        return snapshot
+
+    @staticmethod
+    def diff_snapshots(old_snapshot, new_snapshot):
+        """Compare two snapshots taken by `snapshot()`.
+
+        Args:
+            old_snapshot: The earlier snapshot.
+            new_snapshot: The later snapshot.
+
+        Returns:
+            A `SnapshotDiff` with the sorted lists of `added`, `removed` and
+            `changed` paths, and the dictionary `size_changes` of the
+            changed paths with a changed size, mapped to the old and new
+            size.
+        """
+        added = sorted(path for path in new_snapshot
+                       if path not in old_snapshot)
+        removed = sorted(path for path in old_snapshot
+                         if path not in new_snapshot)
+        changed = sorted(path for path, entry in new_snapshot.items()
+                         if path in old_snapshot and
+                         old_snapshot[path] != entry)
+        size_changes = {}
+        for path in changed:
+            old_size = old_snapshot[path].st_size
+            new_size = new_snapshot[path].st_size
+            if old_size != new_size:
+                size_changes[path] = (old_size, new_size)
+        return SnapshotDiff(added, removed, changed, size_changes)
 
     def create_file_internally(self, file_path,
                                st_mode=S_IFREG | PERM_DEF_FILE,
@@ -3003,13 +4579,87 @@ class FakeFilesystem:
         directory_contents = directory.contents
         return list(directory_contents.keys())
 
+    @contextlib.contextmanager
+    def read_only(self):
+        """Context manager that makes the directory tree read-only.
+        While it is active, adding or removing file system entries raises
+        a `RuntimeError`, so that the tree can be safely read from several
+        threads. Changes of file contents are not prevented.
+        Can be nested and used concurrently from several threads.
+
+        Yields:
+            The `ReadOnlyGuard` that protects the tree.
+        """
+        with ReadOnlyGuard._lock:
+            if self.read_only_guard is None:
+                self.read_only_guard = ReadOnlyGuard()
+            guard = self.read_only_guard
+            guard.count += 1
+        try:
+            yield guard
+        finally:
+            with ReadOnlyGuard._lock:
+                guard.count -= 1
+                if not guard.count and self.read_only_guard is guard:
+                    self.read_only_guard = None
+
+    @contextlib.contextmanager
+    def _internal_changes(self):
+        """Allow internal changes of the directory tree in the current
+        thread while it is read-only (see `read_only()`), like loading
+        lazily read real directories."""
+        guard = self.read_only_guard
+        if guard is None:
+            yield
+        else:
+            with guard.changes_allowed():
+                yield
+
+    def walk_parallel(self, top, workers=None, visitor=None):
+        """Walk the directory tree at `top` using a pool of worker threads,
+        for example to validate very large fake trees.
+
+        The subtrees are distributed over the worker threads, and each
+        worker walks its subtrees top-down through the directory objects.
+        Symlinks to directories are listed in the directory names, but
+        are not followed, and non-readable directories are not listed.
+        The directory tree is read-only during the walk (see `read_only()`).
+
+        Args:
+            top: The root directory from which to begin the walk.
+            workers: The number of worker threads; defaults to the
+                number of processors plus 4, up to 32.
+            visitor: If given, a function called as
+                `visitor(path, dirs, files)` for each directory, possibly
+                concurrently from several threads. Removing names from
+                `dirs` prevents walking into these directories.
+
+        Returns:
+            `None` if `visitor` is given, otherwise an iterator of
+            `(path, dirs, files)` tuples as returned by `os.walk()`. The
+            tuples of different subtrees may be interleaved. The directory
+            tree is read-only until the iterator is exhausted or closed.
+
+        Raises:
+            OSError: if `top` is not an existing directory.
+            ValueError: if `workers` is smaller than 1.
+        """
+        return walk_parallel(self, top, workers, visitor)
+
     def __str__(self):
         return str(self.root)
 
-    def _add_standard_streams(self):
-        self._add_open_file(StandardStreamWrapper(sys.stdin))
-        self._add_open_file(StandardStreamWrapper(sys.stdout))
-        self._add_open_file(StandardStreamWrapper(sys.stderr))
+    def _add_standard_streams(self, wrappers=()):
+        # existing wrappers are reused unless the standard streams
+        # have been replaced, for example by output capturing
+        streams = (sys.stdin, sys.stdout, sys.stderr)
+        if (len(wrappers) != len(streams) or
+                any(not isinstance(wrapper, StandardStreamWrapper) or
+                    wrapper.get_object() is not stream
+                    for wrapper, stream in zip(wrappers, streams))):
+            wrappers = [StandardStreamWrapper(stream) for stream in streams]
+        for wrapper in wrappers:
+            self._add_open_file(wrapper)
 
 
 Deprecator.add(FakeFilesystem, FakeFilesystem.get_disk_usage, 'GetDiskUsage')
@@ -4476,7 +6126,15 @@ class FakeFileWrapper:
         self._binary = binary
         self.is_stream = is_stream
         self._changed = False
-        contents = file_object.byte_contents
+        contents = None
+        if not update and isinstance(file_object, (FakeFileFromRealFile,
+                                                   FakeFileFromImage)):
+            contents = file_object.mapped_contents()
+        # a memory map of a real file is owned and closed by the wrapper
+        self._mapping = (contents if isinstance(contents, mmap.mmap)
+                         else None)
+        if contents is None:
+            contents = file_object.byte_contents
         self._encoding = encoding or locale.getpreferredencoding(False)
         errors = errors or 'strict'
         buffer_class = (NullFileBufferIO if file_object == filesystem.dev_null
@@ -4545,6 +6203,9 @@ class FakeFileWrapper:
             self._filesystem.open_files[self.filedes].remove(self)
         if self.delete_on_close:
             self._filesystem.remove_object(self.get_object().path)
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
 
     @property
     def closed(self):
@@ -4873,7 +6534,13 @@ class FakeDirWrapper:
 
     def close(self):
         """Close the directory."""
-        self._filesystem._close_open_file(self.filedes)
+        open_files = self._filesystem.open_files
+        # ignore closing a closed directory, as the descriptor may have
+        # been reused
+        if (self.filedes < len(open_files) and
+                open_files[self.filedes] is not None and
+                self in open_files[self.filedes]):
+            self._filesystem._close_open_file(self.filedes)
 
 
 class FakePipeWrapper:
@@ -14,8 +14,18 @@
 
 """A fake shutil module implementation that uses fake_filesystem for
 unit tests.
-Note that only `shutildisk_usage()` is faked, the rest of the functions shall
-work fine with the fake file system if `os`/`os.path` are patched.
+Note that only `disk_usage()`, `copyfile()`, `copy()`, `copy2()`,
+`copytree()`, `rmtree()` and `move()` are faked, the rest of the functions
+shall work fine with the fake file system if `os`/`os.path` are patched.
+
+The standard `shutil` functions work with the fake filesystem, but they copy
+each file through opened file objects and resolve each path separately.
+The fake implementations copy and remove the fake file objects directly
+instead: copied files share the contents of the source file until one of
+them is changed, and removed directory trees are detached from their parent
+directory in one step. Cases not handled directly (for example symlinks in
+a copied tree, missing permissions, or a custom `copy_function`) are
+delegated to the standard functions, so that errors are raised as usual.
 
 :Includes:
   FakeShutil: Uses a FakeFilesystem to provide a fake replacement for the
@@ -28,6 +38,23 @@ work fine with the fake file system if `os`/`os.path` are patched.
 """
 
 import shutil
+import sys
+import time
+from stat import S_IFREG, S_IMODE, S_ISDIR, S_ISLNK, S_ISREG
+
+from pyfakefs.fake_filesystem import (
+    FakeDirectory, FakeFile, is_root, PERM_DEF, PERM_DEF_FILE, PERM_EXE,
+    PERM_READ, PERM_WRITE
+)
+from pyfakefs.helpers import make_string_path
+
+# the functions in the shutil module itself are patched by the Patcher,
+# so the original functions are saved for the fallback
+_copyfile = shutil.copyfile
+_copy2 = shutil.copy2
+_copytree = shutil.copytree
+_rmtree = shutil.rmtree
+_move = shutil.move
 
 
 class FakeShutilModule:
@@ -39,7 +66,8 @@ class FakeShutilModule:
         """Return the list of patched function names. Used for patching
         functions imported from the module.
         """
-        return 'disk_usage',
+        return ('disk_usage', 'copyfile', 'copy', 'copy2', 'copytree',
+                'rmtree', 'move')
 
     def __init__(self, filesystem):
         """Construct fake shutil module using the fake filesystem.
@@ -59,6 +87,376 @@ class FakeShutilModule:
         """
         return self.filesystem.get_disk_usage(path)
 
+    def copyfile(self, src, dst, *, follow_symlinks=True):
+        """Copy the contents of the file `src` to the file `dst` and
+        return `dst`. The new contents of `dst` are shared with `src`
+        until one of the files is changed.
+
+        Args:
+            src: The path of the source file.
+            dst: The path of the destination file.
+            follow_symlinks: If `False` and `src` is a symlink, a new
+                symlink is created instead of copying the linked file.
+
+        Raises:
+            OSError: if `src` cannot be read, if `dst` cannot be written,
+                or if both are the same file.
+        """
+        source = self._regular_file(src, follow_symlinks)
+        if source is None:
+            return _copyfile(src, dst, follow_symlinks=follow_symlinks)
+        found, parent, target = self.filesystem._lookup_entry(
+            self.filesystem.make_string_path(dst), {})
+        if not found or parent is None:
+            return _copyfile(src, dst, follow_symlinks=follow_symlinks)
+        if target is not None:
+            if (not S_ISREG(target.st_mode) or target is source or
+                    not target.st_mode & PERM_WRITE):
+                return _copyfile(src, dst, follow_symlinks=follow_symlinks)
+        elif (not parent.st_mode & PERM_WRITE and
+              not self.filesystem.is_windows_fs):
+            return _copyfile(src, dst, follow_symlinks=follow_symlinks)
+
+        if sys.version_info >= (3, 8):
+            sys.audit("shutil.copyfile", src, dst)
+        contents = source.byte_contents
+        self._update_atime(source)
+        if target is None:
+            name = self.filesystem.splitpath(
+                self.filesystem.make_string_path(dst))[1]
+            target = FakeFile(name, S_IFREG | (PERM_DEF_FILE &
+                                               ~self.filesystem.umask),
+                              contents=b'', filesystem=self.filesystem)
+            parent.add_entry(target)
+            target._set_initial_contents(contents)
+        else:
+            current_time = time.time()
+            target.st_mtime = current_time
+            if not self.filesystem.is_windows_fs:
+                target.st_ctime = current_time
+            target.set_contents(contents)
+        return dst
+
+    def copy(self, src, dst, *, follow_symlinks=True):
+        """Copy the file `src` to the file or directory `dst`, including the
+        permission bits, and return the path of the new file.
+
+        Args:
+            src: The path of the source file.
+            dst: The path of the destination file or directory.
+            follow_symlinks: If `False` and `src` is a symlink, a new
+                symlink is created instead of copying the linked file.
+        """
+        dst = self._destination_file(src, dst)
+        self.copyfile(src, dst, follow_symlinks=follow_symlinks)
+        shutil.copymode(src, dst, follow_symlinks=follow_symlinks)
+        return dst
+
+    def copy2(self, src, dst, *, follow_symlinks=True):
+        """Copy the file `src` to the file or directory `dst`, including the
+        file metadata, and return the path of the new file.
+
+        Args:
+            src: The path of the source file.
+            dst: The path of the destination file or directory.
+            follow_symlinks: If `False` and `src` is a symlink, a new
+                symlink is created instead of copying the linked file.
+        """
+        dst = self._destination_file(src, dst)
+        self.copyfile(src, dst, follow_symlinks=follow_symlinks)
+        shutil.copystat(src, dst, follow_symlinks=follow_symlinks)
+        return dst
+
+    def copytree(self, src, dst, symlinks=False, ignore=None,
+                 copy_function=None, ignore_dangling_symlinks=False,
+                 dirs_exist_ok=False):
+        """Recursively copy the directory tree `src` to the new directory
+        `dst` and return `dst`.
+
+        If the tree contains only directories and regular files, and the
+        files are copied with `copy2()`, the fake file objects are copied
+        directly, and the copied files share their contents with the source
+        files until they are changed. Otherwise, the standard implementation
+        is used.
+
+        Args:
+            src: The path of the source directory.
+            dst: The path of the destination directory.
+            symlinks: If `True`, symlinks are copied as symlinks, otherwise
+                the linked files are copied.
+            ignore: If given, a callable that gets the path of each copied
+                directory and the list of its entry names, and returns the
+                names that shall not be copied.
+            copy_function: The function used to copy each file,
+                defaults to `copy2()`.
+            ignore_dangling_symlinks: If `True`, errors for symlinks
+                pointing to non-existing files are ignored.
+            dirs_exist_ok: If `True`, existing directories in `dst` are
+                copied into (Python >= 3.8 only).
+
+        Raises:
+            OSError: if `dst` already exists.
+            shutil.Error: if copying any of the entries failed.
+        """
+        if copy_function is None:
+            copy_function = self.copy2
+        tree = None
+        if (copy_function in (self.copy2, _copy2) and
+                not dirs_exist_ok):
+            tree = self._copyable_tree(src, dst)
+        if tree is None:
+            kwargs = {'dirs_exist_ok': True} if dirs_exist_ok else {}
+            return _copytree(src, dst, symlinks=symlinks, ignore=ignore,
+                             copy_function=copy_function,
+                             ignore_dangling_symlinks=ignore_dangling_symlinks,
+                             **kwargs)
+
+        if sys.version_info >= (3, 8):
+            sys.audit("shutil.copytree", src, dst)
+        src_path = make_string_path(src)
+        names = list(tree.contents)
+        ignored_names = (ignore(src_path, names) if ignore is not None
+                         else ())
+        self.filesystem.makedirs(dst)
+        target = self.filesystem.resolve(dst)
+        self._copy_directory_entries(tree, target, src_path, names,
+                                     ignored_names, ignore)
+        return dst
+
+    def rmtree(self, path, ignore_errors=False, onerror=None, **kwargs):
+        """Remove the directory tree `path`.
+
+        If the whole tree can be removed, the directory is removed from its
+        parent directory in one step, otherwise the standard implementation
+        is used, which removes the entries one by one and reports errors
+        for the entries that could not be removed.
+
+        Args:
+            path: The path of the directory to remove.
+            ignore_errors: If `True`, errors are ignored.
+            onerror: If given, a callable that handles the errors.
+            kwargs: Additional arguments of the standard function for the
+                used Python version, like `dir_fd`.
+
+        Raises:
+            OSError: if the tree cannot be removed and `ignore_errors`
+                is not set and `onerror` is not given.
+        """
+        directory = None if kwargs else self._removable_tree(path)
+        if directory is None:
+            return _rmtree(path, ignore_errors, onerror, **kwargs)
+        if sys.version_info >= (3, 11):
+            sys.audit("shutil.rmtree", path, None)
+        elif sys.version_info >= (3, 8):
+            sys.audit("shutil.rmtree", path)
+        directory.parent_dir.remove_entry(directory.name)
+
+    def move(self, src, dst, copy_function=None):
+        """Move the file or directory `src` to `dst` and return the new
+        path. `os.rename()` is used if possible, otherwise the file or
+        directory tree is copied and removed, using the fake
+        implementations of `copy2()`, `copytree()` and `rmtree()`.
+
+        Args:
+            src: The path of the file or directory to move.
+            dst: The path of the destination, or of a directory where
+                `src` is moved into.
+            copy_function: The function used to copy each file,
+                defaults to `copy2()`.
+
+        Raises:
+            shutil.Error: if `dst` already exists, or is inside `src`.
+        """
+        if copy_function is None:
+            copy_function = self.copy2
+        return _move(src, dst, copy_function=copy_function)
+
+    def _regular_file(self, path, follow_symlinks):
+        """Return the readable regular file object at `path`, or `None`
+        if `path` has to be handled by the standard implementation."""
+        path = self.filesystem.make_string_path(path)
+        if (not isinstance(path, str) or
+                self.filesystem.ends_with_path_separator(path)):
+            return None
+        try:
+            file_object = (self.filesystem.resolve(path) if follow_symlinks
+                           else self.filesystem.lresolve(path))
+        except OSError:
+            return None
+        if (not S_ISREG(file_object.st_mode) or
+                file_object is self.filesystem.dev_null or
+                file_object.is_large_file() or
+                not is_root() and not file_object.st_mode & PERM_READ):
+            return None
+        return file_object
+
+    def _destination_file(self, src, dst):
+        if self.filesystem.isdir(dst):
+            src = self.filesystem.make_string_path(src)
+            dst = self.filesystem.joinpaths(
+                self.filesystem.make_string_path(dst),
+                self.filesystem.splitpath(src)[1])
+        return dst
+
+    def _update_atime(self, file_object):
+        # reading the file updates the access time (not under Windows)
+        if not self.filesystem.is_windows_fs:
+            file_object.st_atime = time.time()
+
+    def _copyable_file(self, file_object, check_permissions):
+        """Return `True` if `file_object` is a readable regular file
+        with contents that can be copied directly."""
+        return (S_ISREG(file_object.st_mode) and
+                file_object is not self.filesystem.dev_null and
+                not file_object.is_large_file() and
+                not (check_permissions and
+                     not file_object.st_mode & PERM_READ))
+
+    def _copyable_tree(self, src, dst):
+        """Return the directory object for `src` if the tree can be copied
+        to `dst` directly, otherwise `None`. This is the case if the tree
+        contains only readable directories and files, `dst` does not
+        exist and is not inside `src`, and there is enough space for the
+        copied files."""
+        filesystem = self.filesystem
+        src = filesystem.make_string_path(src)
+        dst = filesystem.make_string_path(dst)
+        if not isinstance(src, str) or not isinstance(dst, str):
+            return None
+        if filesystem.umask & (PERM_WRITE | PERM_EXE) and not is_root():
+            return None
+        try:
+            tree = filesystem.resolve(src)
+        except OSError:
+            return None
+        if (not isinstance(tree, FakeDirectory) or
+                filesystem.exists(dst, check_link=True)):
+            return None
+
+        # find the existing directory where dst will be created
+        parent_path = filesystem.absnormpath(dst)
+        while not filesystem.exists(parent_path):
+            parent_path = filesystem.splitpath(parent_path)[0]
+        parent = filesystem.resolve(parent_path)
+        if (not isinstance(parent, FakeDirectory) or
+                parent.has_parent_object(tree)):
+            return None
+
+        size = self._copyable_size(tree)
+        if size is None:
+            return None
+        mount_point = filesystem._mount_point_for_device(parent.st_dev)
+        if (mount_point and mount_point['total_size'] is not None and
+                mount_point['total_size'] - mount_point['used_size'] < size):
+            return None
+        return tree
+
+    def _copyable_size(self, tree):
+        """Return the size of the files in the directory `tree`, or `None`
+        if it contains entries that cannot be copied directly."""
+        size = 0
+        check_permissions = (not is_root() and
+                             not self.filesystem.is_windows_fs)
+        directories = [tree]
+        while directories:
+            directory = directories.pop()
+            if (check_permissions and directory.st_mode &
+                    (PERM_READ | PERM_EXE) != PERM_READ | PERM_EXE):
+                return None
+            for entry in directory.contents.values():
+                if isinstance(entry, FakeDirectory):
+                    directories.append(entry)
+                elif not self._copyable_file(entry, check_permissions):
+                    return None
+                else:
+                    size += entry.size
+        return size
+
+    def _copy_directory_entries(self, source, target, src_path, names,
+                                ignored_names, ignore):
+        """Copy the entries of the directory `source` into the new
+        directory `target`, and the directory metadata afterwards,
+        as done by `copytree()` with `copy2()`."""
+        filesystem = self.filesystem
+        dir_mode = PERM_DEF & ~filesystem.umask
+        file_mode = S_IFREG | (PERM_DEF_FILE & ~filesystem.umask)
+        for name in names:
+            if name in ignored_names:
+                continue
+            entry = source.contents[name]
+            if isinstance(entry, FakeDirectory):
+                entry_path = filesystem.joinpaths(src_path, name)
+                entry_names = list(entry.contents)
+                entry_ignored_names = (ignore(entry_path, entry_names)
+                                       if ignore is not None else ())
+                new_entry = FakeDirectory(name, dir_mode, filesystem)
+                target.add_entry(new_entry)
+                self._copy_directory_entries(
+                    entry, new_entry, entry_path, entry_names,
+                    entry_ignored_names, ignore)
+            else:
+                new_entry = FakeFile(name, file_mode,
+                                     contents=entry.byte_contents,
+                                     filesystem=filesystem)
+                self._update_atime(entry)
+                target.add_entry(new_entry)
+                self._copy_stat(entry, new_entry)
+        self._copy_stat(source, target)
+
+    def _copy_stat(self, source, target):
+        """Copy the metadata of `source` to `target` as done by
+        `copystat()`."""
+        target.st_atime_ns = source.st_atime_ns
+        target.st_mtime_ns = source.st_mtime_ns
+        if self.filesystem.is_linux:
+            target.xattr.update(source.xattr)
+        self.filesystem._change_mode(target, S_IMODE(source.st_mode))
+
+    def _removable_tree(self, path):
+        """Return the directory object for `path` if the whole tree can be
+        removed at once, otherwise `None`."""
+        filesystem = self.filesystem
+        path = filesystem.make_string_path(path)
+        if not isinstance(path, str):
+            return None
+        try:
+            directory = filesystem.lresolve(path)
+        except OSError:
+            return None
+        if (not isinstance(directory, FakeDirectory) or
+                S_ISLNK(directory.st_mode) or directory.parent_dir is None):
+            return None
+
+        if filesystem.is_windows_fs:
+            open_objects = {id(wrappers[0].get_object())
+                            for wrappers in filesystem.open_files
+                            if wrappers}
+            required_mode, entry_mode = 0, PERM_WRITE
+        elif is_root():
+            # the entries of a directory without read permission cannot
+            # be removed one by one, even by root
+            open_objects = ()
+            required_mode, entry_mode = PERM_READ, 0
+        else:
+            open_objects = ()
+            required_mode = PERM_READ | PERM_WRITE | PERM_EXE
+            entry_mode = 0
+            parent_mode = PERM_WRITE | PERM_EXE
+            if directory.parent_dir.st_mode & parent_mode != parent_mode:
+                return None
+
+        entries = [directory]
+        while entries:
+            entry = entries.pop()
+            if (entry.st_mode & entry_mode != entry_mode or
+                    id(entry) in open_objects):
+                return None
+            if S_ISDIR(entry.st_mode):
+                if entry.st_mode & required_mode != required_mode:
+                    return None
+                entries.extend(entry.contents.values())
+        return directory
+
     def __getattr__(self, name):
         """Forwards any non-faked calls to the standard shutil module."""
         return getattr(self._shutil_module, name)
@@ -59,6 +59,7 @@ from importlib import reload
 
 from pyfakefs import fake_filesystem
 from pyfakefs import fake_filesystem_shutil
+from pyfakefs import fake_glob
 from pyfakefs import fake_pathlib
 from pyfakefs import mox3_stubout
 from pyfakefs.extra_packages import pathlib, pathlib2, use_scandir
@@ -77,7 +78,10 @@ def patchfs(_func=None, *,
             modules_to_reload=None,
             modules_to_patch=None,
             allow_root_user=True,
-            use_known_patches=True):
+            use_known_patches=True,
+            use_cache=False,
+            modules_to_scan=None,
+            reuse_fs=False):
     """Convenience decorator to use patcher with additional parameters in a
     test function.
 
@@ -100,7 +104,10 @@ def patchfs(_func=None, *,
                     modules_to_reload=modules_to_reload,
                     modules_to_patch=modules_to_patch,
                     allow_root_user=allow_root_user,
-                    use_known_patches=use_known_patches) as p:
+                    use_known_patches=use_known_patches,
+                    use_cache=use_cache,
+                    modules_to_scan=modules_to_scan,
+                    reuse_fs=reuse_fs) as p:
                 kwargs['fs'] = p.fs
                 return f(*args, **kwargs)
 
@@ -122,7 +129,10 @@ def load_doctests(loader, tests, ignore, module,
                   modules_to_reload=None,
                   modules_to_patch=None,
                   allow_root_user=True,
-                  use_known_patches=True):  # pylint: disable=unused-argument
+                  use_known_patches=True,
+                  use_cache=False,
+                  modules_to_scan=None,
+                  reuse_fs=False):  # pylint: disable=unused-argument
     """Load the doctest tests for the specified module into unittest.
         Args:
             loader, tests, ignore : arguments passed in from `load_tests()`
@@ -135,7 +145,10 @@ def load_doctests(loader, tests, ignore, module,
                        modules_to_reload=modules_to_reload,
                        modules_to_patch=modules_to_patch,
                        allow_root_user=allow_root_user,
-                       use_known_patches=use_known_patches)
+                       use_known_patches=use_known_patches,
+                       use_cache=use_cache,
+                       modules_to_scan=modules_to_scan,
+                       reuse_fs=reuse_fs)
     globs = _patcher.replace_globs(vars(module))
     tests.addTests(doctest.DocTestSuite(module,
                                         globs=globs,
@@ -163,6 +176,20 @@ class TestCaseMixin:
             of modules not provided by `pyfakefs`.
         use_known_patches: If True (the default), some patches for commonly
             used packges are applied which make them usable with pyfakes.
+        use_cache: If True, the results of scanning the loaded modules for
+            file system modules and functions are cached in the process and
+            reused by later patchers with the same settings, so that only
+            modules loaded or reloaded since are scanned. Defaults to False.
+        modules_to_scan: If given, only loaded modules with these names,
+            and their submodules, are scanned and patched, together with
+            the standard library modules in
+            :py:attr:`fake_filesystem_unittest.Patcher.ALWAYS_SCANNED_NAMES`.
+            Instead of the module names, the modules themselves may be used.
+        reuse_fs: If True, the fake filesystem and the fake modules are
+            reset and reused by later patchers with the same fake modules
+            instead of being created anew for each test. Defaults to False,
+            as a reference to the fake filesystem kept from a former test
+            sees the filesystem of the current test.
 
     If you specify some of these attributes here and you have DocTests,
     consider also specifying the same arguments to :py:func:`load_doctests`.
@@ -189,6 +216,9 @@ class TestCaseMixin:
     additional_skip_names = None
     modules_to_reload = None
     modules_to_patch = None
+    use_cache = False
+    modules_to_scan = None
+    reuse_fs = False
 
     @property
     def fs(self):
@@ -199,7 +229,10 @@ class TestCaseMixin:
                       modules_to_reload=None,
                       modules_to_patch=None,
                       allow_root_user=True,
-                      use_known_patches=True):
+                      use_known_patches=True,
+                      use_cache=None,
+                      modules_to_scan=None,
+                      reuse_fs=None):
         """Bind the file-related modules to the :py:class:`pyfakefs` fake file
         system instead of the real file system.  Also bind the fake `open()`
         function.
@@ -217,12 +250,21 @@ class TestCaseMixin:
             modules_to_reload = self.modules_to_reload
         if modules_to_patch is None:
             modules_to_patch = self.modules_to_patch
+        if use_cache is None:
+            use_cache = self.use_cache
+        if modules_to_scan is None:
+            modules_to_scan = self.modules_to_scan
+        if reuse_fs is None:
+            reuse_fs = self.reuse_fs
         self._stubber = Patcher(
             additional_skip_names=additional_skip_names,
             modules_to_reload=modules_to_reload,
             modules_to_patch=modules_to_patch,
             allow_root_user=allow_root_user,
-            use_known_patches=use_known_patches
+            use_known_patches=use_known_patches,
+            use_cache=use_cache,
+            modules_to_scan=modules_to_scan,
+            reuse_fs=reuse_fs
         )
 
         self._stubber.setUp()
@@ -258,7 +300,10 @@ class TestCase(unittest.TestCase, TestCaseMixin):
                  modules_to_reload=None,
                  modules_to_patch=None,
                  allow_root_user=True,
-                 use_known_patches=True):
+                 use_known_patches=True,
+                 use_cache=False,
+                 modules_to_scan=None,
+                 reuse_fs=False):
         """Creates the test class instance and the patcher used to stub out
         file system related modules.
 
@@ -273,6 +318,9 @@ class TestCase(unittest.TestCase, TestCaseMixin):
         self.modules_to_patch = modules_to_patch
         self.allow_root_user = allow_root_user
         self.use_known_patches = use_known_patches
+        self.use_cache = use_cache
+        self.modules_to_scan = modules_to_scan
+        self.reuse_fs = reuse_fs
 
     @Deprecator('add_real_file')
     def copyRealFile(self, real_file_path, fake_file_path=None,
@@ -339,7 +387,8 @@ class Patcher:
     `sys` is included to prevent `sys.path` from being stubbed with the fake
     `os.path`.
     '''
-    SKIPMODULES = {None, fake_filesystem, fake_filesystem_shutil, sys}
+    SKIPMODULES = {None, fake_filesystem, fake_filesystem_shutil, fake_glob,
+                   sys}
     assert None in SKIPMODULES, ("sys.modules contains 'None' values;"
                                  " must skip them.")
 
@@ -347,9 +396,29 @@ class Patcher:
 
     SKIPNAMES = {'os', 'path', 'io', 'genericpath', OS_MODULE, PATH_MODULE}
 
+    '''Standard library modules that are always scanned if only some
+    modules are scanned as defined by `modules_to_scan`.
+    `builtins` is included to patch the built-in `open` function.
+    '''
+    ALWAYS_SCANNED_NAMES = {'builtins', 'filecmp', 'fileinput', 'glob',
+                            'pathlib', 'shutil', 'tarfile', 'tempfile',
+                            'zipfile'}
+
+    # Process-wide caches shared by all patchers with the same settings.
+    # _MODULE_CACHE maps a settings key to a dictionary of module names
+    # against the scanned module and the scan result for that module.
+    # _FUNCTION_CACHE maps the fake module classes against the lookup table
+    # for file system functions.
+    _MODULE_CACHE = {}
+    _FUNCTION_CACHE = {}
+    # _FS_POOL maps the fake module classes against a fake filesystem
+    # with its fake modules, that is reset and reused by the next patcher
+    _FS_POOL = {}
+
     def __init__(self, additional_skip_names=None,
                  modules_to_reload=None, modules_to_patch=None,
-                 allow_root_user=True, use_known_patches=True):
+                 allow_root_user=True, use_known_patches=True,
+                 use_cache=False, modules_to_scan=None, reuse_fs=False):
         """For a description of the arguments, see TestCase.__init__"""
 
         if not allow_root_user:
@@ -383,6 +452,16 @@ class Patcher:
             for name, fake_module in modules_to_patch.items():
                 self._fake_module_classes[name] = fake_module
 
+        self.use_cache = use_cache
+        self.reuse_fs = reuse_fs
+        self._scan_names = None
+        self._scan_prefixes = None
+        if modules_to_scan is not None:
+            self._scan_names = {m.__name__ if inspect.ismodule(m) else m
+                                for m in modules_to_scan}
+            self._scan_names.update(self.ALWAYS_SCANNED_NAMES)
+            self._scan_prefixes = tuple(name + '.'
+                                        for name in self._scan_names)
         self._fake_module_functions = {}
         self._init_fake_module_functions()
 
@@ -395,6 +474,7 @@ class Patcher:
         self.fs = None
         self.fake_modules = {}
         self._dyn_patcher = None
+        self._pooled_fs = None
 
         # _isStale is set by tearDown(), reset by _refresh()
         self._isStale = True
@@ -409,6 +489,7 @@ class Patcher:
             'os': fake_filesystem.FakeOsModule,
             'shutil': fake_filesystem_shutil.FakeShutilModule,
             'io': fake_filesystem.FakeIoModule,
+            'glob': fake_glob.FakeGlobModule,
         }
         if IS_PYPY:
             # in PyPy io.open, the module is referenced as _io
@@ -432,7 +513,33 @@ class Patcher:
             self._fake_module_classes[
                 'scandir'] = fake_scandir.FakeScanDirModule
 
+    @classmethod
+    def clear_cache(cls):
+        """Clear the process-wide caches of the module scan results, of
+        the fake function lookup tables and of the pooled fake file systems.
+        Needed only if already loaded modules have been changed to import
+        file system modules or functions after they had been scanned by a
+        patcher using the cache.
+        """
+        cls._MODULE_CACHE.clear()
+        cls._FUNCTION_CACHE.clear()
+        for key, pooled_fs in list(cls._FS_POOL.items()):
+            if pooled_fs.owner is None:
+                del cls._FS_POOL[key]
+
     def _init_fake_module_functions(self):
+        if self.use_cache:
+            key = frozenset(self._fake_module_classes.items())
+            functions = self._FUNCTION_CACHE.get(key)
+            if functions is None:
+                self._collect_fake_module_functions()
+                self._FUNCTION_CACHE[key] = self._fake_module_functions
+            else:
+                self._fake_module_functions = functions
+        else:
+            self._collect_fake_module_functions()
+
+    def _collect_fake_module_functions(self):
         # handle patching function imported separately like
         # `from os import stat`
         # each patched function name has to be looked up separately
@@ -522,67 +629,160 @@ class Patcher:
                 # _DontDoThat() (see #523)
                 pass
 
+    def _module_cache(self):
+        """Return the module scan cache for the settings of this patcher."""
+        key = (frozenset(self.SKIPMODULES), frozenset(self._skipNames),
+               frozenset(self._fake_module_classes.items()),
+               frozenset((name, tuple(modules)) for name, modules
+                         in self._class_modules.items()))
+        return self._MODULE_CACHE.setdefault(key, {})
+
+    @staticmethod
+    def _module_state(module):
+        """Return the module spec and the number of global names of
+        `module`. `importlib.reload()` keeps the module object, but sets a
+        new spec, so both are compared to detect changed modules."""
+        try:
+            return module.__spec__, len(module.__dict__)
+        except AttributeError:
+            return None, 0
+
+    def _scan_module(self, module, module_names):
+        """Return the file system modules, functions and default arguments
+        found in `module`, or `None` if nothing is found or the module
+        shall be skipped."""
+        try:
+            if (module in self.SKIPMODULES or
+                    not inspect.ismodule(module) or
+                    module.__name__.split('.')[0] in self._skipNames):
+                return None
+        except AttributeError:
+            # workaround for some py (part of pytest) versions
+            # where py.error has no __name__ attribute
+            # see https://github.com/pytest-dev/py/issues/73
+            return None
+        module_items = module.__dict__.copy().items()
+
+        # suppress specific pytest warning - see #466
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                'ignore',
+                message='The compiler package is deprecated',
+                category=DeprecationWarning,
+                module='py'
+            )
+            modules = [(name, mod.__name__) for name, mod in module_items
+                       if self._is_fs_module(mod, name, module_names)]
+
+        functions = [(name, fct.__name__, fct.__module__)
+                     for name, fct in module_items
+                     if self._is_fs_function(fct)]
+
+        # find default arguments that are file system functions
+        def_functions = [def_value for _, fct in module_items
+                         for def_value in self._def_values(fct)]
+
+        if modules or functions or def_functions:
+            return modules, functions, def_functions
+        return None
+
     def _find_modules(self):
         """Find and cache all modules that import file system modules.
         Later, `setUp()` will stub these with the fake file system
         modules.
+        If `use_cache` is set, only modules that have not been scanned
+        before by a patcher with the same settings, or have been reloaded
+        or got new names since, are scanned.
+        If `modules_to_scan` is set, all other modules are ignored.
         """
 
         module_names = list(self._fake_module_classes.keys()) + [PATH_MODULE]
-        for name, module in list(sys.modules.items()):
-            try:
-                if (module in self.SKIPMODULES or
-                        not inspect.ismodule(module) or
-                        module.__name__.split('.')[0] in self._skipNames):
-                    continue
-            except AttributeError:
-                # workaround for some py (part of pytest) versions
-                # where py.error has no __name__ attribute
-                # see https://github.com/pytest-dev/py/issues/73
+        cache = self._module_cache() if self.use_cache else {}
+        for module in self.modules_to_reload:
+            cache.pop(module.__name__, None)
+        loaded_modules = list(sys.modules.items())
+        for module_name, module in loaded_modules:
+            if (self._scan_names is not None and
+                    module_name not in self._scan_names and
+                    not module_name.startswith(self._scan_prefixes)):
                 continue
-            module_items = module.__dict__.copy().items()
-
-            # suppress specific pytest warning - see #466
-            with warnings.catch_warnings():
-                warnings.filterwarnings(
-                    'ignore',
-                    message='The compiler package is deprecated',
-                    category=DeprecationWarning,
-                    module='py'
-                )
-                modules = {name: mod for name, mod in module_items
-                           if self._is_fs_module(mod, name, module_names)}
-
-            for name, mod in modules.items():
-                self._modules.setdefault(name, set()).add((module,
-                                                           mod.__name__))
-            functions = {name: fct for name, fct in
-                         module_items
-                         if self._is_fs_function(fct)}
-
-            # find default arguments that are file system functions
-            for _, fct in module_items:
-                for f, i, d in self._def_values(fct):
-                    self._def_functions.append((f, i, d))
-
-            for name, fct in functions.items():
-                self._fct_modules.setdefault(
-                    (name, fct.__name__, fct.__module__), set()).add(module)
-
-    def _refresh(self):
-        """Renew the fake file system and set the _isStale flag to `False`."""
+            cached = cache.get(module_name)
+            spec, name_count = self._module_state(module)
+            if (cached is not None and cached[0] is module and
+                    cached[1] is spec and cached[2] == name_count):
+                found = cached[3]
+            else:
+                found = self._scan_module(module, module_names)
+                cache[module_name] = (module, spec, name_count, found)
+            if found is None:
+                continue
+            modules, functions, def_functions = found
+            for name, mod_name in modules:
+                self._modules.setdefault(name, set()).add((module, mod_name))
+            for fct_key in functions:
+                self._fct_modules.setdefault(fct_key, set()).add(module)
+            self._def_functions.extend(def_functions)
+
+        if len(cache) > len(loaded_modules):
+            # forget about unloaded modules
+            for module_name in cache.keys() - dict(loaded_modules).keys():
+                del cache[module_name]
+
+    def _refresh(self, use_pool=True):
+        """Renew the fake file system and set the _isStale flag to `False`.
+        If `use_pool` and `reuse_fs` are set, the fake file system
+        and the fake modules from the pool are reset and reused.
+        """
         if self._stubs is not None:
             self._stubs.smart_unset_all()
         self._stubs = mox3_stubout.StubOutForTesting()
 
-        self.fs = fake_filesystem.FakeFilesystem(patcher=self)
-        for name in self._fake_module_classes:
-            self.fake_modules[name] = self._fake_module_classes[name](self.fs)
-        self.fake_modules[PATH_MODULE] = self.fake_modules['os'].path
-        self.fake_open = fake_filesystem.FakeFileOpen(self.fs)
+        use_pool = use_pool and self.reuse_fs
+        if not use_pool or not self._reuse_pooled_fs():
+            self.fs = fake_filesystem.FakeFilesystem(patcher=self)
+            self.fake_modules = {}
+            for name in self._fake_module_classes:
+                self.fake_modules[name] = self._fake_module_classes[name](
+                    self.fs)
+            self.fake_modules[PATH_MODULE] = self.fake_modules['os'].path
+            self.fake_open = fake_filesystem.FakeFileOpen(self.fs)
+            if use_pool:
+                self._add_pooled_fs()
 
         self._isStale = False
 
+    def _add_pooled_fs(self):
+        key = frozenset(self._fake_module_classes.items())
+        if key not in self._FS_POOL:
+            self._pooled_fs = _PooledFilesystem(
+                self.fs, self.fake_modules, self.fake_open)
+            self._pooled_fs.owner = self
+            self._FS_POOL[key] = self._pooled_fs
+
+    def _reuse_pooled_fs(self):
+        """Reset and use the pooled fake filesystem and fake modules
+        created by a former patcher with the same fake modules, if they are
+        not in use by another patcher. Return `True` if they could be
+        reused."""
+        pooled_fs = self._FS_POOL.get(
+            frozenset(self._fake_module_classes.items()))
+        if pooled_fs is None or pooled_fs.owner not in (None, self):
+            return False
+        pooled_fs.owner = self
+        self._pooled_fs = pooled_fs
+        self.fs = pooled_fs.reset(self)
+        self.fake_modules = dict(pooled_fs.fake_modules)
+        self.fake_open = pooled_fs.fake_open
+        if 'pathlib' in self.fake_modules or 'pathlib2' in self.fake_modules:
+            # the fake pathlib module holds the file system in class members
+            fake_pathlib.init_module(self.fs)
+        return True
+
+    def _release_pooled_fs(self):
+        if self._pooled_fs is not None:
+            self._pooled_fs.owner = None
+            self._pooled_fs = None
+
     def setUp(self, doctester=None):
         """Bind the file-related modules to the :py:mod:`pyfakefs` fake
         modules real ones.  Also bind the fake `file()` and `open()` functions.
@@ -643,7 +843,8 @@ class Patcher:
     def replace_globs(self, globs_):
         globs = globs_.copy()
         if self._isStale:
-            self._refresh()
+            # the pooled file system is only used between setUp and tearDown
+            self._refresh(use_pool=False)
         for name in self._fake_module_classes:
             if name in globs:
                 globs[name] = self._fake_module_classes[name](self.fs)
@@ -652,6 +853,7 @@ class Patcher:
     def tearDown(self, doctester=None):
         """Clear the fake filesystem bindings created by `setUp()`."""
         self.stop_patching()
+        self._release_pooled_fs()
         if self.has_fcopy_file:
             shutil._HAS_FCOPYFILE = True
 
@@ -695,6 +897,30 @@ class Patcher:
         self.start_patching()
 
 
+class _PooledFilesystem:
+    """A fake filesystem together with its fake modules, reused by
+    patchers with `reuse_fs` set to avoid the creation costs for each test."""
+
+    # the file system settings that are restored before reusing it
+    SETTINGS = ('path_separator', 'alternative_path_separator',
+                'is_windows_fs', 'is_macos', 'is_case_sensitive', 'umask')
+
+    def __init__(self, fs, fake_modules, fake_open):
+        self.fs = fs
+        self.fake_modules = dict(fake_modules)
+        self.fake_open = fake_open
+        self.settings = {name: getattr(fs, name) for name in self.SETTINGS}
+        self.owner = None
+
+    def reset(self, patcher):
+        """Restore the file system settings and remove all contents."""
+        for name, value in self.settings.items():
+            setattr(self.fs, name, value)
+        self.fs.reset()
+        self.fs.patcher = patcher
+        return self.fs
+
+
 class Pause:
     """Simple context manager that allows to pause/resume patching the
     filesystem. Patching is paused in the context manager, and resumed after
@@ -0,0 +1,377 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A fake glob module implementation that matches the patterns directly
+against the directories of a fake filesystem.
+
+The standard `glob` module works with the fake filesystem if `os` is
+patched, but it has to resolve each visited directory by path and creates
+a `DirEntry` object for each directory entry. The implementation here
+compiles each pattern part once, matches it against the entries of the
+fake directory objects, and descends only into matching directories.
+Results are yielded lazily in the same order as by the standard module.
+
+:Includes:
+  FakeGlobModule: Uses a FakeFilesystem to provide a fake replacement for
+    the glob module.
+
+:Usage:
+  The fake implementation is automatically involved if using
+  `fake_filesystem_unittest.TestCase`, pytest fs fixture,
+  or directly `Patcher`.
+"""
+import fnmatch
+import functools
+import glob
+import re
+import sys
+from stat import S_ISDIR, S_ISLNK
+
+from pyfakefs.fake_filesystem import is_root, PERM_READ
+from pyfakefs.helpers import to_string, matching_string, make_string_path
+
+# the functions in the glob module itself are patched by the Patcher,
+# so the original function is saved for the fallback
+_glob_iglob = glob.iglob
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern, ignore_case):
+    flags = re.IGNORECASE if ignore_case else 0
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+def _is_hidden(name):
+    return name[0] == '.'
+
+
+def _directory(filesystem, path, directory=None):
+    """Return the readable directory object at `path`, or `None` if the
+    path does not point to a readable directory.
+    If `directory` is given, it is used instead of resolving `path`."""
+    if directory is None:
+        try:
+            directory = filesystem.resolve(path or '.')
+        except OSError:
+            return None
+    if not S_ISDIR(directory.st_mode):
+        return None
+    if not is_root() and not directory.st_mode & PERM_READ:
+        return None
+    return directory
+
+
+def _resolved_directory(filesystem, path, file_object):
+    """Return the directory object for the directory entry `file_object`
+    at `path`, following a symlink, or `None` if it is not a directory.
+    Symlinks are resolved by path to handle symlink loops."""
+    if S_ISLNK(file_object.st_mode):
+        try:
+            file_object = filesystem.resolve(path)
+        except OSError:
+            return None
+    if S_ISDIR(file_object.st_mode):
+        return file_object
+    return None
+
+
+def _entries(filesystem, path, directory):
+    """Yield the name, the file object and the path of the entries in the
+    readable directory at `path`.
+    If `directory` is given, it is used instead of resolving `path`.
+    """
+    directory = _directory(filesystem, path, directory)
+    if directory is None:
+        return
+    prefix = filesystem.joinpaths(path, '') if path else ''
+    # changes of the directory during the iteration are made in a copy
+    contents = directory.shared_contents()
+    try:
+        for name, file_object in contents.items():
+            yield name, file_object, prefix + name
+    finally:
+        directory.release_contents(contents)
+
+
+class _Globber:
+    """Implements the algorithm of `glob.iglob` for a fake filesystem.
+    All paths are strings; the matches are yielded together with their
+    directory object, if known, so that the next pattern part can be
+    matched without resolving the directory path again.
+    """
+
+    def __init__(self, filesystem, root_dir, recursive, include_hidden):
+        self.filesystem = filesystem
+        self.root_dir = root_dir
+        self.recursive = recursive
+        self.include_hidden = include_hidden
+        self.ignore_case = filesystem.is_windows_fs
+
+    def _join(self, dirname, basename):
+        if not dirname or not basename:
+            return dirname or basename
+        return self.filesystem.joinpaths(dirname, basename)
+
+    def _is_recursive(self, pattern):
+        return self.recursive and pattern == '**'
+
+    def iglob(self, pathname, dironly=False):
+        dirname, basename = self.filesystem.splitpath(pathname)
+        if not glob.has_magic(pathname):
+            if basename:
+                if self.filesystem.exists(
+                        self._join(self.root_dir, pathname), check_link=True):
+                    yield pathname, None
+            elif self.filesystem.isdir(self._join(self.root_dir, dirname)):
+                # patterns ending with a separator match only directories
+                yield pathname, None
+            return
+        if not dirname:
+            if self._is_recursive(basename):
+                matches = self.glob2(self.root_dir, None, dironly)
+            else:
+                matches = self.glob1(self.root_dir, None, basename, dironly)
+            for match in matches:
+                yield match
+            return
+        # the dirname of a drive or UNC path is the path itself
+        if dirname != pathname and glob.has_magic(dirname):
+            dirs = self.iglob(dirname, dironly=True)
+        else:
+            dirs = [(dirname, None)]
+        for dirname, directory in dirs:
+            path = self._join(self.root_dir, dirname)
+            if not glob.has_magic(basename):
+                matches = self.glob0(path, basename)
+            elif self._is_recursive(basename):
+                matches = self.glob2(path, directory, dironly)
+            else:
+                matches = self.glob1(path, directory, basename, dironly)
+            for name, subdir in matches:
+                yield self.filesystem.joinpaths(dirname, name), subdir
+
+    def glob0(self, dirname, basename):
+        if basename:
+            if self.filesystem.exists(
+                    self._join(dirname, basename), check_link=True):
+                yield basename, None
+        elif self.filesystem.isdir(dirname):
+            yield basename, None
+
+    def glob1(self, dirname, directory, pattern, dironly):
+        match = _compile_pattern(pattern, self.ignore_case)
+        skip_hidden = not self.include_hidden and not _is_hidden(pattern)
+        for name, file_object, path in _entries(self.filesystem, dirname,
+                                                directory):
+            if skip_hidden and _is_hidden(name) or not match(name):
+                continue
+            subdir = _resolved_directory(self.filesystem, path, file_object)
+            if subdir is not None or not dironly:
+                yield name, subdir
+
+    def glob2(self, dirname, directory, dironly):
+        yield '', directory
+        for match in self.rlistdir(dirname, directory, dironly):
+            yield match
+
+    def rlistdir(self, dirname, directory, dironly):
+        for name, file_object, path in _entries(self.filesystem, dirname,
+                                                directory):
+            if not self.include_hidden and _is_hidden(name):
+                continue
+            subdir = _resolved_directory(self.filesystem, path, file_object)
+            if subdir is None:
+                if not dironly:
+                    yield name, None
+                continue
+            yield name, subdir
+            for subname, subsubdir in self.rlistdir(path, subdir, dironly):
+                yield self._join(name, subname), subsubdir
+
+
+class FakeGlobModule:
+    """Uses a FakeFilesystem to provide a fake replacement for the glob
+    module.
+    """
+
+    @staticmethod
+    def dir():
+        """Return the list of patched function names. Used for patching
+        functions imported from the module.
+        """
+        return 'glob', 'iglob'
+
+    def __init__(self, filesystem):
+        """Construct fake glob module using the fake filesystem.
+
+        Args:
+          filesystem:  FakeFilesystem used to provide file system information
+        """
+        self.filesystem = filesystem
+        self._glob_module = glob
+
+    def glob(self, pathname, *, root_dir=None, dir_fd=None, recursive=False,
+             include_hidden=False):
+        """Return a list of paths matching a pathname pattern.
+
+        Args:
+            pathname: The pattern to match, may contain shell-style
+                wildcards.
+            root_dir: If given, the pattern is matched relative to this
+                directory (new in Python 3.10).
+            dir_fd: If given, the standard module is used, as the
+                directory is given as file descriptor (new in Python 3.10).
+            recursive: If `True`, the pattern '**' matches any files and
+                zero or more directories and subdirectories.
+            include_hidden: If `True`, the wildcards also match hidden
+                files (new in Python 3.11).
+        """
+        return list(self.iglob(pathname, root_dir=root_dir, dir_fd=dir_fd,
+                               recursive=recursive,
+                               include_hidden=include_hidden))
+
+    def iglob(self, pathname, *, root_dir=None, dir_fd=None,
+              recursive=False, include_hidden=False):
+        """Return an iterator which yields the paths matching a pathname
+        pattern. See `glob` for the arguments.
+        """
+        if dir_fd is not None:
+            kwargs = {'root_dir': root_dir, 'dir_fd': dir_fd,
+                      'recursive': recursive}
+            if include_hidden:
+                kwargs['include_hidden'] = include_hidden
+            return _glob_iglob(pathname, **kwargs)
+        if sys.version_info >= (3, 8):
+            sys.audit("glob.glob", pathname, recursive)
+        if sys.version_info >= (3, 10):
+            sys.audit("glob.glob/2", pathname, recursive, root_dir, dir_fd)
+        if root_dir is not None:
+            root_dir = to_string(make_string_path(root_dir))
+        else:
+            root_dir = ''
+        return self._iglob(pathname, root_dir, recursive, include_hidden)
+
+    def _iglob(self, pathname, root_dir, recursive, include_hidden):
+        globber = _Globber(self.filesystem, root_dir, recursive,
+                           include_hidden)
+        matches = globber.iglob(to_string(pathname))
+        if not pathname or recursive and pathname[:2] in ('**', b'**'):
+            # skip the empty match of the directory itself
+            first = next(matches, None)
+            if first is None:
+                return
+            if first[0]:
+                yield matching_string(pathname, first[0])
+        for path, _ in matches:
+            yield matching_string(pathname, path)
+
+    def __getattr__(self, name):
+        """Forwards any non-faked calls to the standard glob module."""
+        return getattr(self._glob_module, name)
+
+
+def glob_path(path, pattern_parts):
+    """Yield the paths below the pathlib path `path` matching the pattern
+    parts, using the same rules as `pathlib.Path.glob`.
+
+    Args:
+        path: A `FakePath` object.
+        pattern_parts: The relative pattern split into its parts. A pattern
+            part `'**'` matches the directory and all its subdirectories,
+            an empty last part matches only directories.
+
+    Raises:
+        ValueError: if '**' is contained in a pattern part.
+    """
+    for part in pattern_parts:
+        if part != '**' and '**' in part:
+            raise ValueError(
+                "Invalid pattern: '**' can only be an entire path component")
+    directory = _directory(path.filesystem, str(path))
+    if directory is None:
+        return iter([])
+    return _select(path, directory, tuple(pattern_parts),
+                   path._flavour.compile_pattern)
+
+
+def _select(parent_path, directory, pattern_parts, compile_pattern):
+    if not pattern_parts or not pattern_parts[0]:
+        return iter([parent_path])
+    pattern, child_parts = pattern_parts[0], pattern_parts[1:]
+    if pattern == '**':
+        return _select_recursive(parent_path, directory, child_parts,
+                                 compile_pattern)
+    if '*' in pattern or '?' in pattern or '[' in pattern:
+        return _select_wildcard(parent_path, directory, pattern,
+                                child_parts, compile_pattern)
+    return _select_literal(parent_path, pattern, child_parts,
+                           compile_pattern)
+
+
+def _select_recursive(parent_path, directory, child_parts, compile_pattern):
+    """Yield the matches of `child_parts` in `parent_path` and in all its
+    subdirectories, each match only once."""
+    yielded = set()
+    for path, subdir in _iterate_directories(parent_path, directory):
+        for match in _select(path, subdir, child_parts, compile_pattern):
+            if match not in yielded:
+                yielded.add(match)
+                yield match
+
+
+def _select_wildcard(parent_path, directory, pattern, child_parts,
+                     compile_pattern):
+    """Yield the matches of `child_parts` in the entries of `parent_path`
+    matching the wildcard `pattern`."""
+    filesystem = parent_path.filesystem
+    match = compile_pattern(pattern)
+    for name, file_object, path in _entries(
+            filesystem, str(parent_path), directory):
+        if not match(name):
+            continue
+        child_path = parent_path._make_child_relpath(name)
+        if not child_parts:
+            yield child_path
+            continue
+        subdir = _resolved_directory(filesystem, path, file_object)
+        if subdir is not None:
+            for match_path in _select(child_path, subdir, child_parts,
+                                      compile_pattern):
+                yield match_path
+
+
+def _select_literal(parent_path, name, child_parts, compile_pattern):
+    """Yield the matches of `child_parts` in the entry `name` of
+    `parent_path`, or the entry itself if it exists and there are no
+    more pattern parts."""
+    filesystem = parent_path.filesystem
+    child_path = parent_path._make_child_relpath(name)
+    if child_parts:
+        subdir = _directory(filesystem, str(child_path))
+        if subdir is not None:
+            for match_path in _select(child_path, subdir, child_parts,
+                                      compile_pattern):
+                yield match_path
+    elif filesystem.exists(str(child_path)):
+        yield child_path
+
+
+def _iterate_directories(parent_path, directory):
+    """Yield the path and the directory object of `parent_path` and of all
+    its subdirectories, not following symlinks."""
+    yield parent_path, directory
+    for name, file_object, _ in _entries(parent_path.filesystem,
+                                         str(parent_path), directory):
+        if S_ISDIR(file_object.st_mode):
+            child_path = parent_path._make_child_relpath(name)
+            for match in _iterate_directories(child_path, file_object):
+                yield match
@@ -43,6 +43,8 @@ import functools
 
 import errno
 
+from pyfakefs import fake_filesystem
+from pyfakefs import fake_glob
 from pyfakefs import fake_scandir
 from pyfakefs.extra_packages import use_scandir, pathlib, pathlib2
 from pyfakefs.fake_filesystem import FakeFileOpen, FakeFilesystem
@@ -456,6 +458,10 @@ class FakePath(path_module):
     # the underlying fake filesystem
     filesystem = None
 
+    # the file system objects resolved by `stat()`, or the raised errors,
+    # together with the file system state they are valid for
+    _stat_cache = None
+
     def __new__(cls, *args, **kwargs):
         """Creates the correct subclass based on OS."""
         if cls is FakePathlibModule.Path:
@@ -511,6 +517,52 @@ class FakePath(path_module):
         path = self.filesystem.absnormpath(path)
         return FakePath(path)
 
+    def stat(self, *, follow_symlinks=True):
+        """Return the result of the stat() system call on this path, like
+        os.stat() does.
+        The file system object is only resolved on the first call. It is
+        cached in the path object and reused while the file system
+        structure, the permissions and owners, the current directory, the
+        user and group and the OS emulation settings are unchanged, which
+        makes repeated calls like `exists()` or `is_file()` on the same
+        path object cheap.
+
+        Args:
+            follow_symlinks: If False and the path points to a symlink,
+                the link itself is inspected instead of the linked object.
+                New in Python 3.10.
+
+        Raises:
+            OSError: if the path does not exist.
+        """
+        filesystem = self.filesystem
+        state = (filesystem, filesystem.generation, filesystem.cwd,
+                 fake_filesystem.USER_ID, fake_filesystem.GROUP_ID,
+                 filesystem.is_case_sensitive, filesystem.is_windows_fs,
+                 filesystem.path_separator,
+                 filesystem.alternative_path_separator)
+        if self._stat_cache is None:
+            self._stat_cache = {}
+        cached = self._stat_cache.get(follow_symlinks)
+        if cached is None or cached[0] != state:
+            try:
+                # pylint: disable=protected-access
+                cached = state, filesystem._stat_object(
+                    self._path(), follow_symlinks), None
+            except OSError as error:
+                cached = state, None, error
+            self._stat_cache[follow_symlinks] = cached
+        _, file_object, error = cached
+        if error is not None:
+            filesystem.raise_os_error(error.errno, error.filename)
+        return file_object.stat_result.copy()
+
+    def lstat(self):
+        """Like stat(), except if the path points to a symlink, the symlink's
+        status information is returned, rather than its target's.
+        """
+        return self.stat(follow_symlinks=False)
+
     def open(self, mode='r', buffering=-1, encoding=None,
              errors=None, newline=None):
         """Open the file pointed by this path and return a fake file object.
@@ -638,6 +690,48 @@ class FakePath(path_module):
             fake_file.close()
             self.chmod(mode)
 
+    def glob(self, pattern):
+        """Iterate over this subtree and yield all existing files (of any
+        kind, including directories) matching the given relative pattern.
+        The pattern is matched directly against the fake directories.
+
+        Raises:
+            ValueError: if the pattern is empty or invalid.
+            NotImplementedError: if the pattern is not relative.
+        """
+        if sys.version_info >= (3, 8):
+            sys.audit("pathlib.Path.glob", self, pattern)
+        if not pattern:
+            raise ValueError("Unacceptable pattern: {!r}".format(pattern))
+        pattern_parts = self._glob_pattern_parts(pattern)
+        for path in fake_glob.glob_path(self, pattern_parts):
+            yield path
+
+    def rglob(self, pattern):
+        """Recursively yield all existing files (of any kind, including
+        directories) matching the given relative pattern, anywhere in
+        this subtree.
+
+        Raises:
+            ValueError: if the pattern is invalid.
+            NotImplementedError: if the pattern is not relative.
+        """
+        if sys.version_info >= (3, 8):
+            sys.audit("pathlib.Path.rglob", self, pattern)
+        pattern_parts = ('**',) + self._glob_pattern_parts(pattern)
+        for path in fake_glob.glob_path(self, pattern_parts):
+            yield path
+
+    def _glob_pattern_parts(self, pattern):
+        drv, root, pattern_parts = self._flavour.parse_parts((pattern,))
+        if drv or root:
+            raise NotImplementedError("Non-relative patterns are unsupported")
+        if (sys.version_info >= (3, 11) and pattern and
+                pattern[-1] in (self._flavour.sep, self._flavour.altsep)):
+            # a trailing separator matches only directories
+            pattern_parts.append('')
+        return tuple(pattern_parts)
+
 
 class FakePathlibModule:
     """Uses FakeFilesystem to provide a fake pathlib module replacement.
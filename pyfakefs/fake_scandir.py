@@ -16,11 +16,16 @@ Works with both the function integrated into the `os` module since Python 3.5
 and the standalone function available in the standalone `scandir` python
 package.
 """
+import errno
 import os
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISDIR, S_ISLNK
 
 from pyfakefs.extra_packages import use_scandir_package
-from pyfakefs.helpers import to_string
+from pyfakefs.helpers import to_string, make_string_path
 
 if sys.version_info >= (3, 6):
     BaseClass = os.PathLike
@@ -47,6 +52,8 @@ class DirEntry(BaseClass):
         self._isdir = False
         self._statresult = None
         self._statresult_symlink = None
+        # the file system object of the entry, or None to look it up by path
+        self._file_object = None
 
     def inode(self):
         """Return the inode number of the entry."""
@@ -95,14 +102,19 @@ class DirEntry(BaseClass):
         """
         if follow_symlinks:
             if self._statresult_symlink is None:
-                file_object = self._filesystem.resolve(self._abspath)
+                if self._file_object is not None and not self._islink:
+                    file_object = self._file_object
+                else:
+                    file_object = self._filesystem.resolve(self._abspath)
                 self._statresult_symlink = file_object.stat_result.copy()
                 if self._filesystem.is_windows_fs:
                     self._statresult_symlink.st_nlink = 0
             return self._statresult_symlink
 
         if self._statresult is None:
-            file_object = self._filesystem.lresolve(self._abspath)
+            file_object = self._file_object
+            if file_object is None:
+                file_object = self._filesystem.lresolve(self._abspath)
             self._inode = file_object.st_ino
             self._statresult = file_object.stat_result.copy()
             if self._filesystem.is_windows_fs:
@@ -133,22 +145,38 @@ class ScanDirIter:
         else:
             self.abspath = self.filesystem.absnormpath(path)
             self.path = to_string(path)
-        contents = self.filesystem.confirmdir(self.abspath).contents
-        self.contents_iter = iter(contents)
+        self._directory = self.filesystem.confirmdir(self.abspath)
+        # the entries are iterated without copying them; changes of the
+        # directory during the iteration do not affect the iterator
+        self._contents = self._directory.shared_contents()
+        self.contents_iter = iter(self._contents.items())
+        # joining with an empty name adds a trailing separator if needed,
+        # so that entry paths can be built by concatenation
+        self._path_prefix = self.filesystem.joinpaths(self.path, '')
+        self._abspath_prefix = self.filesystem.joinpaths(self.abspath, '')
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        entry = self.contents_iter.__next__()
+        try:
+            name, file_object = self.contents_iter.__next__()
+        except StopIteration:
+            self._release()
+            raise
         dir_entry = DirEntry(self.filesystem)
-        dir_entry.name = entry
-        dir_entry.path = self.filesystem.joinpaths(self.path,
-                                                   dir_entry.name)
-        dir_entry._abspath = self.filesystem.joinpaths(self.abspath,
-                                                       dir_entry.name)
-        dir_entry._isdir = self.filesystem.isdir(dir_entry._abspath)
-        dir_entry._islink = self.filesystem.islink(dir_entry._abspath)
+        dir_entry.name = name
+        dir_entry.path = self._path_prefix + name
+        dir_entry._abspath = self._abspath_prefix + name
+        # the entry type is taken from the directory entry itself,
+        # only symlinks have to be resolved to get the type of the target
+        dir_entry._file_object = file_object
+        dir_entry._inode = file_object.st_ino
+        dir_entry._islink = S_ISLNK(file_object.st_mode)
+        if dir_entry._islink:
+            dir_entry._isdir = self.filesystem.isdir(dir_entry._abspath)
+        else:
+            dir_entry._isdir = S_ISDIR(file_object.st_mode)
         return dir_entry
 
     if sys.version_info >= (3, 6):
@@ -159,7 +187,13 @@ class ScanDirIter:
             self.close()
 
         def close(self):
-            pass
+            self._release()
+            self.contents_iter = iter(())
+
+    def _release(self):
+        if self._contents is not None:
+            self._directory.release_contents(self._contents)
+            self._contents = None
 
 
 def scandir(filesystem, path=''):
@@ -180,36 +214,48 @@ def scandir(filesystem, path=''):
     return ScanDirIter(filesystem, path)
 
 
-def _classify_directory_contents(filesystem, root):
+def _classify_directory_contents(filesystem, root, directory):
     """Classify contents of a directory as files/directories.
 
     Args:
         filesystem: The fake filesystem used for implementation
-        root: (str) Directory to examine.
+        root: (str) Path of the directory to examine.
+        directory: The FakeDirectory object at `root`.
 
     Returns:
-        (tuple) A tuple consisting of three values: the directory examined,
-        a list containing all of the directory entries, and a list
-        containing all of the non-directory entries.
-        (This is the same format as returned by the `os.walk` generator.)
-
-    Raises:
-        Nothing on its own, but be ready to catch exceptions generated by
-        underlying mechanisms like `os.listdir`.
+        (tuple) A tuple consisting of three values: a list containing all
+        of the directory entries, a list containing all of the
+        non-directory entries, and a dictionary of the directory objects
+        to descend into, mapped by entry name. Symlinks to directories are
+        mapped to `None` and have to be resolved by path.
     """
+    prefix = filesystem.joinpaths(root, '')
     dirs = []
     files = []
-    for entry in filesystem.listdir(root):
-        if filesystem.isdir(filesystem.joinpaths(root, entry)):
-            dirs.append(entry)
+    subdirs = {}
+    for name, entry in directory.contents.items():
+        if S_ISDIR(entry.st_mode):
+            dirs.append(name)
+            subdirs[name] = entry
+        elif S_ISLNK(entry.st_mode):
+            # only symlinks are resolved by path, which also handles
+            # link cycles the same way as the real OS (ELOOP)
+            if filesystem.isdir(prefix + name):
+                dirs.append(name)
+                subdirs[name] = None
+            else:
+                files.append(name)
         else:
-            files.append(entry)
-    return root, dirs, files
+            files.append(name)
+    return dirs, files, subdirs
 
 
 def walk(filesystem, top, topdown=True, onerror=None, followlinks=False):
     """Perform an os.walk operation over the fake filesystem.
 
+    The walk descends through the directory objects, only the top directory
+    and symlinks are resolved by path.
+
     Args:
         filesystem: The fake filesystem used for implementation
         top: The root directory from which to begin walk.
@@ -225,32 +271,169 @@ def walk(filesystem, top, topdown=True, onerror=None, followlinks=False):
         subdirectories.  See the documentation for the builtin os module
         for further details.
     """
+    # imported here to avoid a circular import
+    from pyfakefs.fake_filesystem import is_root, PERM_READ
 
-    def do_walk(top_dir, top_most=False):
-        if not top_most and not followlinks and filesystem.islink(top_dir):
-            return
+    def do_walk(top_dir, directory=None):
         try:
-            top_contents = _classify_directory_contents(filesystem, top_dir)
+            if directory is None:
+                directory = filesystem.confirmdir(
+                    filesystem.resolve_path(top_dir, allow_fd=True))
+            elif not is_root() and not directory.st_mode & PERM_READ:
+                filesystem.raise_os_error(errno.EACCES, top_dir)
+            dirs, files, subdirs = _classify_directory_contents(
+                filesystem, top_dir, directory)
         except OSError as exc:
-            top_contents = None
             if onerror is not None:
                 onerror(exc)
+            return
 
-        if top_contents is not None:
-            if topdown:
-                yield top_contents
+        if topdown:
+            yield top_dir, dirs, files
 
-            for directory in top_contents[1]:
-                if not followlinks and filesystem.islink(directory):
-                    continue
-                for contents in do_walk(filesystem.joinpaths(top_dir,
-                                                             directory)):
-                    yield contents
+        prefix = filesystem.joinpaths(top_dir, '')
+        # dirs may have been changed by the caller in topdown mode
+        for name in dirs:
+            path = prefix + name
+            subdir = subdirs.get(name)
+            if subdir is None and not followlinks and filesystem.islink(path):
+                continue
+            for contents in do_walk(path, subdir):
+                yield contents
 
-            if not topdown:
-                yield top_contents
+        if not topdown:
+            yield top_dir, dirs, files
 
-    return do_walk(to_string(top), top_most=True)
+    return do_walk(to_string(top))
+
+
+class _ParallelWalker:
+    """Walks a directory tree of a fake filesystem using a pool of worker
+    threads. The subtrees are distributed over the workers, each worker
+    walks its subtrees top-down through the directory objects.
+    Symlinks to directories are listed, but not followed.
+    """
+
+    def __init__(self, filesystem, workers, visitor):
+        self.filesystem = filesystem
+        self.workers = workers
+        self.visitor = visitor
+        self.cancelled = threading.Event()
+        self.results = queue.Queue(maxsize=workers * 64)
+
+    def list_directory(self, path, directory):
+        """Return the tuple for the directory at `path` and the list of
+        the subdirectories to descend into, or `None` if the directory is
+        not readable. If a visitor is set, it is called with the tuple,
+        and can prune the walk by changing the directory names."""
+        # imported here to avoid a circular import
+        from pyfakefs.fake_filesystem import is_root, PERM_READ
+
+        if not is_root() and not directory.st_mode & PERM_READ:
+            return None, []
+        dirs, files, subdirs = _classify_directory_contents(
+            self.filesystem, path, directory)
+        result = path, dirs, files
+        if self.visitor is not None:
+            self.visitor(*result)
+        prefix = self.filesystem.joinpaths(path, '')
+        return result, [(prefix + name, subdirs[name]) for name in dirs
+                        if subdirs.get(name) is not None]
+
+    def emit(self, result):
+        while not self.cancelled.is_set():
+            try:
+                self.results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def walk_subtrees(self, subtrees):
+        """Walk the given subtrees top-down, running in a worker thread."""
+        try:
+            stack = list(reversed(subtrees))
+            while stack and not self.cancelled.is_set():
+                result, subdirs = self.list_directory(*stack.pop())
+                if result is not None and self.visitor is None:
+                    self.emit(result)
+                stack.extend(reversed(subdirs))
+        finally:
+            self.emit(None)
+
+    def partition(self, top, directory):
+        """List the directories near `top` in the calling thread, until
+        there are enough subtrees to keep all workers busy.
+        Return the results for the listed directories, and the remaining
+        subtrees split into one list per task."""
+        results = []
+        subtrees = [(top, directory)]
+        wanted = self.workers * 4
+        while subtrees and len(subtrees) < wanted and len(results) < wanted:
+            result, subdirs = self.list_directory(*subtrees.pop(0))
+            if result is not None:
+                results.append(result)
+            subtrees.extend(subdirs)
+        tasks = [subtrees[i::self.workers] for i in range(self.workers)]
+        return results, [task for task in tasks if task]
+
+    def start(self, executor, tasks):
+        return [executor.submit(self.walk_subtrees, task) for task in tasks]
+
+    def visit(self, top, directory):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            _, tasks = self.partition(top, directory)
+            try:
+                for future in self.start(executor, tasks):
+                    future.result()
+            finally:
+                self.cancelled.set()
+
+    def iterate(self, top, directory):
+        results, tasks = self.partition(top, directory)
+        for result in results:
+            yield result
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = self.start(executor, tasks)
+            running = len(futures)
+            while running:
+                result = self.results.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+            for future in futures:
+                future.result()
+        finally:
+            self.cancelled.set()
+            executor.shutdown(wait=True)
+
+
+def walk_parallel(filesystem, top, workers=None, visitor=None):
+    """Walk the directory tree at `top` using a pool of worker threads.
+
+    See `FakeFilesystem.walk_parallel()` for the arguments.
+    """
+    top = to_string(make_string_path(top))
+    directory = filesystem.confirmdir(top)
+    if workers is None:
+        workers = min(32, (os.cpu_count() or 1) + 4)
+    elif workers < 1:
+        raise ValueError('The number of workers must be greater than 0')
+
+    if visitor is not None:
+        with filesystem.read_only():
+            walker = _ParallelWalker(filesystem, workers, visitor)
+            walker.visit(top, directory)
+        return None
+
+    def do_walk():
+        with filesystem.read_only():
+            walker = _ParallelWalker(filesystem, workers, None)
+            for result in walker.iterate(top, directory):
+                yield result
+
+    return do_walk()
 
 
 class FakeScanDirModule:
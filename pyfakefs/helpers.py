@@ -13,6 +13,7 @@
 """Helper classes use for fake file system implementation."""
 import io
 import locale
+import mmap
 import platform
 import stat
 import sys
@@ -290,6 +291,11 @@ class FileBufferIO:
     different handling of newline mode.
     Uses an io.BytesIO stream for the raw data and adds handling of encoding
     and newlines.
+    Bytes written to an empty stream are not copied: the stream shares the
+    bytes object until it is changed, and returns it from `getvalue()` and
+    from reading the whole stream. This way, file contents copied by reading
+    and writing them are shared between the files until one of them is
+    changed.
     """
 
     def __init__(self, contents=None, linesep='\n', binary=False,
@@ -299,6 +305,9 @@ class FileBufferIO:
         self.errors = errors
         self._linesep = linesep
         self.binary = binary
+        if isinstance(contents, (mmap.mmap, memoryview)):
+            self._bytestream = MappedBytesIO(contents)
+            return
         self._bytestream = io.BytesIO()
         if contents is not None:
             self.putvalue(contents)
@@ -409,7 +418,15 @@ class FileBufferIO:
                     return lines
 
     def putvalue(self, s):
-        self._bytestream.write(self.encoded_string(s))
+        contents = self.encoded_string(s)
+        position = self._bytestream.tell()
+        if not position and is_byte_string(contents):
+            if not self._bytestream.seek(0, io.SEEK_END):
+                self._bytestream = io.BytesIO(contents)
+                self._bytestream.seek(0, io.SEEK_END)
+                return
+            self._bytestream.seek(position)
+        self._bytestream.write(contents)
 
     def write(self, s):
         if self.binary != is_byte_string(s):
@@ -436,6 +453,62 @@ class FileBufferIO:
         return getattr(self._bytestream, name)
 
 
+class MappedBytesIO(io.BufferedIOBase):
+    """Read-only replacement for io.BytesIO that reads from a memory map
+    or a memory view without copying it as a whole. Truncating the stream
+    replaces the mapping with the remaining bytes, so that `FileBufferIO`
+    can change the stream to a new io.BytesIO if the contents are replaced.
+    """
+
+    def __init__(self, mapping):
+        super(MappedBytesIO, self).__init__()
+        self._mapping = mapping
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._mapping)
+        if offset < 0:
+            raise ValueError('negative seek value %d' % offset)
+        self._position = offset
+        return offset
+
+    def read(self, size=-1):
+        end = len(self._mapping)
+        if size is not None and size >= 0:
+            end = min(end, self._position + size)
+        contents = bytes(self._mapping[self._position:end])
+        self._position += len(contents)
+        return contents
+
+    read1 = read
+
+    def readinto(self, buffer):
+        contents = self.read(len(buffer))
+        buffer[:len(contents)] = contents
+        return len(contents)
+
+    def getvalue(self):
+        return bytes(self._mapping[:])
+
+    def truncate(self, size=None):
+        if size is None:
+            size = self._position
+        self._mapping = self._mapping[:size]
+        return size
+
+
 class NullFileBufferIO(FileBufferIO):
     """Special stream for null device. Does nothing on writing."""
 
@@ -22,6 +22,7 @@ from pyfakefs.tests import (
     dynamic_patch_test,
     fake_stat_time_test,
     example_test,
+    fake_filesystem_benchmark_test,
     fake_filesystem_glob_test,
     fake_filesystem_shutil_test,
     fake_filesystem_test,
@@ -55,7 +56,8 @@ class AllTests(unittest.TestSuite):
             loader.loadTestsFromModule(mox3_stubout_test),
             loader.loadTestsFromModule(dynamic_patch_test),
             loader.loadTestsFromModule(fake_pathlib_test),
-            loader.loadTestsFromModule(patched_packages_test)
+            loader.loadTestsFromModule(patched_packages_test),
+            loader.loadTestsFromModule(fake_filesystem_benchmark_test)
         ])
         return self
 
@@ -0,0 +1,85 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the benchmark runner in pyfakefs.benchmarks."""
+import json
+import os
+import unittest
+
+from pyfakefs.benchmarks import fake_filesystem_benchmark as bench
+from pyfakefs.benchmarks import fake_vs_real_benchmark
+
+
+class BenchmarkRunnerTest(unittest.TestCase):
+    def test_all_benchmarks_run(self):
+        results = bench.run_benchmarks(repeat=1, scale=0.001)
+        self.assertEqual(bench.FORMAT_VERSION, results['format_version'])
+        self.assertEqual(sorted(bench.benchmark_names()),
+                         sorted(results['results']))
+        for result in results['results'].values():
+            self.assertEqual(1, result['repeat'])
+            self.assertGreaterEqual(result['size'], 1)
+            self.assertLessEqual(result['min'], result['median'])
+            self.assertLessEqual(result['median'], result['max'])
+
+    def test_results_are_json_serializable(self):
+        results = bench.run_benchmarks(['create_file'], repeat=2,
+                                       scale=0.001)
+        self.assertEqual(['create_file'], list(results['results']))
+        self.assertEqual(results, json.loads(json.dumps(results)))
+
+    def test_compare_results(self):
+        old = {'format_version': bench.FORMAT_VERSION, 'results': {
+            'fast': {'size': 10, 'median': 1.0},
+            'slow': {'size': 10, 'median': 1.0},
+            'resized': {'size': 10, 'median': 1.0},
+            'removed': {'size': 10, 'median': 1.0},
+        }}
+        new = {'format_version': bench.FORMAT_VERSION, 'results': {
+            'fast': {'size': 10, 'median': 0.5},
+            'slow': {'size': 10, 'median': 1.5},
+            'resized': {'size': 20, 'median': 2.0},
+            'added': {'size': 10, 'median': 1.0},
+        }}
+        comparison = bench.compare_results(old, new, threshold=0.1)
+        self.assertEqual([('fast', 1.0, 0.5, 0.5, False),
+                          ('slow', 1.0, 1.5, 1.5, True)],
+                         sorted(comparison))
+
+    def test_compare_results_with_different_formats(self):
+        old = {'format_version': 0, 'results': {}}
+        new = {'format_version': bench.FORMAT_VERSION, 'results': {}}
+        with self.assertRaises(ValueError):
+            bench.compare_results(old, new)
+
+
+class FakeVsRealBenchmarkTest(unittest.TestCase):
+    def test_all_workloads_run(self):
+        results = fake_vs_real_benchmark.run_comparison(repeat=1, scale=0.001)
+        self.assertEqual(bench.FORMAT_VERSION, results['format_version'])
+        self.assertEqual(sorted(fake_vs_real_benchmark.workload_names()),
+                         sorted(results['results']))
+        for result in results['results'].values():
+            self.assertIn('median', result['real'])
+            self.assertIn('median', result['fake'])
+            self.assertGreater(result['speedup'], 0)
+        self.assertEqual(results, json.loads(json.dumps(results)))
+
+    def test_real_directory_is_removed(self):
+        env = fake_vs_real_benchmark.RealEnvironment()
+        env.new_directory()
+        env.cleanup()
+        self.assertFalse(os.path.exists(env.root))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,9 +16,12 @@
 
 import glob
 import os
+import sys
 import unittest
 
-from pyfakefs import fake_filesystem_unittest
+from pyfakefs import fake_filesystem, fake_filesystem_unittest
+from pyfakefs.fake_filesystem import set_uid, reset_ids
+from pyfakefs.fake_glob import FakeGlobModule
 
 
 class FakeGlobUnitTest(fake_filesystem_unittest.TestCase):
@@ -69,6 +72,94 @@ class FakeGlobUnitTest(fake_filesystem_unittest.TestCase):
         self.assertTrue(glob.has_magic('['))
         self.assertFalse(glob.has_magic('a'))
 
+    def test_glob_module_is_faked(self):
+        self.assertIsInstance(glob, FakeGlobModule)
+
+    def test_glob_bytes(self):
+        self.assertEqual([b'/xyzzy/subfile'], glob.glob(b'/xyzzy/*f*'))
+
+    def test_glob_directories_only(self):
+        self.assertEqual(['/xyzzy/subdir/', '/xyzzy/subdir2/'],
+                         sorted(glob.glob('/xyzzy/*/')))
+
+    def test_glob_recursive(self):
+        self.fs.create_file('/xyzzy/subdir/file.py')
+        self.fs.create_file('/xyzzy/subdir/sub/file2.py')
+        self.assertEqual(['/xyzzy/subdir/file.py'],
+                         glob.glob('/xyzzy/**/*.py'))
+        self.assertEqual(['/xyzzy/subdir/file.py',
+                          '/xyzzy/subdir/sub/file2.py'],
+                         sorted(glob.glob('/xyzzy/**/*.py', recursive=True)))
+        self.assertEqual(['/xyzzy/', '/xyzzy/subdir/', '/xyzzy/subdir/sub/',
+                          '/xyzzy/subdir2/'],
+                         sorted(glob.glob('/xyzzy/**/', recursive=True)))
+
+    def test_glob_hidden(self):
+        self.fs.create_file('/xyzzy/.hidden/file.py')
+        self.fs.create_file('/xyzzy/.file.py')
+        self.assertEqual([], glob.glob('/xyzzy/**/*.py', recursive=True))
+        self.assertEqual(['/xyzzy/.file.py'], glob.glob('/xyzzy/.*.py'))
+        self.assertEqual(['/xyzzy/.hidden/file.py'],
+                         glob.glob('/xyzzy/.*/*.py'))
+
+    @unittest.skipIf(sys.version_info < (3, 11),
+                     'include_hidden new in Python 3.11')
+    def test_glob_include_hidden(self):
+        self.fs.create_file('/xyzzy/.hidden/file.py')
+        self.assertEqual(['/xyzzy/.hidden/file.py'],
+                         glob.glob('/xyzzy/**/*.py', recursive=True,
+                                   include_hidden=True))
+
+    @unittest.skipIf(sys.version_info < (3, 10),
+                     'root_dir new in Python 3.10')
+    def test_glob_root_dir(self):
+        self.assertEqual(['subdir', 'subdir2', 'subfile'],
+                         sorted(glob.glob('*', root_dir='/xyzzy')))
+        self.assertEqual([], glob.glob('*', root_dir='/non_existing'))
+
+    def test_iglob_is_lazy(self):
+        matches = glob.iglob('/xyzzy/*')
+        self.fs.create_file('/xyzzy/new_file')
+        self.assertIn('/xyzzy/new_file', list(matches))
+
+    def test_glob_follows_symlinks(self):
+        self.fs.create_file('/xyzzy/subdir/file.py')
+        self.fs.create_symlink('/link', '/xyzzy')
+        self.assertEqual(['/link/subdir/file.py'],
+                         glob.glob('/link/*/*.py'))
+        self.assertEqual(['/link/subdir/file.py'],
+                         glob.glob('/link/**/*.py', recursive=True))
+
+    def test_glob_symlink_loop(self):
+        self.fs.create_symlink('/xyzzy/subdir/loop', '/xyzzy/subdir')
+        matches = glob.glob('/xyzzy/**/loop', recursive=True)
+        self.assertIn('/xyzzy/subdir/loop', matches)
+        self.assertIn('/xyzzy/subdir/loop/loop', matches)
+
+    def test_glob_unreadable_directory(self):
+        self.fs.create_file('/xyzzy/subdir/file.py')
+        os.chmod('/xyzzy/subdir', 0o000)
+        set_uid(42)
+        try:
+            self.assertEqual([], glob.glob('/xyzzy/*/*.py'))
+        finally:
+            reset_ids()
+
+
+class FakeGlobWindowsTest(unittest.TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='\\')
+        self.filesystem.is_windows_fs = True
+        self.filesystem.is_case_sensitive = False
+        self.filesystem.create_file('C:\\xyzzy\\File.PY')
+        self.glob = FakeGlobModule(self.filesystem)
+
+    def test_glob_ignores_case(self):
+        self.assertEqual(['C:\\XYZZY\\File.PY'],
+                         self.glob.glob('C:\\XYZZY\\*.py'))
+        self.assertEqual(['c:\\xyzzy\\File.PY'],
+                         self.glob.glob('c:\\*\\f*'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -69,6 +69,19 @@ class FakeShutilModuleTest(RealFsTestCase):
         self.assertFalse(os.path.exists(dir_path))
         self.assertFalse(os.path.exists(file_path))
 
+    def test_rmtree_updates_disk_usage(self):
+        self.skip_real_fs()
+        directory = self.make_path('xyzzy')
+        self.fs.create_file(os.path.join(directory, 'subfile'),
+                            contents='abc')
+        self.fs.create_file(os.path.join(directory, 'subdir', 'subfile'),
+                            contents='defg')
+        self.fs.create_file(self.make_path('other'), contents='hi')
+        self.assertEqual(9, shutil.disk_usage(directory).used)
+        shutil.rmtree(directory)
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(2, shutil.disk_usage(self.base_path).used)
+
     def test_rmtree_with_trailing_slash(self):
         directory = self.make_path('xyzzy')
         dir_path = os.path.join(directory, 'subdir')
@@ -266,6 +279,82 @@ class FakeShutilModuleTest(RealFsTestCase):
         with self.assertRaises(OSError):
             shutil.copytree(src_file, dst_directory)
 
+    def test_copytree_copies_contents_and_metadata(self):
+        src_directory = self.make_path('xyzzy')
+        dst_directory = self.make_path('xyzzy_copy')
+        src_file = os.path.join(src_directory, 'subdir', 'subfile')
+        dst_file = os.path.join(dst_directory, 'subdir', 'subfile')
+        self.create_file(src_file, contents='abc')
+        os.chmod(src_file, 0o750)
+        os.utime(src_file, (1000, 2000))
+        shutil.copytree(src_directory, dst_directory)
+        self.check_contents(dst_file, b'abc')
+        src_stat = os.stat(src_file)
+        dst_stat = os.stat(dst_file)
+        self.assertEqual(src_stat.st_mode, dst_stat.st_mode)
+        self.assertEqual(2000, dst_stat.st_mtime)
+
+    def test_copytree_with_ignore(self):
+        src_directory = self.make_path('xyzzy')
+        dst_directory = self.make_path('xyzzy_copy')
+        self.create_file(os.path.join(src_directory, 'foo.txt'))
+        self.create_file(os.path.join(src_directory, 'foo.py'))
+        self.create_file(os.path.join(src_directory, 'sub', 'bar.py'))
+        visited = []
+
+        def ignore(path, names):
+            visited.append((path, sorted(names)))
+            return shutil.ignore_patterns('*.py')(path, names)
+
+        shutil.copytree(src_directory, dst_directory, ignore=ignore)
+        self.assertEqual(
+            [(src_directory, ['foo.py', 'foo.txt', 'sub']),
+             (os.path.join(src_directory, 'sub'), ['bar.py'])],
+            sorted(visited))
+        self.assertEqual(['foo.txt', 'sub'],
+                         sorted(os.listdir(dst_directory)))
+        self.assertEqual(
+            [], os.listdir(os.path.join(dst_directory, 'sub')))
+
+    def test_copytree_shares_file_contents(self):
+        self.skip_real_fs()
+        src_directory = self.make_path('xyzzy')
+        dst_directory = self.make_path('xyzzy_copy')
+        src_file = os.path.join(src_directory, 'subfile')
+        dst_file = os.path.join(dst_directory, 'subfile')
+        src_object = self.fs.create_file(src_file, contents='abc')
+        shutil.copytree(src_directory, dst_directory)
+        dst_object = self.fs.get_object(dst_file)
+        self.assertIsNot(src_object, dst_object)
+        self.assertIs(src_object.byte_contents, dst_object.byte_contents)
+        self.assertEqual(6, shutil.disk_usage(dst_directory).used)
+        with open(dst_file, 'a') as f:
+            f.write('def')
+        self.check_contents(src_file, b'abc')
+        self.check_contents(dst_file, b'abcdef')
+        self.assertEqual(9, shutil.disk_usage(dst_directory).used)
+
+    def test_copytree_without_space_fails(self):
+        self.skip_real_fs()
+        src_directory = self.make_path('xyzzy')
+        dst_directory = self.make_path('xyzzy_copy')
+        self.fs.create_file(os.path.join(src_directory, 'subfile'),
+                            contents='a' * 600)
+        with self.assertRaises(shutil.Error):
+            shutil.copytree(src_directory, dst_directory)
+        self.assertEqual(600, shutil.disk_usage(dst_directory).used)
+
+    def test_copyfile_shares_contents(self):
+        self.skip_real_fs()
+        src_file = self.make_path('xyzzy')
+        dst_file = self.make_path('xyzzy_copy')
+        src_object = self.fs.create_file(src_file, contents='abc')
+        self.fs.create_file(dst_file, contents='defghi')
+        shutil.copyfile(src_file, dst_file)
+        dst_object = self.fs.get_object(dst_file)
+        self.assertIs(src_object.byte_contents, dst_object.byte_contents)
+        self.assertEqual(6, shutil.disk_usage(dst_file).used)
+
     def test_move_file_in_same_filesystem(self):
         self.skip_real_fs()
         src_file = '/original_xyzzy'
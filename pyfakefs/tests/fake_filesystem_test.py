@@ -17,11 +17,16 @@
 
 import contextlib
 import errno
+import io
 import os
 import stat
 import sys
+import tarfile
+import tempfile
 import time
 import unittest
+import zipfile
+from unittest import mock
 
 from pyfakefs import fake_filesystem
 from pyfakefs.fake_filesystem import set_uid, set_gid, is_root, reset_ids
@@ -63,6 +68,19 @@ class FakeDirectoryUnitTest(TestCase):
         self.assertEqual('/somedir/foobar', self.fake_file.path)
         self.assertEqual('/somedir', self.fake_dir.path)
 
+    def test_str(self):
+        self.filesystem.create_file('/somedir/foo/bar',
+                                    st_mode=stat.S_IFREG | 0o644)
+        self.filesystem.create_dir('/somedir/foo/baz', perm_bits=0o755)
+        self.filesystem.create_file('/somedir/foobar',
+                                    st_mode=stat.S_IFREG | 0o600)
+        self.assertEqual('somedir(40777):\n'
+                         '  foo(40777):\n'
+                         '    bar(100644)\n'
+                         '    baz(40755):\n'
+                         '  foobar(100600)\n',
+                         str(self.filesystem.resolve('/somedir')))
+
     def test_path_with_drive(self):
         self.filesystem.is_windows_fs = True
         dir_path = 'C:/foo/bar/baz'
@@ -172,6 +190,80 @@ class FakeDirectoryUnitTest(TestCase):
         fake_dir = filesystem.get_object('/foo')
         self.assertEqual(['2', '4', '1', '3'], fake_dir.ordered_dirs)
 
+    def test_shared_contents(self):
+        filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        filesystem.create_file('/foo/1')
+        fake_dir = filesystem.get_object('/foo')
+        contents = fake_dir.shared_contents()
+        self.assertIs(contents, fake_dir.contents)
+        filesystem.create_file('/foo/2')
+        self.assertEqual(['1'], list(contents))
+        self.assertEqual(['1', '2'], sorted(fake_dir.contents))
+        fake_dir.release_contents(contents)
+
+        contents = fake_dir.shared_contents()
+        fake_dir.release_contents(contents)
+        filesystem.remove_object('/foo/1')
+        self.assertIs(contents, fake_dir.contents)
+        self.assertEqual(['2'], list(contents))
+
+    def test_ordered_dirs_after_changes(self):
+        filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        for name in ('2', '4', '1', '3'):
+            filesystem.create_file('/foo/' + name)
+        filesystem.create_file('/bar/5')
+        fake_dir = filesystem.get_object('/foo')
+        self.assertEqual(['2', '4', '1', '3'], fake_dir.ordered_dirs)
+        filesystem.remove_object('/foo/4')
+        filesystem.create_file('/foo/0')
+        filesystem.rename('/bar/5', '/foo/5')
+        self.assertEqual(['2', '1', '3', '5', '0'], fake_dir.ordered_dirs)
+        fake_dir.get_entry('2').st_ino = 100
+        self.assertEqual(['1', '3', '5', '0', '2'], fake_dir.ordered_dirs)
+
+    def test_ordered_entries(self):
+        filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        for name in ('b', 'd', 'a', 'c'):
+            filesystem.create_file('/foo/' + name)
+        fake_dir = filesystem.get_object('/foo')
+        self.assertEqual(['b', 'd', 'a', 'c'],
+                         [name for _, name in fake_dir.ordered_entries()])
+        self.assertEqual(['a', 'b', 'c', 'd'],
+                         [name for _, name in
+                          fake_dir.ordered_entries(by_name=True)])
+        filesystem.create_file('/foo/bb')
+        filesystem.remove_object('/foo/c')
+        self.assertEqual(['a', 'b', 'bb', 'd'],
+                         [name for _, name in
+                          fake_dir.ordered_entries(by_name=True)])
+
+    def test_resume_ordered_entries(self):
+        filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        for name in ('b', 'd', 'a', 'c'):
+            filesystem.create_file('/foo/' + name)
+        fake_dir = filesystem.get_object('/foo')
+        for by_name, expected in ((False, ['b', 'd', 'a', 'c']),
+                                  (True, ['a', 'b', 'c', 'd'])):
+            entries = fake_dir.ordered_entries(by_name=by_name)
+            position, first = next(entries)
+            names = [first]
+            entries.close()
+            for position, name in fake_dir.ordered_entries(
+                    by_name=by_name, start=position):
+                names.append(name)
+            self.assertEqual(expected, names)
+
+        entries = fake_dir.ordered_entries(by_name=True)
+        position, name = next(entries)
+        self.assertEqual('a', name)
+        filesystem.remove_object('/foo/a')
+        filesystem.remove_object('/foo/b')
+        filesystem.create_file('/foo/e')
+        self.assertEqual(['c', 'd', 'e'], [name for _, name in entries])
+        self.assertEqual(['c', 'd', 'e'],
+                         [name for _, name in fake_dir.ordered_entries(
+                             by_name=True, start=position)])
+
 
 class SetLargeFileSizeTest(TestCase):
     def setUp(self):
@@ -644,6 +736,28 @@ class FakeFilesystemUnitTest(TestCase):
         self.filesystem.is_windows_fs = False
         self.check_directory_access_on_file(errno.ENOTDIR)
 
+    def test_reset(self):
+        self.filesystem.umask = 0o027
+        dev_null = self.filesystem.dev_null
+        streams = self.filesystem.open_files[:3]
+        self.filesystem.create_file('/foo/bar')
+        self.filesystem.open_files.append(None)
+        self.filesystem.reset()
+        self.assertFalse(self.filesystem.exists('/foo'))
+        self.assertEqual(streams, self.filesystem.open_files)
+        self.assertIs(dev_null, self.filesystem.dev_null)
+        self.assertEqual(0o027, self.filesystem.umask)
+
+    def test_reset_closes_open_files(self):
+        self.filesystem.create_file('/foo/bar')
+        fake_open = fake_filesystem.FakeFileOpen(self.filesystem)
+        open_file = fake_open('/foo/bar', 'w')
+        with self.filesystem.read_only():
+            self.filesystem.reset()
+            self.assertIsNone(self.filesystem.read_only_guard)
+        self.assertTrue(open_file.closed)
+        self.assertEqual(3, len(self.filesystem.open_files))
+
     def test_pickle_fs(self):
         """Regression test for #445"""
         import pickle
@@ -1892,6 +2006,89 @@ class RealFileSystemAccessTest(TestCase):
         with self.fake_open(real_file_path, 'rb') as f:
             self.assertEqual(b'foo', f.read())
 
+    def test_real_file_stat_only_on_first_load(self):
+        real_file_path = os.path.abspath(__file__)
+        fake_file = self.filesystem.add_real_file(real_file_path)
+        with mock.patch('os.stat', wraps=os.stat) as real_stat:
+            contents = fake_file.byte_contents
+            self.assertEqual(1, real_stat.call_count)
+            with self.fake_open(real_file_path, 'rb') as f:
+                self.assertEqual(contents, f.read())
+            self.assertEqual(contents, fake_file.byte_contents)
+            self.assertEqual(1, real_stat.call_count)
+
+    def test_sync_atime_of_real_file(self):
+        real_file_path = os.path.abspath(__file__)
+        fake_file = self.filesystem.add_real_file(real_file_path)
+        fake_file.byte_contents
+        fake_file.st_atime = 0
+        fake_file.sync_atime()
+        self.assertAlmostEqual(os.stat(real_file_path).st_atime,
+                               fake_file.st_atime, places=5)
+
+    def test_read_mmapped_real_file(self):
+        real_file_path = os.path.abspath(__file__)
+        fake_file = self.filesystem.add_real_file(real_file_path,
+                                                  use_mmap=True)
+        with open(real_file_path, 'rb') as f:
+            real_contents = f.read()
+        with self.fake_open(real_file_path, 'rb') as f:
+            self.assertEqual(real_contents[:100], f.read(100))
+            f.seek(-100, os.SEEK_END)
+            self.assertEqual(real_contents[-100:], f.read())
+        with self.fake_open(real_file_path, newline='',
+                            encoding='utf8') as f:
+            self.assertEqual(real_contents.decode('utf8').splitlines(True),
+                             f.readlines())
+        self.assertIsNone(fake_file._byte_contents)
+        self.assertEqual(real_contents, fake_file.byte_contents)
+        self.assertIs(fake_file.byte_contents, fake_file.byte_contents)
+        self.assertIsNone(fake_file.mapped_contents())
+
+    def test_mmapped_real_file_is_unmapped_on_close(self):
+        real_file_path = os.path.abspath(__file__)
+        self.filesystem.add_real_file(real_file_path, use_mmap=True)
+        f = self.fake_open(real_file_path, 'rb')
+        mapping = f._mapping
+        self.assertFalse(mapping.closed)
+        f.close()
+        self.assertTrue(mapping.closed)
+        f = self.fake_open(real_file_path, 'rb')
+        mapping = f._mapping
+        self.filesystem.reset()
+        self.assertTrue(mapping.closed)
+
+    def test_read_mmapped_empty_real_file(self):
+        real_file_path = os.path.join(self.pyfakefs_path, 'tests',
+                                      '__init__.py')
+        self.filesystem.add_real_file(real_file_path, use_mmap=True)
+        with self.fake_open(real_file_path, 'rb') as f:
+            self.assertEqual(b'', f.read())
+
+    def test_write_mmapped_real_file(self):
+        real_file_path = os.path.abspath(__file__)
+        fake_file = self.filesystem.add_real_file(real_file_path,
+                                                  read_only=False,
+                                                  use_mmap=True)
+        with self.fake_open(real_file_path, 'rb') as reader:
+            reader.read(10)
+            with self.fake_open(real_file_path, 'wb') as f:
+                f.write(b'test')
+            self.assertIsNone(fake_file.mapped_contents())
+            self.assertEqual(b'', reader.read())
+        with self.fake_open(real_file_path, 'rb') as f:
+            self.assertEqual(b'test', f.read())
+
+    def test_add_real_directory_with_mmap(self):
+        self.filesystem.add_real_directory(self.pyfakefs_path, use_mmap=True)
+        file_path = os.path.join(self.pyfakefs_path, 'tests',
+                                 'fake_filesystem_test.py')
+        fake_file = self.filesystem.resolve(file_path)
+        self.assertTrue(fake_file.use_mmap)
+        with self.fake_open(file_path, encoding='utf8') as f:
+            self.assertIn('test_add_real_directory_with_mmap', f.read())
+        self.assertIsNone(fake_file._byte_contents)
+
     def test_add_existing_real_directory_read_only(self):
         self.filesystem.add_real_directory(self.pyfakefs_path)
         self.assertTrue(self.filesystem.exists(self.pyfakefs_path))
@@ -2109,6 +2306,18 @@ class RealFileSystemAccessTest(TestCase):
         self.assertGreater(disk_size,
                            self.filesystem.get_disk_usage(real_dir_path).free)
 
+    def test_read_lazily_added_real_directory_in_one_pass(self):
+        fake_dir = self.filesystem.add_real_directory(self.pyfakefs_path)
+        with mock.patch('os.stat', wraps=os.stat) as real_stat:
+            with mock.patch('os.path.isdir', wraps=os.path.isdir) as isdir:
+                self.assertIn('fake_filesystem.py', fake_dir.contents)
+                real_stat.assert_not_called()
+                isdir.assert_not_called()
+        file_path = os.path.join(self.pyfakefs_path, 'fake_filesystem.py')
+        fake_file = self.filesystem.resolve(file_path)
+        self.check_fake_file_stat(fake_file, file_path)
+        self.check_read_only_file(fake_file, file_path)
+
     def test_add_existing_real_directory_not_lazily(self):
         disk_size = 1024 * 1024 * 1024
         self.filesystem.set_disk_usage(disk_size, self.pyfakefs_path)
@@ -2119,6 +2328,128 @@ class RealFileSystemAccessTest(TestCase):
         self.assertGreater(disk_size, self.filesystem.get_disk_usage(
             self.pyfakefs_path).free)
 
+    def test_add_real_directory_not_lazily_with_workers(self):
+        self.filesystem.add_real_directory(self.pyfakefs_path,
+                                           lazy_read=False, workers=4)
+        file_path = os.path.join(self.pyfakefs_path, 'tests',
+                                 'fake_filesystem_test.py')
+        fake_file = self.filesystem.resolve(file_path)
+        self.check_fake_file_stat(fake_file, file_path)
+        self.check_read_only_file(fake_file, file_path)
+
+    def test_add_real_directory_with_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            self.filesystem.add_real_directory(self.pyfakefs_path,
+                                               lazy_read=False, workers=0)
+
+    def test_add_empty_real_directory_not_lazily(self):
+        with tempfile.TemporaryDirectory() as real_dir_path:
+            os.makedirs(os.path.join(real_dir_path, 'empty', 'sub'))
+            self.filesystem.add_real_directory(real_dir_path,
+                                               lazy_read=False)
+        self.assertTrue(self.filesystem.isdir(
+            os.path.join(real_dir_path, 'empty', 'sub')))
+
+    def test_add_real_directory_with_cache_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            real_dir_path = os.path.join(temp_dir, 'real')
+            os.makedirs(os.path.join(real_dir_path, 'sub'))
+            with open(os.path.join(real_dir_path, 'sub', 'a'), 'w') as f:
+                f.write('foo')
+            cache_file = os.path.join(temp_dir, 'cache.json')
+            self.filesystem.add_real_directory(
+                real_dir_path, lazy_read=False, cache_file=cache_file)
+            self.assertTrue(os.path.exists(cache_file))
+
+            filesystem = fake_filesystem.FakeFilesystem()
+            with mock.patch('os.scandir') as real_scandir:
+                filesystem.add_real_directory(
+                    real_dir_path, lazy_read=False, cache_file=cache_file)
+                real_scandir.assert_not_called()
+            fake_file = filesystem.resolve(
+                os.path.join(real_dir_path, 'sub', 'a'))
+            self.assertEqual(3, fake_file.st_size)
+            self.assertEqual(b'foo', fake_file.byte_contents)
+
+    def test_add_real_directory_with_changed_cache_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            real_dir_path = os.path.join(temp_dir, 'real')
+            os.makedirs(os.path.join(real_dir_path, 'sub'))
+            cache_file = os.path.join(temp_dir, 'cache.json')
+            self.filesystem.add_real_directory(
+                real_dir_path, lazy_read=False, cache_file=cache_file)
+            with open(os.path.join(real_dir_path, 'sub', 'a'), 'w') as f:
+                f.write('foo')
+
+            filesystem = fake_filesystem.FakeFilesystem()
+            filesystem.add_real_directory(
+                real_dir_path, lazy_read=False, cache_file=cache_file)
+            self.assertTrue(filesystem.exists(
+                os.path.join(real_dir_path, 'sub', 'a')))
+
+    def test_add_real_overlay_loads_looked_up_entries(self):
+        fake_dir = self.filesystem.add_real_overlay(self.pyfakefs_path)
+        self.assertEqual(0, dict.__len__(fake_dir.byte_contents))
+        file_path = os.path.join(self.pyfakefs_path, 'tests',
+                                 'fake_filesystem_test.py')
+        self.assertTrue(self.filesystem.exists(file_path))
+        self.assertEqual(['tests'], list(dict.keys(fake_dir.byte_contents)))
+        self.assertFalse(self.filesystem.exists(
+            os.path.join(self.pyfakefs_path, 'non_existing')))
+        fake_file = self.filesystem.resolve(file_path)
+        self.check_fake_file_stat(fake_file, file_path)
+        self.check_read_only_file(fake_file, file_path)
+
+    def test_case_insensitive_lookup_in_real_overlay(self):
+        self.filesystem.is_case_sensitive = False
+        fake_dir = self.filesystem.add_real_overlay(self.pyfakefs_path)
+        file_path = os.path.join(self.pyfakefs_path, 'TESTS',
+                                 'Fake_Filesystem_Test.py')
+        self.assertTrue(self.filesystem.exists(file_path))
+        self.assertFalse(self.filesystem.exists(
+            os.path.join(self.pyfakefs_path, 'non_existing')))
+        self.assertEqual(['tests'], list(dict.keys(fake_dir.byte_contents)))
+        tests_dir = fake_dir.get_entry('Tests')
+        self.assertEqual(['fake_filesystem_test.py'],
+                         list(dict.keys(tests_dir.byte_contents)))
+
+    def test_real_overlay_entry_with_other_case_is_not_duplicated(self):
+        fake_dir = self.filesystem.add_real_overlay(self.pyfakefs_path)
+        with mock.patch.object(fake_filesystem.FakeOverlayDirectory,
+                               'REAL_CASE_SENSITIVE', False):
+            self.assertNotIn('TESTS', fake_dir.contents)
+            self.assertIn('tests', fake_dir.contents)
+            self.assertEqual(sorted(os.listdir(self.pyfakefs_path)),
+                             sorted(fake_dir.contents))
+
+    def test_list_real_overlay(self):
+        self.filesystem.add_real_overlay(self.pyfakefs_path)
+        fake_os = fake_filesystem.FakeOsModule(self.filesystem)
+        self.assertTrue(fake_os.path.isdir(
+            os.path.join(self.pyfakefs_path, 'tests')))
+        self.assertEqual(sorted(os.listdir(self.pyfakefs_path)),
+                         sorted(fake_os.listdir(self.pyfakefs_path)))
+
+    def test_change_real_overlay(self):
+        self.filesystem.add_real_overlay(self.pyfakefs_path)
+        fake_os = fake_filesystem.FakeOsModule(self.filesystem)
+        file_path = os.path.join(self.pyfakefs_path, 'fake_filesystem.py')
+        fake_os.remove(file_path)
+        self.assertFalse(self.filesystem.exists(file_path))
+        self.assertNotIn('fake_filesystem.py',
+                         fake_os.listdir(self.pyfakefs_path))
+        self.assertTrue(os.path.exists(file_path))
+
+        new_path = os.path.join(self.pyfakefs_path, 'new_file.txt')
+        self.filesystem.create_file(new_path, contents='test')
+        self.assertIn('new_file.txt', fake_os.listdir(self.pyfakefs_path))
+        self.assertFalse(os.path.exists(new_path))
+
+    def test_add_non_existing_real_overlay_raises(self):
+        self.assert_raises_os_error(errno.ENOENT,
+                                    self.filesystem.add_real_overlay,
+                                    os.path.join('nonexisting', 'dir'))
+
     def test_add_existing_real_directory_read_write(self):
         self.filesystem.add_real_directory(self.pyfakefs_path, read_only=False)
         self.assertTrue(self.filesystem.exists(self.pyfakefs_path))
@@ -2195,5 +2526,557 @@ class FileSideEffectTests(TestCase):
         self.assertEquals(self.side_effect_file_object_content, 'foo')
 
 
+class WalkParallelTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        for i in range(5):
+            for j in range(5):
+                for k in range(3):
+                    self.filesystem.create_file(
+                        '/walk/dir%d/sub%d/file%d' % (i, j, k))
+        self.filesystem.create_file('/walk/file')
+        self.os = fake_filesystem.FakeOsModule(self.filesystem)
+
+    @staticmethod
+    def sorted_results(results):
+        return sorted((path, sorted(dirs), sorted(files))
+                      for path, dirs, files in results)
+
+    def test_same_results_as_walk(self):
+        self.filesystem.create_symlink('/walk/dir0/link', '/walk')
+        expected = self.sorted_results(self.os.walk('/walk'))
+        for workers in (1, 2, 8):
+            self.assertEqual(expected, self.sorted_results(
+                self.filesystem.walk_parallel('/walk', workers=workers)))
+
+    def test_subtree_is_walked_top_down(self):
+        paths = [path for path, _, _ in
+                 self.filesystem.walk_parallel('/walk', workers=2)]
+        self.assertEqual('/walk', paths[0])
+        self.assertLess(paths.index('/walk/dir3'),
+                        paths.index('/walk/dir3/sub3'))
+
+    def test_visitor(self):
+        results = []
+
+        def visitor(path, dirs, files):
+            results.append((path, dirs[:], files))
+            if 'dir2' in dirs:
+                dirs.remove('dir2')
+
+        self.assertIsNone(self.filesystem.walk_parallel(
+            '/walk', workers=4, visitor=visitor))
+        self.assertEqual(25, len(results))
+        self.assertFalse(any(path.startswith('/walk/dir2')
+                             for path, _, _ in results))
+
+    def test_visitor_exception_is_raised(self):
+        def visitor(path, dirs, files):
+            if path == '/walk/dir1/sub1':
+                raise ValueError(path)
+
+        with self.assertRaises(ValueError):
+            self.filesystem.walk_parallel('/walk', workers=4,
+                                          visitor=visitor)
+        self.assertIsNone(self.filesystem.read_only_guard)
+
+    def test_tree_is_read_only_during_walk(self):
+        def visitor(path, dirs, files):
+            self.filesystem.create_file(path + '/new')
+
+        with self.assertRaises(RuntimeError):
+            self.filesystem.walk_parallel('/walk', visitor=visitor)
+        walker = self.filesystem.walk_parallel('/walk')
+        next(walker)
+        with self.assertRaises(RuntimeError):
+            self.filesystem.remove_object('/walk/file')
+        walker.close()
+        self.filesystem.remove_object('/walk/file')
+        self.assertFalse(self.filesystem.exists('/walk/file'))
+
+    def test_nested_read_only(self):
+        with self.filesystem.read_only():
+            with self.filesystem.read_only():
+                self.assertRaises(RuntimeError,
+                                  self.filesystem.create_dir, '/foo')
+            self.assertRaises(RuntimeError,
+                              self.filesystem.create_dir, '/foo')
+        self.filesystem.create_dir('/foo')
+
+    def test_lazy_real_directories_are_loaded_while_read_only(self):
+        with tempfile.TemporaryDirectory() as real_dir:
+            os.mkdir(os.path.join(real_dir, 'sub'))
+            with open(os.path.join(real_dir, 'sub', 'a.txt'), 'w'):
+                pass
+            self.filesystem.add_real_directory(real_dir, target_path='/real')
+            self.filesystem.add_real_overlay(real_dir, target_path='/ovl')
+            with self.filesystem.read_only():
+                self.assertTrue(self.filesystem.exists('/real/sub/a.txt'))
+                self.assertTrue(self.filesystem.exists('/ovl/sub/a.txt'))
+                self.assertEqual(['sub'], self.filesystem.listdir('/ovl'))
+                self.assertRaises(RuntimeError,
+                                  self.filesystem.create_dir, '/ovl/foo')
+
+    def test_non_readable_directory_is_not_listed(self):
+        self.filesystem.chmod('/walk/dir1', 0o000)
+        set_uid(42)
+        try:
+            paths = [path for path, _, _ in
+                     self.filesystem.walk_parallel('/walk', workers=2)]
+        finally:
+            reset_ids()
+        self.assertEqual(25, len(paths))
+        self.assertNotIn('/walk/dir1', paths)
+
+    def test_invalid_arguments(self):
+        self.assert_raises_os_error(errno.ENOENT,
+                                    self.filesystem.walk_parallel, '/foo')
+        self.assert_raises_os_error(errno.ENOTDIR,
+                                    self.filesystem.walk_parallel,
+                                    '/walk/file')
+        with self.assertRaises(ValueError):
+            self.filesystem.walk_parallel('/walk', workers=0)
+
+
+class StatManyTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        self.filesystem.create_file('/foo/bar/baz', contents='abc')
+        self.filesystem.create_file('/foo/bar/other')
+        self.filesystem.create_dir('/foo/dir')
+        self.filesystem.create_symlink('/foo/bar/link', '/foo/dir')
+        self.filesystem.create_symlink('/foo/broken', '/foo/missing')
+        self.paths = ['/foo/bar/baz', '/foo/missing', '/foo/bar/other',
+                      '/foo/bar/baz/bar', '/foo/bar/link', '/foo/broken',
+                      '/foo/bar/', '/foo/bar/baz/', 'foo/dir', '/']
+
+    def check_same_as_stat(self, follow_symlinks):
+        results = self.filesystem.stat_many(self.paths, follow_symlinks)
+        self.assertEqual(len(self.paths), len(results))
+        for path, result in zip(self.paths, results):
+            try:
+                expected = self.filesystem.stat(path, follow_symlinks)
+            except OSError as exc:
+                self.assertIsInstance(result, OSError)
+                self.assertEqual(exc.errno, result.errno)
+                self.assertEqual(exc.filename, result.filename)
+            else:
+                self.assertEqual(expected, result)
+
+    def test_same_results_as_stat(self):
+        self.check_same_as_stat(follow_symlinks=True)
+
+    def test_same_results_as_lstat(self):
+        self.check_same_as_stat(follow_symlinks=False)
+
+    def test_results(self):
+        results = self.filesystem.stat_many(
+            ['/foo/bar/baz', '/foo/missing', '/foo/bar/link'])
+        self.assertEqual(3, results[0].st_size)
+        self.assertEqual(errno.ENOENT, results[1].errno)
+        self.assertTrue(stat.S_ISDIR(results[2].st_mode))
+        self.assertEqual([], self.filesystem.stat_many([]))
+
+    def test_case_insensitive(self):
+        self.filesystem.is_case_sensitive = False
+        results = self.filesystem.stat_many(['/FOO/Bar/BAZ', '/foo/BAR'])
+        self.assertEqual(3, results[0].st_size)
+        self.assertTrue(stat.S_ISDIR(results[1].st_mode))
+
+    def test_non_readable_parent(self):
+        self.filesystem.chmod('/foo/bar', 0o000)
+        set_uid(42)
+        try:
+            self.check_same_as_stat(follow_symlinks=True)
+            self.check_same_as_stat(follow_symlinks=False)
+        finally:
+            reset_ids()
+        self.check_same_as_stat(follow_symlinks=False)
+
+    def test_exists_many(self):
+        self.filesystem.create_file('/foo/bar/baz2')
+        self.assertEqual(
+            [self.filesystem.exists(path) for path in self.paths],
+            self.filesystem.exists_many(self.paths))
+        self.assertEqual([True, False, True, False, True, False],
+                         self.filesystem.exists_many(
+                             ['/foo/bar/baz', '/foo/bar/bax', 'foo/bar',
+                              '/foo/bar/baz/bar', '/foo/bar/link',
+                              '/foo/broken']))
+
+
+class DumpLoadTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        self.loaded = fake_filesystem.FakeFilesystem(path_separator='/')
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.archive_path = os.path.join(temp_dir.name, 'fs.archive')
+
+    def test_dump_and_load_files(self):
+        fake_file = self.filesystem.create_file(
+            '/foo/bar/baz.txt', contents='äöü', encoding='utf-8')
+        fake_file.xattr['user.test'] = b'\xff\x00'
+        self.filesystem.utime('/foo/bar/baz.txt', ns=(1000, 2000))
+        self.filesystem.create_file('/foo/large', st_size=10 ** 9)
+        self.filesystem.create_symlink('/foo/link', 'bar/baz.txt')
+        self.filesystem.link('/foo/bar/baz.txt', '/foo/hardlink')
+        self.filesystem.create_dir('/read_only')
+        self.filesystem.create_file('/read_only/file')
+        self.filesystem.chmod('/read_only', 0o555)
+        self.filesystem.dump(self.archive_path)
+
+        self.loaded.load(self.archive_path)
+        loaded_file = self.loaded.resolve('/foo/bar/baz.txt')
+        self.assertEqual('äöü', loaded_file.contents)
+        self.assertEqual({'user.test': b'\xff\x00'}, loaded_file.xattr)
+        self.assertEqual(1000, loaded_file.st_atime_ns)
+        self.assertEqual(2000, loaded_file.st_mtime_ns)
+        self.assertEqual(fake_file.st_mode, loaded_file.st_mode)
+        self.assertIs(loaded_file, self.loaded.resolve('/foo/hardlink'))
+        self.assertEqual(2, loaded_file.st_nlink)
+        self.assertTrue(self.loaded.islink('/foo/link'))
+        self.assertIs(loaded_file, self.loaded.resolve('/foo/link'))
+        large_file = self.loaded.resolve('/foo/large')
+        self.assertTrue(large_file.is_large_file())
+        self.assertEqual(10 ** 9, large_file.st_size)
+        self.assertEqual(0o555, self.loaded.resolve('/read_only').st_mode
+                         & 0o777)
+        self.assertTrue(self.loaded.exists('/read_only/file'))
+        self.assertEqual(self.filesystem.get_disk_usage(),
+                         self.loaded.get_disk_usage())
+
+    def test_dump_and_load_mount_points(self):
+        self.filesystem.set_disk_usage(10000)
+        self.filesystem.add_mount_point('/mnt', total_size=100)
+        self.filesystem.create_file('/mnt/foo', contents='test')
+        self.filesystem.dump(self.archive_path)
+
+        self.loaded.load(self.archive_path)
+        self.assertEqual((100, 4, 96), self.loaded.get_disk_usage('/mnt'))
+        self.assertEqual(10000, self.loaded.get_disk_usage('/').total)
+        self.assertNotEqual(self.loaded.resolve('/').st_dev,
+                            self.loaded.resolve('/mnt/foo').st_dev)
+
+    def test_dump_and_load_compressed(self):
+        self.filesystem.create_file('/foo/bar', contents='test' * 1000)
+        for compression in ('gz', 'bz2', 'xz'):
+            self.filesystem.dump(self.archive_path, compression=compression)
+            loaded = fake_filesystem.FakeFilesystem(path_separator='/')
+            loaded.load(self.archive_path)
+            self.assertEqual('test' * 1000,
+                             loaded.resolve('/foo/bar').contents)
+
+    def test_dump_with_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            self.filesystem.dump(self.archive_path, compression='zip')
+
+    def test_load_invalid_archive(self):
+        with open(self.archive_path, 'wb') as f:
+            f.write(b'no archive')
+        with self.assertRaises(ValueError):
+            self.loaded.load(self.archive_path)
+
+    def test_load_into_existing_directories(self):
+        self.filesystem.create_file('/foo/bar')
+        self.filesystem.dump(self.archive_path)
+        self.loaded.create_file('/foo/baz')
+        self.loaded.load(self.archive_path)
+        self.assertTrue(self.loaded.exists('/foo/bar'))
+        self.assertTrue(self.loaded.exists('/foo/baz'))
+
+    def test_load_existing_file_raises(self):
+        self.filesystem.create_file('/foo/bar')
+        self.filesystem.dump(self.archive_path)
+        self.loaded.create_file('/foo/bar')
+        self.assert_raises_os_error(errno.EEXIST, self.loaded.load,
+                                    self.archive_path)
+
+    def test_dump_and_load_hard_link_in_same_directory(self):
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.link('/foo/bar', '/foo/baz')
+        self.filesystem.dump(self.archive_path)
+        self.loaded.load(self.archive_path)
+        self.assertIs(self.loaded.resolve('/foo/bar'),
+                      self.loaded.resolve('/foo/baz'))
+
+    def test_dump_and_load_image(self):
+        fake_file = self.filesystem.create_file('/foo/bar',
+                                                contents='test' * 100)
+        self.filesystem.link('/foo/bar', '/foo/baz')
+        self.filesystem.create_file('/foo/empty')
+        self.filesystem.create_file('/foo/large', st_size=10 ** 9)
+        self.filesystem.create_symlink('/foo/link', 'bar')
+        self.filesystem.dump_image(self.archive_path)
+
+        self.loaded.load_image(self.archive_path)
+        loaded_file = self.loaded.resolve('/foo/bar')
+        self.assertIsInstance(loaded_file, fake_filesystem.FakeFileFromImage)
+        self.assertIs(loaded_file, self.loaded.resolve('/foo/baz'))
+        self.assertEqual(fake_file.st_mode, loaded_file.st_mode)
+        self.assertEqual(400, loaded_file.st_size)
+        self.assertEqual('test' * 100, loaded_file.contents)
+        self.assertIs(loaded_file.byte_contents, loaded_file.byte_contents)
+        self.assertEqual(b'', self.loaded.resolve('/foo/empty').byte_contents)
+        self.assertTrue(self.loaded.resolve('/foo/large').is_large_file())
+        self.assertEqual('bar', self.loaded.readlink('/foo/link'))
+        self.assertEqual(self.filesystem.get_disk_usage(),
+                         self.loaded.get_disk_usage())
+
+    def test_read_and_write_file_from_image(self):
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.dump_image(self.archive_path)
+        self.loaded.load_image(self.archive_path)
+        fake_open = fake_filesystem.FakeFileOpen(self.loaded)
+        with fake_open('/foo/bar') as f:
+            self.assertEqual('test', f.read())
+        with fake_open('/foo/bar', 'a') as f:
+            f.write('ed')
+        self.assertIsNone(self.loaded.resolve('/foo/bar').mapped_contents())
+        with fake_open('/foo/bar') as f:
+            self.assertEqual('tested', f.read())
+
+    def test_loaded_image_is_not_changed_by_replacing_it(self):
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.dump_image(self.archive_path)
+        self.loaded.load_image(self.archive_path)
+        self.filesystem.resolve('/foo/bar').set_contents('changed')
+        self.filesystem.dump_image(self.archive_path)
+        self.assertEqual('test', self.loaded.resolve('/foo/bar').contents)
+
+    def test_load_invalid_image(self):
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.dump(self.archive_path)
+        with self.assertRaises(ValueError):
+            self.loaded.load_image(self.archive_path)
+        with open(self.archive_path, 'wb'):
+            pass
+        with self.assertRaises(ValueError):
+            self.loaded.load_image(self.archive_path)
+
+
+class AddArchiveTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+
+    @staticmethod
+    def tar_member(name, member_type=tarfile.REGTYPE, mode=0o644,
+                   linkname=''):
+        member = tarfile.TarInfo(name)
+        member.type = member_type
+        member.mode = mode
+        member.mtime = 1000
+        member.linkname = linkname
+        return member
+
+    def create_tar(self, mode='w'):
+        archive_path = os.path.join(self.temp_dir, 'test.tar')
+        with tarfile.open(archive_path, mode) as tar_file:
+            tar_file.addfile(self.tar_member('foo', tarfile.DIRTYPE, 0o555))
+            member = self.tar_member('foo/bar.txt')
+            member.size = 4
+            tar_file.addfile(member, io.BytesIO(b'test'))
+            tar_file.addfile(self.tar_member('foo/hard', tarfile.LNKTYPE,
+                                             linkname='foo/bar.txt'))
+            tar_file.addfile(self.tar_member('foo/link', tarfile.SYMTYPE,
+                                             linkname='bar.txt'))
+        return archive_path
+
+    def create_zip(self, archive_file):
+        with zipfile.ZipFile(archive_file, 'w',
+                             zipfile.ZIP_DEFLATED) as zip_file:
+            info = zipfile.ZipInfo('foo/', (2000, 1, 1, 0, 0, 0))
+            info.external_attr = (stat.S_IFDIR | 0o750) << 16
+            zip_file.writestr(info, b'')
+            info = zipfile.ZipInfo('foo/bar.txt', (2000, 1, 1, 0, 0, 0))
+            info.external_attr = 0o600 << 16
+            zip_file.writestr(info, b'test' * 100, zipfile.ZIP_DEFLATED)
+            zip_file.writestr('baz/stored', b'stored', zipfile.ZIP_STORED)
+
+    def test_add_tar_archive(self):
+        archive_path = self.create_tar()
+        target_dir = self.filesystem.add_archive(archive_path, '/target')
+        self.assertIs(target_dir, self.filesystem.resolve('/target'))
+        fake_file = self.filesystem.resolve('/target/foo/bar.txt')
+        self.assertEqual(b'test', fake_file.byte_contents)
+        self.assertEqual(stat.S_IFREG | 0o644, fake_file.st_mode)
+        self.assertEqual(1000, fake_file.st_mtime)
+        self.assertIs(fake_file,
+                      self.filesystem.resolve('/target/foo/hard'))
+        self.assertEqual(2, fake_file.st_nlink)
+        self.assertEqual('bar.txt',
+                         self.filesystem.readlink('/target/foo/link'))
+        fake_dir = self.filesystem.resolve('/target/foo')
+        self.assertEqual(stat.S_IFDIR | 0o555, fake_dir.st_mode)
+        self.assertEqual(1000, fake_dir.st_mtime)
+
+    def test_add_zip_archive_from_file_object(self):
+        archive_file = io.BytesIO()
+        self.create_zip(archive_file)
+        self.filesystem.add_archive(archive_file, '/target')
+        fake_file = self.filesystem.resolve('/target/foo/bar.txt')
+        self.assertEqual(b'test' * 100, fake_file.byte_contents)
+        self.assertEqual(stat.S_IFREG | 0o600, fake_file.st_mode)
+        self.assertEqual(time.mktime((2000, 1, 1, 0, 0, 0, 0, 0, -1)),
+                         fake_file.st_mtime)
+        self.assertEqual(stat.S_IFDIR | 0o750,
+                         self.filesystem.resolve('/target/foo').st_mode)
+        self.assertEqual(b'stored', self.filesystem.resolve(
+            '/target/baz/stored').byte_contents)
+
+    def test_lazy_read_from_zip_archive(self):
+        archive_path = os.path.join(self.temp_dir, 'test.zip')
+        self.create_zip(archive_path)
+        self.filesystem.add_archive(archive_path, '/target', lazy_read=True)
+        fake_file = self.filesystem.resolve('/target/foo/bar.txt')
+        self.assertFalse(fake_file.contents_read)
+        self.assertEqual(400, fake_file.st_size)
+        self.assertEqual(b'test' * 100, fake_file.byte_contents)
+        self.assertTrue(fake_file.contents_read)
+        self.assertEqual(b'stored', self.filesystem.resolve(
+            '/target/baz/stored').byte_contents)
+
+    def test_lazy_read_from_tar_archive(self):
+        archive_path = self.create_tar()
+        self.filesystem.add_archive(archive_path, '/target', lazy_read=True)
+        fake_file = self.filesystem.resolve('/target/foo/bar.txt')
+        self.assertFalse(fake_file.contents_read)
+        self.assertEqual(b'test', fake_file.byte_contents)
+        fake_file.set_contents(b'changed')
+        self.assertEqual(b'changed', fake_file.byte_contents)
+
+    def test_lazy_read_from_compressed_tar_archive(self):
+        archive_path = self.create_tar('w:gz')
+        self.filesystem.add_archive(archive_path, '/target', lazy_read=True)
+        fake_file = self.filesystem.resolve('/target/foo/bar.txt')
+        self.assertNotIsInstance(fake_file,
+                                 fake_filesystem.FakeFileFromArchive)
+        self.assertEqual(b'test', fake_file.byte_contents)
+
+    def test_lazy_read_from_file_object_raises(self):
+        with self.assertRaises(ValueError):
+            self.filesystem.add_archive(io.BytesIO(), '/target',
+                                        lazy_read=True)
+
+    def test_member_outside_of_target_raises(self):
+        archive_file = io.BytesIO()
+        with zipfile.ZipFile(archive_file, 'w') as zip_file:
+            zip_file.writestr('foo/../../bar', b'test')
+        with self.assertRaises(ValueError):
+            self.filesystem.add_archive(archive_file, '/target')
+
+    def test_add_archive_into_existing_directory(self):
+        self.filesystem.create_file('/target/foo/baz')
+        self.filesystem.add_archive(self.create_tar(), '/target')
+        self.assertTrue(self.filesystem.exists('/target/foo/bar.txt'))
+        self.assertTrue(self.filesystem.exists('/target/foo/baz'))
+
+    def test_add_existing_file_raises(self):
+        self.filesystem.create_file('/target/foo/bar.txt')
+        self.assert_raises_os_error(errno.EEXIST, self.filesystem.add_archive,
+                                    self.create_tar(), '/target')
+
+    def test_add_archive_to_file_raises(self):
+        self.filesystem.create_file('/target')
+        self.assert_raises_os_error(errno.ENOTDIR, self.filesystem.add_archive,
+                                    self.create_tar(), '/target')
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.export_dir = os.path.join(temp_dir.name, 'export')
+
+    def test_export_tree(self):
+        self.filesystem.create_file('/foo/bar/baz.txt', contents='test')
+        self.filesystem.utime('/foo/bar/baz.txt', ns=(1000, 2000))
+        self.filesystem.create_dir('/foo/empty')
+        self.filesystem.create_file('/foo/large', st_size=10 ** 9)
+        self.filesystem.chmod('/foo/bar', 0o555)
+        self.filesystem.export_to(self.export_dir)
+
+        file_path = os.path.join(self.export_dir, 'foo', 'bar', 'baz.txt')
+        with open(file_path) as f:
+            self.assertEqual('test', f.read())
+        self.assertEqual(2000, os.stat(file_path).st_mtime_ns)
+        self.assertTrue(os.path.isdir(
+            os.path.join(self.export_dir, 'foo', 'empty')))
+        self.assertEqual(0, os.path.getsize(
+            os.path.join(self.export_dir, 'foo', 'large')))
+
+    @unittest.skipIf(IS_WIN, 'symlinks and hard links need privileges')
+    def test_export_links(self):
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.create_symlink('/foo/link', 'bar')
+        self.filesystem.link('/foo/bar', '/foo/hardlink')
+        self.filesystem.export_to(self.export_dir)
+
+        self.assertEqual('bar', os.readlink(
+            os.path.join(self.export_dir, 'foo', 'link')))
+        self.assertEqual(2, os.stat(
+            os.path.join(self.export_dir, 'foo', 'bar')).st_nlink)
+
+    def test_export_subtree(self):
+        self.filesystem.create_file('/foo/bar/baz', contents='test')
+        self.filesystem.create_file('/foo/other')
+        self.filesystem.export_to(self.export_dir, '/foo/bar')
+        self.assertEqual(['baz'], os.listdir(self.export_dir))
+
+    def test_export_existing_file_raises(self):
+        self.filesystem.create_file('/foo')
+        os.makedirs(self.export_dir)
+        open(os.path.join(self.export_dir, 'foo'), 'w').close()
+        with self.assertRaises(OSError):
+            self.filesystem.export_to(self.export_dir)
+
+    def test_export_file_raises(self):
+        self.filesystem.create_file('/foo')
+        self.assert_raises_os_error(errno.ENOTDIR, self.filesystem.export_to,
+                                    self.export_dir, '/foo')
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(path_separator='/')
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.filesystem.create_file('/foo/baz', contents='test')
+        self.filesystem.create_file('/foo/removed')
+
+    def test_snapshot(self):
+        snapshot = self.filesystem.snapshot()
+        self.assertEqual(['/foo', '/foo/bar', '/foo/baz', '/foo/removed'],
+                         sorted(snapshot))
+        entry = snapshot['/foo/bar']
+        self.assertEqual(4, entry.st_size)
+        self.assertTrue(stat.S_ISREG(entry.st_mode))
+        self.assertEqual(['/foo/bar', '/foo/baz', '/foo/removed'],
+                         sorted(self.filesystem.snapshot('/foo')))
+
+    def test_diff_snapshots(self):
+        old_snapshot = self.filesystem.snapshot()
+        self.filesystem.resolve('/foo/bar').set_contents('changed')
+        self.filesystem.remove_object('/foo/removed')
+        self.filesystem.create_file('/foo/added')
+        diff = self.filesystem.diff_snapshots(old_snapshot,
+                                              self.filesystem.snapshot())
+        self.assertEqual(['/foo/added'], diff.added)
+        self.assertEqual(['/foo/removed'], diff.removed)
+        self.assertEqual(['/foo/bar'], diff.changed)
+        self.assertEqual({'/foo/bar': (4, 7)}, diff.size_changes)
+
+    def test_diff_detects_changed_contents(self):
+        old_snapshot = self.filesystem.snapshot('/foo')
+        self.filesystem.resolve('/foo/baz').set_contents('TEST')
+        diff = self.filesystem.diff_snapshots(
+            old_snapshot, self.filesystem.snapshot('/foo'))
+        self.assertEqual(['/foo/baz'], diff.changed)
+        self.assertEqual({}, diff.size_changes)
+
+
 if __name__ == '__main__':
     unittest.main()
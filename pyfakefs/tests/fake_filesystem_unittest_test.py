@@ -18,12 +18,14 @@
 Test the :py:class`pyfakefs.fake_filesystem_unittest.TestCase` base class.
 """
 import glob
+import importlib
 import io
 import multiprocessing
 import os
 import shutil
 import sys
 import tempfile
+import types
 import unittest
 import warnings
 from distutils.dir_util import copy_tree, remove_tree
@@ -218,6 +220,8 @@ class TestAttributesWithFakeModuleNames(TestPyfakefsUnittestBase):
         self.assertEqual(module_with_attributes.shutil,
                          'shutil attribute value')
         self.assertEqual(module_with_attributes.io, 'io attribute value')
+        self.assertEqual(module_with_attributes.glob,
+                         'glob attribute value')
 
 
 import math as path  # noqa: E402 wanted import not at top
@@ -675,5 +679,228 @@ class TestDeprecationSuppression(fake_filesystem_unittest.TestCase):
             self.assertEqual(0, len(w))
 
 
+class PatcherCacheTest(TestCase):
+    module_name = 'pyfakefs_cache_test_module'
+
+    def setUp(self):
+        # make sure the cache is filled with the currently loaded modules
+        with Patcher(use_cache=True):
+            pass
+
+    def tearDown(self):
+        sys.modules.pop(self.module_name, None)
+
+    def load_module(self):
+        module = types.ModuleType(self.module_name)
+        module.os = os
+        module.path = None
+        sys.modules[self.module_name] = module
+        return module
+
+    def test_module_loaded_after_caching_is_patched(self):
+        module = self.load_module()
+        with Patcher(use_cache=True) as patcher:
+            patcher.fs.create_file('/foo/bar')
+            self.assertTrue(module.os.path.exists('/foo/bar'))
+        self.assertIs(os, module.os)
+
+    def test_replaced_module_is_patched(self):
+        self.load_module()
+        with Patcher(use_cache=True):
+            pass
+        module = self.load_module()
+        with Patcher(use_cache=True) as patcher:
+            patcher.fs.create_file('/foo/bar')
+            self.assertTrue(module.os.path.exists('/foo/bar'))
+
+    def test_module_with_new_name_is_patched(self):
+        module = self.load_module()
+        with Patcher(use_cache=True):
+            pass
+        module.fs_open = open
+        with Patcher(use_cache=True) as patcher:
+            patcher.fs.create_file('/foo/bar', contents='test')
+            with module.fs_open('/foo/bar') as f:
+                self.assertEqual('test', f.read())
+
+    def test_reloaded_module_is_patched(self):
+        module_dir = tempfile.mkdtemp()
+        module_path = os.path.join(module_dir, self.module_name + '.py')
+        with open(module_path, 'w') as f:
+            f.write('path = None\n')
+        sys.path.insert(0, module_dir)
+        try:
+            module = importlib.import_module(self.module_name)
+            with Patcher(use_cache=True):
+                pass
+            with open(module_path, 'w') as f:
+                f.write('from os import path\n')
+            importlib.invalidate_caches()
+            importlib.reload(module)
+            with Patcher(use_cache=True) as patcher:
+                patcher.fs.create_file('/foo/bar')
+                self.assertTrue(module.path.exists('/foo/bar'))
+        finally:
+            sys.path.remove(module_dir)
+            shutil.rmtree(module_dir)
+
+    def test_function_lookup_is_shared(self):
+        patcher1 = Patcher(use_cache=True)
+        patcher2 = Patcher(use_cache=True)
+        self.assertIs(patcher1._fake_module_functions,
+                      patcher2._fake_module_functions)
+        patcher3 = Patcher()
+        self.assertIsNot(patcher1._fake_module_functions,
+                         patcher3._fake_module_functions)
+        self.assertEqual(patcher1._fake_module_functions,
+                         patcher3._fake_module_functions)
+
+    def test_clear_cache(self):
+        module = self.load_module()
+        with Patcher(use_cache=True):
+            pass
+        # replacing a name in a cached module is only noticed after
+        # clearing the cache
+        module.path = os.path
+        Patcher.clear_cache()
+        with Patcher(use_cache=True) as patcher:
+            patcher.fs.create_file('/foo/bar')
+            self.assertTrue(module.path.exists('/foo/bar'))
+
+    def test_fake_filesystem_is_reused(self):
+        with Patcher(reuse_fs=True) as patcher:
+            fs = patcher.fs
+            fs.create_file('/foo/bar')
+            fs.is_windows_fs = not fs.is_windows_fs
+            fs.umask = 0o077
+        with Patcher(reuse_fs=True) as patcher:
+            self.assertIs(fs, patcher.fs)
+            self.assertIs(patcher, fs.patcher)
+            self.assertFalse(os.path.exists('/foo/bar'))
+            self.assertEqual(sys.platform == 'win32', fs.is_windows_fs)
+            self.assertNotEqual(0o077, fs.umask)
+
+    def test_nested_patchers_use_separate_filesystems(self):
+        with Patcher(reuse_fs=True) as patcher:
+            with Patcher(reuse_fs=True) as nested_patcher:
+                self.assertIsNot(patcher.fs, nested_patcher.fs)
+
+    def test_fake_filesystem_is_not_reused_by_default(self):
+        with Patcher(reuse_fs=True) as patcher:
+            fs = patcher.fs
+        with Patcher(use_cache=True) as patcher:
+            self.assertIsNot(fs, patcher.fs)
+
+    def test_file_left_open_in_reused_filesystem(self):
+        with Patcher(reuse_fs=True) as patcher:
+            patcher.fs.create_file('/foo', contents='foo')
+            leaked_file = open('/foo')
+        with Patcher(reuse_fs=True) as patcher:
+            patcher.fs.create_file('/bar', contents='bar')
+            with open('/bar') as f:
+                self.assertEqual(leaked_file.fileno(), f.fileno())
+                leaked_file.close()
+                self.assertEqual('bar', f.read())
+                self.assertIs(f, patcher.fs.get_open_file(f.fileno()))
+
+    def test_directory_left_open_in_reused_filesystem(self):
+        with Patcher(reuse_fs=True) as patcher:
+            patcher.fs.create_dir('/foo')
+            leaked_dir = patcher.fs.get_open_file(
+                os.open('/foo', os.O_RDONLY))
+        with Patcher(reuse_fs=True) as patcher:
+            patcher.fs.create_file('/bar', contents='bar')
+            with open('/bar') as f:
+                self.assertEqual(leaked_dir.fileno(), f.fileno())
+                leaked_dir.close()
+                self.assertEqual('bar', f.read())
+                self.assertIs(f, patcher.fs.get_open_file(f.fileno()))
+
+    def test_read_only_guard_is_released_on_reuse(self):
+        with Patcher(reuse_fs=True) as patcher:
+            guard = patcher.fs.read_only()
+            guard.__enter__()
+        with Patcher(reuse_fs=True) as patcher:
+            patcher.fs.create_file('/foo')
+            with patcher.fs.read_only():
+                guard.__exit__(None, None, None)
+                self.assertIsNotNone(patcher.fs.read_only_guard)
+            self.assertTrue(os.path.exists('/foo'))
+
+    def test_without_cache(self):
+        module = self.load_module()
+        with Patcher(use_cache=True):
+            pass
+        module.path = os.path
+        with Patcher() as patcher:
+            patcher.fs.create_file('/foo/bar')
+            self.assertTrue(module.path.exists('/foo/bar'))
+
+
+class TestCaseUseCacheTest(fake_filesystem_unittest.TestCase):
+    def __init__(self, methodName='runTest'):
+        super(TestCaseUseCacheTest, self).__init__(
+            methodName, use_cache=True)
+
+    def test_use_cache_from_test_case(self):
+        self.setUpPyfakefs()
+        self.assertTrue(self._stubber.use_cache)
+
+    def test_use_cache_argument_overwrites_test_case(self):
+        self.setUpPyfakefs(use_cache=False)
+        self.assertFalse(self._stubber.use_cache)
+
+
+class TestCaseMixinUseCacheTest(unittest.TestCase,
+                                fake_filesystem_unittest.TestCaseMixin):
+    use_cache = True
+
+    def test_use_cache_from_attribute(self):
+        self.setUpPyfakefs()
+        self.assertTrue(self._stubber.use_cache)
+
+
+class ModulesToScanTest(TestCase):
+    def setUp(self):
+        self.modules = {}
+        for name in ('pyfakefs_scanned', 'pyfakefs_scanned.sub',
+                     'pyfakefs_scanned_not', 'pyfakefs_not_scanned'):
+            module = types.ModuleType(name)
+            module.os = os
+            sys.modules[name] = self.modules[name] = module
+
+    def tearDown(self):
+        for name in self.modules:
+            del sys.modules[name]
+
+    def check_scanned_modules(self, patcher):
+        patcher.fs.create_file('/foo/bar')
+        self.assertTrue(
+            self.modules['pyfakefs_scanned'].os.path.exists('/foo/bar'))
+        self.assertTrue(
+            self.modules['pyfakefs_scanned.sub'].os.path.exists('/foo/bar'))
+        self.assertIs(os, self.modules['pyfakefs_scanned_not'].os)
+        self.assertIs(os, self.modules['pyfakefs_not_scanned'].os)
+        # the built-in open function is always patched
+        with open('/foo/bar', 'w') as f:
+            f.write('test')
+        self.assertEqual('test', patcher.fs.get_object('/foo/bar').contents)
+
+    def test_module_names(self):
+        with Patcher(modules_to_scan=['pyfakefs_scanned']) as patcher:
+            self.check_scanned_modules(patcher)
+
+    def test_modules(self):
+        module = self.modules['pyfakefs_scanned']
+        with Patcher(modules_to_scan=[module]) as patcher:
+            self.check_scanned_modules(patcher)
+
+    def test_all_modules_scanned_by_default(self):
+        with Patcher() as patcher:
+            patcher.fs.create_file('/foo/bar')
+            self.assertTrue(self.modules['pyfakefs_not_scanned'].os.path
+                            .exists('/foo/bar'))
+
+
 if __name__ == "__main__":
     unittest.main()
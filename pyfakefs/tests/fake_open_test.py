@@ -918,6 +918,26 @@ class FakeFileOpenTest(FakeFileOpenTestBase):
             with self.open(self.os.devnull) as f:
                 self.assertEqual('', f.read())
 
+    def test_copied_contents_are_shared(self):
+        self.skip_real_fs()
+        src_path = self.make_path('foo')
+        dst_path = self.make_path('bar')
+        src_object = self.filesystem.create_file(src_path,
+                                                 contents=b'x' * 1000)
+        with self.open(src_path, 'rb') as f:
+            contents = f.read()
+        with self.open(dst_path, 'wb') as f:
+            f.write(contents)
+        dst_object = self.filesystem.get_object(dst_path)
+        self.assertIs(src_object.byte_contents, dst_object.byte_contents)
+
+        with self.open(dst_path, 'r+b') as f:
+            f.seek(10)
+            f.write(b'y')
+        self.assertEqual(b'x' * 1000, src_object.byte_contents)
+        self.assertEqual(b'x' * 10 + b'y' + b'x' * 989,
+                         dst_object.byte_contents)
+
 
 class RealFileOpenTest(FakeFileOpenTest):
     def use_real_fs(self):
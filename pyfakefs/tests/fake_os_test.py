@@ -26,7 +26,9 @@ import unittest
 from pyfakefs.helpers import IN_DOCKER
 
 from pyfakefs import fake_filesystem
-from pyfakefs.fake_filesystem import FakeFileOpen, is_root
+from pyfakefs.fake_filesystem import (
+    FakeFileOpen, is_root, set_uid, reset_ids
+)
 from pyfakefs.extra_packages import (
     use_scandir, use_scandir_package, use_builtin_scandir
 )
@@ -4290,6 +4292,22 @@ class FakeOsModuleLowLevelFileOpTest(FakeOsModuleTestBase):
         with self.open(dst_file_path) as f:
             self.assertEqual('cont', f.read())
 
+    def test_sendfile_shares_contents(self):
+        self.check_linux_only()
+        self.skip_real_fs()
+        src_file_path = self.make_path('foo')
+        dst_file_path = self.make_path('bar')
+        src_object = self.filesystem.create_file(src_file_path,
+                                                 contents='testcontent')
+        self.create_file(dst_file_path)
+        fd1 = self.os.open(src_file_path, os.O_RDONLY)
+        fd2 = self.os.open(dst_file_path, os.O_RDWR)
+        self.os.sendfile(fd2, fd1, 0, 11)
+        self.os.close(fd2)
+        self.os.close(fd1)
+        dst_object = self.filesystem.get_object(dst_file_path)
+        self.assertIs(src_object.byte_contents, dst_object.byte_contents)
+
     def test_sendfile_twice(self):
         self.check_linux_only()
         src_file_path = self.make_path('foo')
@@ -4509,6 +4527,45 @@ class FakeOsModuleWalkTest(FakeOsModuleTestBase):
                                self.os.path.join(base_dir, 'created_link'),
                                followlinks=True)
 
+    def test_walk_followsymlink_with_cycle(self):
+        self.check_posix_only()
+        base_dir = self.make_path('foo')
+        self.create_dir(self.os.path.join(base_dir, 'bar'))
+        self.create_symlink(self.os.path.join(base_dir, 'bar', 'link'),
+                            base_dir)
+        self.ResetErrno()
+        result = list(self.os.walk(base_dir, followlinks=True,
+                                   onerror=self.StoreErrno))
+        self.assertFalse(self.GetErrno())
+        self.assertTrue(all(root.startswith(base_dir)
+                            for root, _, _ in result))
+        # the link is not resolvable anymore at the deepest level
+        self.assertEqual(([], ['link']), result[-1][1:])
+
+    def test_walk_calls_on_error_for_unreadable_directory(self):
+        self.check_posix_only()
+        self.skip_real_fs()
+        base_dir = self.make_path('foo')
+        self.create_dir(self.os.path.join(base_dir, 'bar'))
+        self.os.chmod(self.os.path.join(base_dir, 'bar'), 0o000)
+        self.ResetErrno()
+        set_uid(42)
+        try:
+            result = list(self.os.walk(base_dir, onerror=self.StoreErrno))
+        finally:
+            reset_ids()
+        self.assertEqual([(base_dir, ['bar'], [])], result)
+        self.assertEqual(errno.EACCES, self.GetErrno())
+
+    def test_walk_calls_on_error_for_added_directory(self):
+        base_dir = self.make_path('foo')
+        self.create_dir(base_dir)
+        self.ResetErrno()
+        for _, dirs, _ in self.os.walk(base_dir, onerror=self.StoreErrno):
+            if not self.GetErrno():
+                dirs.append('non_existing')
+        self.assertEqual(errno.ENOENT, self.GetErrno())
+
     def test_base_dirpath(self):
         # regression test for #512
         file_path = self.make_path('foo', 'bar', 'baz')
@@ -5060,6 +5117,47 @@ class FakeScandirTest(FakeOsModuleTestBase):
         self.assert_raises_os_error(
             errno.ENOENT, self.scandir, 'non_existing/fake_dir')
 
+    def test_broken_symlink(self):
+        self.skip_if_symlink_not_supported()
+        dir_path = self.make_path('broken')
+        link_path = self.os.path.join(dir_path, 'link')
+        self.create_dir(dir_path)
+        self.create_symlink(link_path, self.make_path('non_existing'))
+        entries = list(self.scandir(dir_path))
+        self.assertEqual(1, len(entries))
+        self.assertTrue(entries[0].is_symlink())
+        self.assertFalse(entries[0].is_dir())
+        self.assertEqual(self.os.lstat(link_path).st_ino, entries[0].inode())
+        self.assertEqual(self.os.lstat(link_path).st_mode,
+                         entries[0].stat(follow_symlinks=False).st_mode)
+
+    def test_remove_entries_during_iteration(self):
+        dir_path = self.make_path('removed')
+        for i in range(10):
+            self.create_file(self.os.path.join(dir_path, 'file%d' % i))
+        names = []
+        for entry in self.scandir(dir_path):
+            names.append(entry.name)
+            self.os.remove(entry.path)
+        self.assertEqual(['file%d' % i for i in range(10)], sorted(names))
+        self.assertEqual([], self.os.listdir(dir_path))
+
+    def test_scandir_iterates_snapshot(self):
+        # real file systems may or may not return added entries
+        self.skip_real_fs()
+        dir_path = self.make_path('changed')
+        for i in range(3):
+            self.create_file(self.os.path.join(dir_path, 'file%d' % i))
+        entries = self.scandir(dir_path)
+        names = [next(entries).name]
+        self.create_file(self.os.path.join(dir_path, 'new'))
+        self.os.remove(self.os.path.join(dir_path, 'file2'))
+        names.extend(entry.name for entry in entries)
+        self.assertEqual(['file0', 'file1', 'file2'], sorted(names))
+        self.assertEqual(['file0', 'file1', 'new'],
+                         sorted(entry.name
+                                for entry in self.scandir(dir_path)))
+
 
 class RealScandirTest(FakeScandirTest):
     def use_real_fs(self):
@@ -25,6 +25,7 @@ import os
 import stat
 import sys
 import unittest
+from unittest import mock
 
 from pyfakefs.extra_packages import pathlib, pathlib2
 from pyfakefs.fake_filesystem import is_root
@@ -709,6 +710,56 @@ class FakePathlibPathFileOperationTest(RealPathlibTestCase):
         self.assertEqual(sorted(path.glob('*.py')),
                          [self.path(self.make_path('foo', 'setup.py'))])
 
+    def test_glob_recursive(self):
+        self.create_file(self.make_path('foo', 'setup.py'))
+        self.create_file(self.make_path('foo', 'bar', 'baz.py'))
+        self.create_file(self.make_path('foo', 'bar', 'baz.txt'))
+        self.create_file(self.make_path('foo', '.hidden', 'hidden.py'))
+        path = self.path(self.make_path('foo'))
+        self.assertEqual(
+            sorted(path.glob('**/*.py')),
+            [self.path(self.make_path('foo', '.hidden', 'hidden.py')),
+             self.path(self.make_path('foo', 'bar', 'baz.py')),
+             self.path(self.make_path('foo', 'setup.py'))])
+        self.assertEqual(sorted(path.glob('*/baz.*')),
+                         [self.path(self.make_path('foo', 'bar', 'baz.py')),
+                          self.path(self.make_path('foo', 'bar', 'baz.txt'))])
+        self.assertEqual(sorted(path.glob('**')),
+                         [path,
+                          self.path(self.make_path('foo', '.hidden')),
+                          self.path(self.make_path('foo', 'bar'))])
+
+    def test_rglob(self):
+        self.create_file(self.make_path('foo', 'setup.py'))
+        self.create_file(self.make_path('foo', 'bar', 'baz.py'))
+        self.create_file(self.make_path('foo', 'bar', 'baz.txt'))
+        path = self.path(self.make_path('foo'))
+        self.assertEqual(sorted(path.rglob('*.py')),
+                         [self.path(self.make_path('foo', 'bar', 'baz.py')),
+                          self.path(self.make_path('foo', 'setup.py'))])
+        self.assertEqual(list(path.rglob('baz.txt')),
+                         [self.path(self.make_path('foo', 'bar', 'baz.txt'))])
+
+    def test_glob_does_not_recurse_into_symlinks(self):
+        self.skip_if_symlink_not_supported()
+        self.create_file(self.make_path('foo', 'bar', 'baz.py'))
+        self.create_symlink(self.make_path('foo', 'link'),
+                            self.make_path('foo', 'bar'))
+        path = self.path(self.make_path('foo'))
+        self.assertEqual(sorted(path.rglob('*.py')),
+                         [self.path(self.make_path('foo', 'bar', 'baz.py'))])
+        self.assertEqual(list(path.glob('link/*.py')),
+                         [self.path(self.make_path('foo', 'link', 'baz.py'))])
+
+    def test_glob_invalid_pattern(self):
+        path = self.path(self.make_path('foo'))
+        with self.assertRaises(ValueError):
+            list(path.glob(''))
+        with self.assertRaises(ValueError):
+            list(path.glob('foo**'))
+        with self.assertRaises(NotImplementedError):
+            list(path.glob(self.make_path('bar')))
+
 
 class RealPathlibPathFileOperationTest(FakePathlibPathFileOperationTest):
     def use_real_fs(self):
@@ -1038,5 +1089,82 @@ class FakeFilesystemPathLikeObjectTest(unittest.TestCase):
             fake_dirpath_string).st_mode & stat.S_IFDIR)
 
 
+class FakePathStatCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.filesystem = fake_filesystem.FakeFilesystem(
+            path_separator='/')
+        self.pathlib = fake_pathlib.FakePathlibModule(self.filesystem)
+        self.filesystem.create_file('/foo/bar', contents='test')
+        self.path = self.pathlib.Path('/foo/bar')
+
+    def tearDown(self):
+        fake_filesystem.reset_ids()
+
+    def test_resolved_object_is_reused(self):
+        self.assertTrue(self.path.is_file())
+        with mock.patch.object(self.filesystem, 'resolve') as resolve:
+            self.assertTrue(self.path.exists())
+            self.assertTrue(self.path.is_file())
+            self.assertFalse(self.path.is_dir())
+            self.assertEqual(4, self.path.stat().st_size)
+            self.assertFalse(resolve.called)
+
+    def test_file_changes_are_visible(self):
+        self.assertEqual(4, self.path.stat().st_size)
+        self.path.write_text('changed')
+        self.assertEqual(7, self.path.stat().st_size)
+
+    def test_structure_changes_are_visible(self):
+        self.assertTrue(self.path.exists())
+        self.filesystem.remove_object('/foo/bar')
+        self.assertFalse(self.path.exists())
+        self.assertFalse(self.path.exists())
+        self.filesystem.create_dir('/foo/bar')
+        self.assertTrue(self.path.is_dir())
+        link_path = self.pathlib.Path('/foo/link')
+        self.assertFalse(link_path.is_symlink())
+        self.filesystem.create_symlink('/foo/link', '/foo/bar')
+        self.assertTrue(link_path.is_symlink())
+        self.assertTrue(link_path.is_dir())
+
+    def test_cwd_change_is_visible(self):
+        path = self.pathlib.Path('bar')
+        self.assertFalse(path.exists())
+        self.filesystem.cwd = '/foo'
+        self.assertTrue(path.exists())
+
+    def test_permission_change_is_visible(self):
+        fake_filesystem.set_uid(42)
+        self.filesystem.create_file('/bar/baz')
+        path = self.pathlib.Path('/bar/baz')
+        self.assertTrue(path.exists())
+        self.filesystem.chmod('/bar', 0o000)
+        with self.assertRaises(OSError) as cm:
+            path.stat()
+        self.assertEqual(errno.EACCES, cm.exception.errno)
+        fake_filesystem.set_uid(0)
+        self.assertTrue(path.exists())
+
+    def test_case_sensitivity_change_is_visible(self):
+        self.filesystem.is_case_sensitive = True
+        path = self.pathlib.Path('/FOO/bar')
+        self.assertFalse(path.exists())
+        self.filesystem.is_case_sensitive = False
+        self.assertTrue(path.exists())
+
+    def test_owner_change_invalidates_cache(self):
+        generation = self.filesystem.generation
+        fake_filesystem.FakeOsModule(self.filesystem).chown('/foo', 42, 43)
+        self.assertNotEqual(generation, self.filesystem.generation)
+
+    def test_group_change_invalidates_cache(self):
+        self.assertTrue(self.path.exists())
+        fake_filesystem.set_gid(42)
+        with mock.patch.object(self.filesystem, 'resolve') as resolve:
+            self.path.exists()
+            self.assertTrue(resolve.called)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -28,3 +28,4 @@ path = 'path attribute value'
 pathlib = 'pathlib attribute value'
 shutil = 'shutil attribute value'
 io = 'io attribute value'
+glob = 'glob attribute value'